@@ -6,6 +6,10 @@ from .routes.questions import router as questions_router
 from .routes.users import router as users_router
 from .routes.exam_schedule import exam_schedule_router
 from .routes.submission import submission_router
+from .routes.analytics import analytics_router
+from .routes.exam_session import exam_session_router
+from .routes.system import system_router
+from .routes.batch import batch_router
 
 api_router = APIRouter()
 
@@ -16,5 +20,9 @@ api_router.include_router(questions_router)
 api_router.include_router(exams_router)
 api_router.include_router(exam_schedule_router)
 api_router.include_router(submission_router)
+api_router.include_router(analytics_router)
+api_router.include_router(exam_session_router)
+api_router.include_router(system_router)
+api_router.include_router(batch_router)
 
 __all__ = ["api_router"]
@@ -0,0 +1,93 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from ...core.config import settings
+from ...core.constants import UserRole
+from ...core.permissions import check_admin_only, check_teacher_or_admin
+from ...core.security import security
+from ...db.database import get_db, statement_timeout
+from ...db.release import EarlyReleaseRoute
+from ...schemas.analytics import AdminDashboardOut, ItemAnalysisOut, ScoreSummaryOut
+from ...schemas.user import BaseResponse, MessageResponse
+from ...services.auth import get_current_user
+from ...services.dashboard_service import get_admin_dashboard
+from ...services.exam_schedule_service import get_schedule_by_id
+from ...services.item_analysis_service import get_item_analysis
+from ...services.score_distribution_service import get_score_summary
+from ...services.submission_service import rebuild_schedule_statistics
+
+analytics_router = APIRouter(prefix="/analytics", tags=["Analytics"], route_class=EarlyReleaseRoute)
+
+
+def get_current_user_dependency(
+    credentials=Depends(security), db: Session = Depends(get_db)
+):
+    """Dependency to get current user from token"""
+    return get_current_user(db, credentials.credentials)
+
+
+@analytics_router.get("/dashboard", response_model=BaseResponse[AdminDashboardOut])
+def get_dashboard(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Users by role, questions by subject, exams by creator, schedules and today's submissions (admin only)"""
+    check_admin_only(current_user)
+    return {"data": get_admin_dashboard(db)}
+
+
+@analytics_router.get(
+    "/schedules/{schedule_id}/items", response_model=BaseResponse[ItemAnalysisOut]
+)
+def get_schedule_item_analysis(
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Item analysis of an exam schedule (teacher/admin only)"""
+    check_teacher_or_admin(current_user)
+    return {"data": get_item_analysis(db, schedule_id)}
+
+
+@analytics_router.post(
+    "/schedules/{schedule_id}/rebuild",
+    response_model=BaseResponse[MessageResponse],
+    dependencies=[Depends(statement_timeout(settings.DB_REPORT_STATEMENT_TIMEOUT_MS))],
+)
+def rebuild_schedule_analytics(
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Recompute item and score statistics from all submissions (admin only)"""
+    check_admin_only(current_user)
+
+    if not get_schedule_by_id(db, schedule_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Exam schedule not found"
+        )
+
+    graded = rebuild_schedule_statistics(db, schedule_id)
+    return {"data": {"message": f"Rebuilt statistics from {graded} submissions"}}
+
+
+@analytics_router.get(
+    "/schedules/{schedule_id}/scores", response_model=BaseResponse[ScoreSummaryOut]
+)
+def get_schedule_score_summary(
+    schedule_id: int,
+    student_id: Optional[int] = Query(
+        None, description="Student to rank (teacher/admin only, defaults to yourself)"
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Score distribution, mean, median and percentile rank of a schedule"""
+    if current_user.role == UserRole.STUDENT:
+        student_id = current_user.id
+    else:
+        check_teacher_or_admin(current_user)
+
+    return {"data": get_score_summary(db, schedule_id, student_id)}
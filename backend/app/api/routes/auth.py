@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from ...core.config import settings
 from ...core.security import security
 from ...db.database import get_db
+from ...db.release import EarlyReleaseRoute
 from ...schemas.user import LoginResponse, UserCreate, UserLogin, UserOut
 from ...services.auth import create_access_token, get_current_user
 from ...services.user_service import (
@@ -14,7 +15,7 @@ from ...services.user_service import (
     get_user_by_username,
 )
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], route_class=EarlyReleaseRoute)
 
 
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
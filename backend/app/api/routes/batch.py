@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote, unquote
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.config import settings
+from ...core.security import security
+from ...db.database import get_async_db, release_async_connection
+from ...schemas.batch import BatchRequest, BatchRequestItem, BatchResponse, BatchResponseItem
+from ...services.auth import get_current_user_async, reuse_current_user
+
+logger = logging.getLogger(__name__)
+
+batch_router = APIRouter(prefix="/batch", tags=["Batch"])
+
+# Sub-request headers the client may set; auth and content negotiation come from the batch
+_FORWARDED_HEADERS = {"if-none-match", "if-modified-since", "idempotency-key"}
+# Sub-response headers worth returning
+_RETURNED_HEADERS = ("etag", "last-modified", "cache-control", "location", "retry-after")
+_READ_METHODS = ("GET", "HEAD")
+# Left as they are when percent-encoding a sub-request target (existing escapes included)
+_PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+_QUERY_SAFE = _PATH_SAFE + "?"
+
+
+async def get_current_user_async_dependency(
+    credentials=Depends(security), db: AsyncSession = Depends(get_async_db)
+):
+    """Dependency to get current user from token (async routes)"""
+    user = await get_current_user_async(db, credentials.credentials)
+    # Sub-requests open their own sessions: do not hold this connection for the whole batch
+    await release_async_connection(db)
+    return user
+
+
+def _sub_scope(request: Request, item: BatchRequestItem, body: bytes) -> Dict[str, Any]:
+    target, _, query = item.path.partition("?")
+    if not target.startswith("/api/"):
+        target = "/api" + target
+    # raw_path is the encoded target as sent, path its percent-decoded form (ASGI)
+    raw_path = quote(target, safe=_PATH_SAFE)
+    headers: List[Tuple[bytes, bytes]] = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items()
+        if name.lower() in _FORWARDED_HEADERS
+    ]
+    headers += [
+        (b"authorization", request.headers.get("authorization", "").encode("latin-1")),
+        # Sub-responses are embedded as JSON and never compressed on their own
+        (b"accept", b"application/json"),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    return {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": item.method,
+        "scheme": request.url.scheme,
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": "",
+        "path": unquote(raw_path),
+        "raw_path": raw_path.encode("ascii"),
+        "query_string": quote(query, safe=_QUERY_SAFE).encode("ascii"),
+        "headers": headers,
+        "state": dict(request.scope.get("state") or {}),
+    }
+
+
+async def _run(request: Request, item: BatchRequestItem) -> BatchResponseItem:
+    """Run one sub-request through the app and capture its response"""
+    if unquote(item.path.split("?")[0]).rstrip("/") in ("/batch", "/api/batch"):
+        return BatchResponseItem(
+            id=item.id, status=400, body={"detail": "Batch requests cannot be nested"}
+        )
+    body = b"" if item.body is None else orjson.dumps(item.body)
+    scope = _sub_scope(request, item, body)
+    received = False
+    start: Dict[str, Any] = {}
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The client stays connected until the batch is done
+        await asyncio.Future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await asyncio.wait_for(request.app(scope, receive, send), settings.BATCH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return BatchResponseItem(id=item.id, status=504, body={"detail": "Sub-request timed out"})
+    except Exception:
+        # Also after http.response.start: the body may be cut off
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        return BatchResponseItem(id=item.id, status=500, body={"detail": "Internal Server Error"})
+
+    response_headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in start.get("headers", ())
+    }
+    raw = b"".join(chunks)
+    content = None
+    if raw and response_headers.get("content-type", "").startswith("application/json"):
+        try:
+            content = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            content = raw.decode("utf-8", "replace")
+    elif raw:
+        content = raw.decode("utf-8", "replace")
+    return BatchResponseItem(
+        id=item.id,
+        status=start.get("status", 500),
+        headers={name: response_headers[name] for name in _RETURNED_HEADERS if name in response_headers},
+        body=content,
+    )
+
+
+@batch_router.post("", response_model=BatchResponse)
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    credentials=Depends(security),
+    current_user=Depends(get_current_user_async_dependency),
+):
+    """Run several API calls in one round trip.
+
+    The caller is authenticated once for the whole batch. Consecutive reads
+    (GET/HEAD) run concurrently, up to BATCH_CONCURRENCY at a time; any
+    other method runs alone, in order, after the reads before it. Each
+    sub-request gets its own status, headers and body.
+    """
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_REQUESTS} requests per batch",
+        )
+
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def run_limited(item: BatchRequestItem) -> BatchResponseItem:
+        async with semaphore:
+            return await _run(request, item)
+
+    responses: List[BatchResponseItem] = []
+    with reuse_current_user(credentials.credentials, current_user):
+        index = 0
+        while index < len(batch.requests):
+            item = batch.requests[index]
+            if item.method not in _READ_METHODS:
+                responses.append(await _run(request, item))
+                index += 1
+                continue
+            reads = []
+            while index < len(batch.requests) and batch.requests[index].method in _READ_METHODS:
+                reads.append(batch.requests[index])
+                index += 1
+            responses.extend(await asyncio.gather(*(run_limited(read) for read in reads)))
+    return {"responses": responses}
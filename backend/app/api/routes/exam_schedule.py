@@ -1,25 +1,52 @@
-from typing import Optional
+import asyncio
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from ...core.cache import cache_response
+from ...core.compression import Precompressed, exam_paper_cache
+from ...core.conditional import Conditional
+from ...core.config import settings
 from ...core.constants import UserRole
+from ...core.fields import Fields, sparse_fields, sparse_model, sparse_response
 from ...core.security import security
 from ...core.permissions import check_exam_management_permission
-from ...db.database import get_db
-from ...services.auth import get_current_user
-from ...schemas.exam_schedule import ExamScheduleCreate, ExamScheduleOut, ExamScheduleUpdate, ExamSchedulePaginationOut
+from ...core.responses import FastResponse, encode_response, negotiated_media_type
+from ...db.database import get_async_db, get_db
+from ...db.loader import BatchLoader, get_loader
+from ...db.release import EarlyReleaseRoute
+from ...db.replica import replica_reads
+from ...models.exam_schedule import ExamSchedule
+from ...services.auth import get_current_user, get_current_user_async
+from ...schemas.exam_schedule import (
+    ExamScheduleCreate,
+    ExamScheduleOut,
+    ExamScheduleUpdate,
+    ExamSchedulePaginationOut,
+    StudentHomeOut,
+)
 from ...schemas.user import PaginatedResponse
 from ...services.exam_schedule_service import (
     create_schedule,
     get_schedule_by_id,
+    get_schedule_detail,
+    get_schedules_version,
     get_schedules_with_pagination,
+    get_student_home,
     update_schedule,
     deactivate_schedule,
     delete_schedule,
+    get_paper_version,
+    get_schedule_with_exam,
 )
+from ...services.proctoring_service import ProctoringService
 
-exam_schedule_router = APIRouter(prefix="/exam_schedules", tags=["Exam Schedules"])
+exam_schedule_router = APIRouter(prefix="/exam_schedules", tags=["Exam Schedules"], route_class=EarlyReleaseRoute)
 
 def get_current_user_dependency(
     credentials=Depends(security), db: Session = Depends(get_db)
@@ -28,6 +55,28 @@ def get_current_user_dependency(
     return get_current_user(db, credentials.credentials)
 
 
+async def get_current_user_async_dependency(
+    credentials=Depends(security), db: AsyncSession = Depends(get_async_db)
+):
+    """Dependency to get current user from token (async routes)"""
+    return await get_current_user_async(db, credentials.credentials)
+
+
+def build_schedules_out(
+    loader: BatchLoader, schedules: List[ExamSchedule], fields: Fields = None
+) -> List[ExamScheduleOut]:
+    """Schedule items with their exam's title (one query for all exams)"""
+    schema = sparse_model(ExamScheduleOut, fields)
+    if fields is not None and "exam_title" not in fields:
+        return [schema.model_validate(schedule) for schedule in schedules]
+    loader.load_related(schedules, ExamSchedule.exam)
+    return [
+        schema.model_validate(schedule).model_copy(
+            update={"exam_title": schedule.exam.title if schedule.exam else None}
+        )
+        for schedule in schedules
+    ]
+
 
 @exam_schedule_router.post("/", response_model=ExamScheduleOut, status_code=status.HTTP_201_CREATED)
 def create_exam_schedule(
@@ -40,123 +89,191 @@ def create_exam_schedule(
     return create_schedule(db, schedule_in)
 
 
-@exam_schedule_router.get("/", response_model=PaginatedResponse[ExamScheduleOut])
+@exam_schedule_router.get(
+    "/",
+    response_model=PaginatedResponse[ExamScheduleOut],
+    dependencies=[Depends(replica_reads)],
+)
 def get_exam_schedules(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     size: int = Query(10, ge=1, le=100, description="Number of records per page"),
     search: Optional[str] = Query(None, description="Search in title or description"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     exam_id: Optional[int] = Query(None),
+    fields: Fields = Depends(sparse_fields(ExamScheduleOut)),
     db: Session = Depends(get_db),
+    loader: BatchLoader = Depends(get_loader),
     current_user=Depends(get_current_user_dependency), 
 ):
     """Get exam schedules with pagination (teacher/admin only)"""
     check_exam_management_permission(current_user)
+    conditional = Conditional(
+        request,
+        get_schedules_version(db, search=search, is_active=is_active, exam_id=exam_id),
+        last_modified=False,
+    )
+    if conditional.matches():
+        return conditional.not_modified()
+
     skip = (page - 1) * size
-    result = get_schedules_with_pagination(db, skip=skip, limit=size, search=search, is_active=is_active, exam_id=exam_id)
-    return result
+    result = get_schedules_with_pagination(
+        db, skip=skip, limit=size, search=search, is_active=is_active, exam_id=exam_id, fields=fields
+    )
+    result["data"] = build_schedules_out(loader, result["data"], fields)
+    response_type = sparse_response(PaginatedResponse[ExamScheduleOut], ExamScheduleOut, fields)
+    return conditional.apply(encode_response(response_type, result, db=db))
 
-@exam_schedule_router.get("/pagination", response_model=ExamSchedulePaginationOut)
+@exam_schedule_router.get(
+    "/pagination",
+    response_model=ExamSchedulePaginationOut,
+    dependencies=[Depends(replica_reads)],
+)
 def list_exam_schedules_with_pagination(
+    request: Request,
     db: Session = Depends(get_db),
+    loader: BatchLoader = Depends(get_loader),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     search: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
+    fields: Fields = Depends(sparse_fields(ExamScheduleOut)),
 ):
-    result = get_schedules_with_pagination(db, skip=skip, limit=limit, search=search, is_active=is_active)
-    result["data"] = [ExamScheduleOut.model_validate(s) for s in result["data"]]
-    return result
+    conditional = Conditional(
+        request, get_schedules_version(db, search=search, is_active=is_active), last_modified=False
+    )
+    if conditional.matches():
+        return conditional.not_modified()
+
+    result = get_schedules_with_pagination(
+        db, skip=skip, limit=limit, search=search, is_active=is_active, fields=fields
+    )
+    result["data"] = build_schedules_out(loader, result["data"], fields)
+    response_type = sparse_response(ExamSchedulePaginationOut, ExamScheduleOut, fields)
+    return conditional.apply(encode_response(response_type, result, db=db))
 
-@exam_schedule_router.get("/student/available", response_model=ExamSchedulePaginationOut)
+@exam_schedule_router.get(
+    "/student/available",
+    response_model=ExamSchedulePaginationOut,
+    dependencies=[Depends(replica_reads)],
+)
+@cache_response(tags=["schedules", "exams"])
 def get_available_exam_schedules_for_students(
+    request: Request,
     db: Session = Depends(get_db),
+    loader: BatchLoader = Depends(get_loader),
     current_user=Depends(get_current_user_dependency),
     skip: int = Query(0, ge=0),
     limit: int = Query(1000, ge=1, le=1000),
+    fields: Fields = Depends(sparse_fields(ExamScheduleOut)),
 ):
     """Get available exam schedules for students (authenticated users only)"""
     # Students can see active exam schedules
-    result = get_schedules_with_pagination(db, skip=skip, limit=limit, is_active=True)
-    result["data"] = [ExamScheduleOut.model_validate(s) for s in result["data"]]
-    return result
+    # Sinh viên tải lại trang liên tục: trả 304 khi danh sách chưa đổi
+    conditional = Conditional(request, get_schedules_version(db, is_active=True), last_modified=False)
+    if conditional.matches():
+        return conditional.not_modified()
+
+    result = get_schedules_with_pagination(db, skip=skip, limit=limit, is_active=True, fields=fields)
+    result["data"] = build_schedules_out(loader, result["data"], fields)
+    response_type = sparse_response(ExamSchedulePaginationOut, ExamScheduleOut, fields)
+    return conditional.apply(encode_response(response_type, result, db=db))
+
+@exam_schedule_router.get("/student/home", response_model=StudentHomeOut)
+def get_student_home_schedules(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Running and upcoming schedules with your attempts left and any exam to resume"""
+    # Không đọc replica: ngay sau khi nộp bài, bản sao có thể chưa có lượt vừa làm
+    return encode_response(StudentHomeOut, get_student_home(db, current_user.id), db=db)
 
-@exam_schedule_router.get("/{schedule_id}", response_model=ExamScheduleOut)
+@exam_schedule_router.get(
+    "/{schedule_id}",
+    response_model=ExamScheduleOut,
+    dependencies=[Depends(replica_reads)],
+)
+@cache_response(tags=["schedule:{schedule_id}", "exams"])
 def get_exam_schedule(
     schedule_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency)
 ):
     """Get exam schedule by ID (authenticated users only)"""
-    schedule = get_schedule_by_id(db, schedule_id)
-    if not schedule:
+    detail = get_schedule_detail(db, schedule_id)
+    if detail is None:
         raise HTTPException(status_code=404, detail="Exam schedule not found")
-    return schedule
+    version, schedule_out = detail
+    conditional = Conditional(request, version)
+    if conditional.matches():
+        return conditional.not_modified()
+    return conditional.apply(encode_response(ExamScheduleOut, schedule_out, db=db))
 
 
-@exam_schedule_router.get("/{schedule_id}/with-exam")
-def get_exam_schedule_with_exam(
+@exam_schedule_router.get("/{schedule_id}/live")
+async def stream_exam_schedule_activity(
     schedule_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user_dependency)
+    current_user=Depends(get_current_user_dependency),
+):
+    """Live started/answering/submitted counters as server-sent events (teacher/admin only)"""
+    check_exam_management_permission(current_user)
+    if not await run_in_threadpool(get_schedule_by_id, db, schedule_id):
+        raise HTTPException(status_code=404, detail="Exam schedule not found")
+
+    queue = ProctoringService.subscribe(schedule_id)
+    try:
+        await run_in_threadpool(ProctoringService.ensure_seeded, db, schedule_id)
+    except Exception:
+        ProctoringService.unsubscribe(schedule_id, queue)
+        raise
+    ProctoringService.prime(schedule_id, queue)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(
+                        queue.get(), timeout=settings.PROCTORING_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            ProctoringService.unsubscribe(schedule_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@exam_schedule_router.get("/{schedule_id}/with-exam")
+async def get_exam_schedule_with_exam(
+    schedule_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async_dependency),
 ):
     """Get exam schedule with exam details for students"""
-    from ...models.exam_schedule import ExamSchedule
-    from ...models.exam import Exam, ExamQuestion
-    from ...models.question import Question
+    version = await get_paper_version(db, schedule_id)
+    if version is None:
+        # Raises the matching 404
+        return await get_schedule_with_exam(db, schedule_id)
+    # Removing a question does not move any timestamp: ETag only
+    conditional = Conditional(request, version, last_modified=False)
+    if conditional.matches():
+        return conditional.not_modified()
 
-    # Get exam schedule with exam
-    schedule = db.query(ExamSchedule).filter(ExamSchedule.id == schedule_id).first()
-    if not schedule:
-        raise HTTPException(status_code=404, detail="Exam schedule not found")
+    # Cả lớp tải cùng một đề: biên dịch và nén một lần cho mỗi phiên bản đề
+    async def build() -> Precompressed:
+        paper = await get_schedule_with_exam(db, schedule_id)
+        return Precompressed.from_response(FastResponse(jsonable_encoder(paper)))
 
-    # Get exam with questions
-    exam = db.query(Exam).filter(Exam.id == schedule.exam_id).first()
-    if not exam:
-        raise HTTPException(status_code=404, detail="Exam not found")
-
-    # Get questions for this exam
-    exam_questions = db.query(ExamQuestion).filter(
-        ExamQuestion.exam_id == exam.id
-    ).order_by(ExamQuestion.question_order).all()
-
-    questions = []
-    for eq in exam_questions:
-        question = db.query(Question).filter(Question.id == eq.question_id).first()
-        if question:
-            questions.append({
-                "id": question.id,
-                "content": question.content,
-                "content_img": question.content_img,
-                "choiceA": question.choiceA,
-                "choiceB": question.choiceB,
-                "choiceC": question.choiceC,
-                "choiceD": question.choiceD,
-                "answer": question.answer,
-                "mark": question.mark,
-                "unit": question.unit,
-                "subject": question.subject,
-                "question_order": eq.question_order
-            })
-
-    return {
-        "schedule": {
-            "id": schedule.id,
-            "title": schedule.title,
-            "description": schedule.description,
-            "exam_id": schedule.exam_id,
-            "start_time": schedule.start_time,
-            "end_time": schedule.end_time,
-            "is_active": schedule.is_active
-        },
-        "exam": {
-            "id": exam.id,
-            "title": exam.title,
-            "description": exam.description,
-            "questions": questions,
-            "duration": exam.duration
-        }
-    }
+    key = ("exam-paper", schedule_id, version, negotiated_media_type())
+    paper = await exam_paper_cache.get(key, build)
+    return conditional.apply(await paper.response(request.headers.get("accept-encoding", "")))
 
 @exam_schedule_router.put("/{schedule_id}", response_model=ExamScheduleOut)
 def update_exam_schedule(
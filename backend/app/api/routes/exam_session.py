@@ -0,0 +1,218 @@
+"""
+WebSocket channel for a student taking an exam.
+
+Protocol (JSON frames):
+  server -> {"type": "session", "remaining_seconds", "deadline", "seq", "answers"}
+            sent on (re)connect; ``seq`` is the last applied answer frame
+  client -> {"type": "answer", "seq": n, "question_id": q, "option": "A"}
+            ``option`` may be empty to clear; ``seq`` must increase
+  server -> {"type": "ack", "seq": n}  (cumulative: every frame <= n is saved)
+  server -> {"type": "time", "remaining_seconds"}  (periodically)
+  client -> {"type": "submit"}
+  server -> {"type": "submitted", "submission": {...}}  (also sent on timeout)
+  server -> {"type": "error", "detail"}
+
+After a reconnect the client resends its unacknowledged frames; frames
+already applied are acknowledged again without being saved twice.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+
+from ...core.config import settings
+from ...core.constants import UserRole
+from ...db.database import AsyncSessionLocal
+from ...services.auth import get_current_user_async
+from ...services.exam_session_service import ExamSessionService
+
+logger = logging.getLogger(__name__)
+
+exam_session_router = APIRouter(prefix="/submissions", tags=["Exam Session"])
+
+
+async def _in_new_session(fn, *args):
+    """Run a service call on its own short-lived async DB session"""
+    async with AsyncSessionLocal() as db:
+        return await fn(db, *args)
+
+
+async def _authenticate(db, token: str, submission_id: int) -> Dict[str, Any]:
+    # Xác thực một lần khi mở kết nối, không lặp lại cho từng frame
+    current_user = await get_current_user_async(db, token)
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can submit exams",
+        )
+    return await ExamSessionService.open_session(db, submission_id, current_user.id)
+
+
+class ExamSessionChannel:
+    """One connected exam session: answer frames in, acks and time out"""
+
+    def __init__(self, websocket: WebSocket, state: Dict[str, Any]):
+        self.websocket = websocket
+        self.state = state
+        self.submission = None
+        self._send_lock = asyncio.Lock()
+        self._submit_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def run(self) -> None:
+        await self.send(
+            {
+                "type": "session",
+                "submission_id": self.state["submission_id"],
+                "remaining_seconds": ExamSessionService.remaining_seconds(
+                    self.state["deadline"]
+                ),
+                "deadline": self.state["deadline"].isoformat(),
+                "seq": self.state["seq"],
+                "answers": self.state["answers"],
+            }
+        )
+
+        tasks = {
+            asyncio.create_task(self.receive_frames()),
+            asyncio.create_task(self.push_time()),
+        }
+        try:
+            done, pending = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.exception("Exam session failed", exc_info=error)
+        await self.close()
+
+    async def close(self, code: int = status.WS_1000_NORMAL_CLOSURE) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except RuntimeError:
+            # Client already went away
+            pass
+
+    async def push_time(self) -> None:
+        """Send the authoritative remaining time; auto-submit at the deadline"""
+        while True:
+            remaining = ExamSessionService.remaining_seconds(self.state["deadline"])
+            await self.send({"type": "time", "remaining_seconds": remaining})
+            if remaining <= 0:
+                await self.submit()
+                return
+            await asyncio.sleep(min(settings.EXAM_SESSION_TIME_SYNC_SECONDS, remaining))
+
+    async def receive_frames(self) -> None:
+        while True:
+            try:
+                frame = json.loads(await self.websocket.receive_text())
+            except ValueError:
+                await self.send({"type": "error", "detail": "Invalid JSON frame"})
+                continue
+            if not isinstance(frame, dict):
+                await self.send({"type": "error", "detail": "Invalid frame"})
+                continue
+
+            frame_type = frame.get("type")
+            if frame_type == "answer":
+                if not await self.apply_answer(frame):
+                    return
+            elif frame_type == "submit":
+                await self.submit()
+                return
+            elif frame_type == "time":
+                await self.send(
+                    {
+                        "type": "time",
+                        "remaining_seconds": ExamSessionService.remaining_seconds(
+                            self.state["deadline"]
+                        ),
+                    }
+                )
+            else:
+                await self.send({"type": "error", "detail": "Unknown frame type"})
+
+    async def apply_answer(self, frame: Dict[str, Any]) -> bool:
+        """Save one answer delta; returns False if the session must end"""
+        seq = frame.get("seq")
+        question_id = frame.get("question_id")
+        option = frame.get("option") or ""
+        if (
+            not isinstance(seq, int)
+            or not isinstance(question_id, int)
+            or not isinstance(option, str)
+        ):
+            await self.send({"type": "error", "detail": "Invalid answer frame"})
+            return True
+
+        if seq <= self.state["seq"]:
+            # Resent after a reconnect: already saved
+            await self.send({"type": "ack", "seq": self.state["seq"]})
+            return True
+
+        answers = dict(self.state["answers"])
+        if option:
+            answers[str(question_id)] = option
+        else:
+            answers.pop(str(question_id), None)
+
+        saved = await _in_new_session(
+            ExamSessionService.save_answers,
+            self.state["submission_id"],
+            seq,
+            answers,
+        )
+        if not saved:
+            await self.send(
+                {
+                    "type": "error",
+                    "detail": "Session was submitted or continued on another connection",
+                }
+            )
+            return False
+
+        self.state["answers"] = answers
+        self.state["seq"] = seq
+        await self.send({"type": "ack", "seq": seq})
+        return True
+
+    async def submit(self) -> None:
+        async with self._submit_lock:
+            if self.submission is None:
+                self.submission = await _in_new_session(
+                    ExamSessionService.submit,
+                    self.state["submission_id"],
+                    self.state["answers"],
+                    self.state["deadline"],
+                )
+            await self.send({"type": "submitted", "submission": self.submission})
+
+
+@exam_session_router.websocket("/{submission_id}/session")
+async def exam_session(
+    websocket: WebSocket,
+    submission_id: int,
+    token: str = Query(..., description="Access token (browsers cannot set headers)"),
+):
+    """Live exam session: remaining time, answer autosave and submit"""
+    await websocket.accept()
+    try:
+        state = await _in_new_session(_authenticate, token, submission_id)
+    except HTTPException as error:
+        await websocket.send_json({"type": "error", "detail": error.detail})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await ExamSessionChannel(websocket, state).run()
@@ -1,16 +1,23 @@
 import math
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
+from ...core.cache import cache_response
+from ...core.conditional import Conditional
 from ...core.constants import UserRole
+from ...core.fields import Fields, sparse_fields, sparse_model, sparse_response
 from ...core.security import security
 from ...core.permissions import check_exam_management_permission
-from ...models.exam_schedule import ExamSchedule
+from ...core.responses import encode_response
+from ...core.singleflight import single_flight
 from ...schemas.exam_schedule import ExamScheduleOut
-from datetime import datetime, timedelta
 from ...db.database import get_db
+from ...db.loader import BatchLoader, get_loader
+from ...db.release import EarlyReleaseRoute
+from ...db.replica import replica_reads
+from ...models.exam import Exam
 from ...schemas.exam import (
     ExamCreate,
     ExamDetailResponse,
@@ -27,16 +34,19 @@ from ...services.exam_service import (
     generate_exam_from_questions,
     get_exam_by_code,
     get_exam_by_id,
+    get_exam_version,
     get_exam_with_questions,
     get_exams,
     get_exams_count,
+    get_exams_version,
     get_subjects,
     restore_exam,
     soft_delete_exam,
     update_exam,
 )
+from ...services.exam_schedule_service import get_or_create_exam_session
 
-router = APIRouter(prefix="/exams", tags=["exams"])
+router = APIRouter(prefix="/exams", tags=["exams"], route_class=EarlyReleaseRoute)
 
 def get_current_user_dependency(
     credentials=Depends(security), db: Session = Depends(get_db)
@@ -45,6 +55,20 @@ def get_current_user_dependency(
     return get_current_user(db, credentials.credentials)
 
 
+def build_exams_out(loader: BatchLoader, exams: List[Exam], fields: Fields = None) -> List[ExamOut]:
+    """Exam list items with the creator's username (one query for all creators)"""
+    schema = sparse_model(ExamOut, fields)
+    if fields is not None and "creator_username" not in fields:
+        return [schema.model_validate(exam) for exam in exams]
+    loader.load_related(exams, Exam.creator)
+    return [
+        schema.model_validate(exam).model_copy(
+            update={"creator_username": exam.creator.username if exam.creator else None}
+        )
+        for exam in exams
+    ]
+
+
 
 
 
@@ -99,13 +123,20 @@ def generate_exam(
     return new_exam
 
 
-@router.get("/", response_model=PaginatedResponse[ExamOut])
+@router.get(
+    "/",
+    response_model=PaginatedResponse[ExamOut],
+    dependencies=[Depends(replica_reads)],
+)
 def get_exams_list(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
     subject: Optional[str] = Query(None, description="Filter by subject"),
     created_by: Optional[int] = Query(None, description="Filter by creator"),
+    fields: Fields = Depends(sparse_fields(ExamOut)),
     db: Session = Depends(get_db),
+    loader: BatchLoader = Depends(get_loader),
     current_user=Depends(get_current_user_dependency),
 ):
     """Get list of exams with pagination (teacher/admin only)"""
@@ -115,6 +146,14 @@ def get_exams_list(
     if current_user.role != UserRole.ADMIN:
         created_by = current_user.id
 
+    conditional = Conditional(
+        request,
+        (created_by,) + get_exams_version(db, subject=subject, created_by=created_by),
+        last_modified=False,
+    )
+    if conditional.matches():
+        return conditional.not_modified()
+
     skip = (page - 1) * page_size
     exams = get_exams(
         db=db,
@@ -122,6 +161,7 @@ def get_exams_list(
         limit=page_size,
         subject=subject,
         created_by=created_by,
+        fields=fields,
     )
 
     total_count = get_exams_count(
@@ -132,36 +172,72 @@ def get_exams_list(
 
     total_pages = math.ceil(total_count / page_size)
 
-    return PaginatedResponse(
-        data=exams,
-        pagination=PaginationInfo(
-            page=page,
-            size=page_size,
-            total=total_count,
-            pages=total_pages,
-        )
+    response = encode_response(
+        sparse_response(PaginatedResponse[ExamOut], ExamOut, fields),
+        PaginatedResponse(
+            data=build_exams_out(loader, exams, fields),
+            pagination=PaginationInfo(
+                page=page,
+                size=page_size,
+                total=total_count,
+                pages=total_pages,
+            ),
+        ),
+        db=db,
     )
+    return conditional.apply(response)
 
 
-@router.get("/subjects", response_model=List[str])
+@router.get(
+    "/subjects",
+    response_model=List[str],
+    dependencies=[Depends(replica_reads)],
+)
+@cache_response(tags=["questions"])
 def get_available_subjects(
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
     """Get list of available subjects (teacher/admin only)"""
     check_exam_management_permission(current_user)
-    return get_subjects(db)
+    return encode_response(List[str], get_subjects(db), db=db)
 
 
-@router.get("/{exam_id}", response_model=ExamDetailResponse)
+@router.get(
+    "/{exam_id}",
+    response_model=ExamDetailResponse,
+    dependencies=[Depends(replica_reads)],
+)
+# Teachers only see their own exams: cached per user
+@cache_response(tags=["exam:{exam_id}", "questions"], per_user=True)
 def get_exam_detail(
     exam_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
     """Get exam details with questions (teacher/admin only)"""
     check_exam_management_permission(current_user)
 
+    owner_version = get_exam_version(db, exam_id)
+    if owner_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Exam not found",
+        )
+    created_by, version = owner_version
+    # Ownership is checked before answering 304 too
+    if current_user.role != UserRole.ADMIN and created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access your own exams",
+        )
+    # Removing a question does not move any timestamp: ETag only
+    conditional = Conditional(request, version, last_modified=False)
+    if conditional.matches():
+        return conditional.not_modified()
+
     exam = get_exam_with_questions(db, exam_id)
     if not exam:
         raise HTTPException(
@@ -214,7 +290,7 @@ def get_exam_detail(
     # Sort questions by order
     questions.sort(key=lambda x: x.question_order)
 
-    return ExamDetailResponse(
+    detail = ExamDetailResponse(
         id=exam.id,
         code=exam.code,
         title=exam.title,
@@ -230,6 +306,7 @@ def get_exam_detail(
         questions=questions,
         creator_username=exam.creator.username if exam.creator else None,
     )
+    return conditional.apply(encode_response(ExamDetailResponse, detail, db=db))
 
 
 @router.put("/{exam_id}", response_model=ExamOut)
@@ -338,47 +415,9 @@ def start_exam_for_student(
     current_user=Depends(get_current_user_dependency),
 ):
     """Start exam for student - creates exam schedule if not exists"""
-
-    # Check if exam exists
-    exam = get_exam_by_id(db, exam_id)
-    if not exam:
-        raise HTTPException(status_code=404, detail="Exam not found")
-
-    # Check if there's already an active exam schedule for this exam
-    existing_schedule = db.query(ExamSchedule).filter(
-        ExamSchedule.exam_id == exam_id,
-        ExamSchedule.is_active == True
-    ).first()
-
-    if existing_schedule:
-        # Check if it's still within time
-        now = datetime.now()
-        if existing_schedule.start_time <= now <= existing_schedule.end_time:
-            return {"data": ExamScheduleOut.model_validate(existing_schedule)}
-        elif now > existing_schedule.end_time:
-            raise HTTPException(
-                status_code=400,
-                detail="Exam time has expired"
-            )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Exam will start at {existing_schedule.start_time.strftime('%Y-%m-%d %H:%M:%S')}"
-            )
-
-    # Create new exam schedule
-    now = datetime.now()
-    exam_schedule = ExamSchedule(
-        title=f"Bài thi: {exam.title}",
-        description=f"Bài thi {exam.title} - Thời gian: 60 phút",
-        exam_id=exam_id,
-        start_time=now,
-        end_time=now + timedelta(minutes=60),  # 60 minutes duration
-        is_active=True
+    # Concurrent starts of the same exam share one lookup/creation
+    schedule = single_flight.do(
+        ("start-exam", exam_id),
+        lambda: get_or_create_exam_session(db, exam_id),
     )
-
-    db.add(exam_schedule)
-    db.commit()
-    db.refresh(exam_schedule)
-
-    return {"data": ExamScheduleOut.model_validate(exam_schedule)}
+    return {"data": schedule}
@@ -9,19 +9,27 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Request,
+    Response,
     UploadFile,
     status,
 )
 from sqlalchemy.orm import Session
 
+from ...core.cache import cache_response
+from ...core.conditional import Conditional
 from ...core.constants import UserRole
+from ...core.fields import Fields, sparse_fields, sparse_response
 from ...core.security import security
 from ...core.permissions import (
     check_question_edit_permission,
     check_question_import_permission,
     check_question_view_permission,
 )
+from ...core.responses import encode_response
 from ...db.database import get_db
+from ...db.release import EarlyReleaseRoute
+from ...db.replica import replica_reads
 from ...schemas.question import QuestionCreate, QuestionOut, QuestionUpdate
 from ...schemas.user import BaseResponse, MessageResponse, PaginatedResponse
 from ...services.auth import get_current_user
@@ -30,6 +38,8 @@ from ...services.question_service import (
     delete_question,
     get_question,
     get_question_by_id,
+    get_question_version,
+    get_questions_version,
     get_questions_with_pagination,
     get_subjects,
     import_data,
@@ -37,7 +47,7 @@ from ...services.question_service import (
     update_question,
 )
 
-router = APIRouter(prefix="/questions", tags=["questions"])
+router = APIRouter(prefix="/questions", tags=["questions"], route_class=EarlyReleaseRoute)
 
 
 def get_current_user_dependency(
@@ -89,25 +99,38 @@ async def read_docx(
 # CRUD Endpoints
 
 
-@router.get("/", response_model=PaginatedResponse[QuestionOut])
+@router.get(
+    "/",
+    response_model=PaginatedResponse[QuestionOut],
+    dependencies=[Depends(replica_reads)],
+)
 def get_questions(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     size: int = Query(10, ge=1, le=100, description="Number of records per page"),
     search: Optional[str] = Query(
         None, description="Search in content, code, or subject"
     ),
     subject: Optional[str] = Query(None, description="Filter by subject"),
+    fields: Fields = Depends(sparse_fields(QuestionOut)),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
     """Get questions with pagination (Admin/Teacher/Editor/Importer only)"""
     check_question_view_permission(current_user)
 
+    conditional = Conditional(
+        request, get_questions_version(db, search=search, subject=subject), last_modified=False
+    )
+    if conditional.matches():
+        return conditional.not_modified()
+
     skip = (page - 1) * size
     result = get_questions_with_pagination(
-        db, skip=skip, limit=size, search=search, subject=subject
+        db, skip=skip, limit=size, search=search, subject=subject, fields=fields
     )
-    return result
+    response_type = sparse_response(PaginatedResponse[QuestionOut], QuestionOut, fields)
+    return conditional.apply(encode_response(response_type, result, db=db))
 
 
 @router.post("/", response_model=BaseResponse[QuestionOut])
@@ -123,20 +146,36 @@ def create_new_question(
     return {"data": db_question}
 
 
-@router.get("/{question_id}", response_model=BaseResponse[QuestionOut])
+@router.get(
+    "/{question_id}",
+    response_model=BaseResponse[QuestionOut],
+    dependencies=[Depends(replica_reads)],
+)
 def get_question_detail(
     question_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
     """Get question by ID (Admin/Teacher/Editor/Importer only)"""
     check_question_view_permission(current_user)
 
+    version = get_question_version(db, question_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Question not found"
+        )
+    conditional = Conditional(request, version)
+    if conditional.matches():
+        return conditional.not_modified()
+
     question = get_question_by_id(db, question_id)
     if not question:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Question not found"
         )
+    conditional.apply(response)
     return {"data": question}
 
 
@@ -175,8 +214,14 @@ def delete_question_endpoint(
     return {"data": {"message": "Question deleted successfully"}}
 
 
-@router.get("/subjects/list", response_model=BaseResponse[List[str]])
+@router.get(
+    "/subjects/list",
+    response_model=BaseResponse[List[str]],
+    dependencies=[Depends(replica_reads)],
+)
+@cache_response(tags=["questions"])
 def get_subjects_list(
+    request: Request,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
@@ -184,7 +229,7 @@ def get_subjects_list(
     check_question_view_permission(current_user)
 
     subjects = get_subjects(db)
-    return {"data": subjects}
+    return encode_response(BaseResponse[List[str]], {"data": subjects}, db=db)
 
 
 # Legacy endpoints for backward compatibility
@@ -1,17 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import csv
+import io
+import tempfile
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from ...core.config import settings
 from ...core.constants import UserRole
+from ...core.fields import Fields, sparse_fields, sparse_response
 from ...core.security import security
-from ...core.permissions import check_user_permission
-from ...db.database import get_db
-from ...services.auth import get_current_user
-from ...schemas.submission import SubmissionCreate, SubmissionOut
+from ...core.singleflight import async_single_flight
+from ...core.permissions import check_teacher_or_admin, check_user_permission
+from ...core.responses import encode_response
+from ...db.database import (
+    SessionLocal,
+    async_statement_timeout,
+    get_async_db,
+    get_db,
+    set_statement_timeout,
+    statement_timeout,
+)
+from ...db.release import EarlyReleaseRoute
+from ...db.replica import replica_reads, use_replica
+from ...services.auth import get_current_user, get_current_user_async
+from ...services.exam_schedule_service import get_exam_data
+from ...schemas.submission import (
+    SubmissionBrowsePage,
+    SubmissionCreate,
+    SubmissionListItem,
+    SubmissionOut,
+)
 from ...schemas.user import BaseResponse, PaginatedResponse
-from ...services.submission_service import create_submission, get_submissions_by_student
+from ...services.idempotency_service import IdempotencyService, run_idempotent
+from ...services.submission_service import (
+    GRADEBOOK_COLUMNS,
+    create_submission,
+    get_submissions_by_student,
+    get_submissions_page,
+    grade_submission,
+    iter_gradebook_rows,
+    mark_submitted,
+    start_submission,
+)
 
-submission_router = APIRouter(prefix="/submissions", tags=["Submissions"])
+submission_router = APIRouter(prefix="/submissions", tags=["Submissions"], route_class=EarlyReleaseRoute)
 
 
 def get_current_user_dependency(
@@ -21,6 +57,12 @@ def get_current_user_dependency(
     return get_current_user(db, credentials.credentials)
 
 
+async def get_current_user_async_dependency(
+    credentials=Depends(security), db: AsyncSession = Depends(get_async_db)
+):
+    """Dependency to get current user from token (async routes)"""
+    return await get_current_user_async(db, credentials.credentials)
+
 def check_student_permission(current_user):
     """Check if user is student (only students can submit exams)"""
     check_user_permission(
@@ -39,79 +81,208 @@ def check_submission_view_permission(current_user):
     )
 
 
-@submission_router.post("/start", response_model=BaseResponse[SubmissionOut], status_code=status.HTTP_201_CREATED)
-def start_exam_submission(
+@submission_router.post(
+    "/start",
+    response_model=BaseResponse[SubmissionOut],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(async_statement_timeout(settings.DB_HOT_PATH_STATEMENT_TIMEOUT_MS))],
+)
+async def start_exam_submission(
     exam_schedule_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async_dependency),
 ):
     """Start exam - create initial submission (students only)"""
     check_student_permission(current_user)
 
-    # Check how many submissions student already has for this exam schedule
-    from ...models.submission import Submission
-    from ...models.exam_schedule import ExamSchedule
-
-    # Get exam schedule to check max_attempts
-    exam_schedule = db.query(ExamSchedule).filter(ExamSchedule.id == exam_schedule_id).first()
-    if not exam_schedule:
-        raise HTTPException(status_code=404, detail="Exam schedule not found")
-
-    # Count existing submissions
-    submission_count = db.query(Submission).filter(
-        Submission.student_id == current_user.id,
-        Submission.exam_schedule_id == exam_schedule_id
-    ).count()
-
-    max_attempts = exam_schedule.max_attempts or 1
-
-    # Check if student has exceeded max attempts
-    if submission_count >= max_attempts:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Maximum attempts ({max_attempts}) exceeded"
-        )
-
-    # Create new submission with empty answers
-    submission_data = SubmissionCreate(
-        exam_schedule_id=exam_schedule_id,
-        answers="[]"  # Empty answers initially
+    # Identical concurrent starts (double clicks, retries) share one insert
+    submission = await async_single_flight.do(
+        ("start-submission", current_user.id, exam_schedule_id),
+        lambda: db.run_sync(start_submission, current_user.id, exam_schedule_id),
     )
-
-    submission = create_submission(db, current_user.id, submission_data)
     return {"data": submission}
 
 
-@submission_router.post("/", response_model=BaseResponse[SubmissionOut], status_code=status.HTTP_201_CREATED)
+@submission_router.post(
+    "/",
+    response_model=BaseResponse[SubmissionOut],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(statement_timeout(settings.DB_HOT_PATH_STATEMENT_TIMEOUT_MS))],
+)
 def submit_exam(
     submission_in: SubmissionCreate,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
     """Submit exam (students only)"""
     check_student_permission(current_user)
-    submission = create_submission(db, current_user.id, submission_in)
-    return {"data": submission}
 
-@submission_router.get("/", response_model=BaseResponse[List[SubmissionOut]])
+    def handler():
+        submission = create_submission(db, current_user.id, submission_in)
+        return status.HTTP_201_CREATED, {"data": SubmissionOut.model_validate(submission)}
+
+    return run_idempotent(
+        db,
+        current_user.id,
+        idempotency_key,
+        IdempotencyService.fingerprint("POST", "/submissions/", submission_in),
+        handler,
+    )
+
+@submission_router.get(
+    "/",
+    response_model=BaseResponse[List[SubmissionOut]],
+    dependencies=[Depends(replica_reads)],
+)
 def get_my_submissions(
+    fields: Fields = Depends(sparse_fields(SubmissionOut)),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
     """Get my submissions (students can view their own, admin/teacher can view all)"""
     check_submission_view_permission(current_user)
 
-    # Students can only see their own submissions
-    if current_user.role == UserRole.STUDENT:
-        submissions = get_submissions_by_student(db, current_user.id)
-    else:
-        # Admin and teachers can see all submissions (you may want to implement this service method)
-        submissions = get_submissions_by_student(db, current_user.id)  # For now, same logic
+    # Everyone sees their own submissions here; admin and teachers browse
+    # other students' submissions through /submissions/browse
+    submissions = get_submissions_by_student(db, current_user.id, fields=fields)
+
+    response_type = sparse_response(BaseResponse[List[SubmissionOut]], SubmissionOut, fields)
+    return encode_response(response_type, {"data": submissions}, db=db)
+
+
+@submission_router.get(
+    "/browse",
+    response_model=SubmissionBrowsePage,
+    dependencies=[Depends(replica_reads)],
+)
+def browse_submissions(
+    exam_schedule_id: Optional[int] = Query(None, description="Filter by exam schedule"),
+    exam_id: Optional[int] = Query(None, description="Filter by exam"),
+    student: Optional[str] = Query(None, description="Search by student username"),
+    graded: Optional[bool] = Query(None, description="Only graded / ungraded submissions"),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=500, description="Number of records per page"),
+    fields: Fields = Depends(sparse_fields(SubmissionListItem)),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Browse submissions, newest first (teacher/admin only)"""
+    check_teacher_or_admin(current_user)
+
+    page = get_submissions_page(
+        db,
+        exam_schedule_id=exam_schedule_id,
+        exam_id=exam_id,
+        created_by=_created_by_filter(current_user),
+        student_search=student,
+        graded=graded,
+        cursor=cursor,
+        limit=limit,
+        fields=fields,
+    )
+    response_type = sparse_response(SubmissionBrowsePage, SubmissionListItem, fields)
+    return encode_response(response_type, page, db=db)
+
+
+@submission_router.get("/export")
+def export_gradebook(
+    exam_schedule_id: Optional[int] = Query(None, description="Filter by exam schedule"),
+    exam_id: Optional[int] = Query(None, description="Filter by exam"),
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="csv or xlsx"),
+    current_user=Depends(get_current_user_dependency),
+):
+    """Download the gradebook as CSV or XLSX (teacher/admin only)"""
+    check_teacher_or_admin(current_user)
+
+    if exam_schedule_id is None and exam_id is None:
+        raise HTTPException(
+            status_code=400, detail="exam_schedule_id or exam_id is required"
+        )
+
+    rows = _gradebook_rows(
+        exam_schedule_id=exam_schedule_id,
+        exam_id=exam_id,
+        created_by=_created_by_filter(current_user),
+    )
+    filename = f"gradebook-{exam_schedule_id or 'exam-' + str(exam_id)}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "xlsx":
+        return StreamingResponse(
+            _stream_xlsx(rows),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers,
+        )
+    return StreamingResponse(
+        _stream_csv(rows), media_type="text/csv; charset=utf-8", headers=headers
+    )
+
 
-    return {"data": submissions}
+def _created_by_filter(current_user) -> Optional[int]:
+    """Teachers are limited to their own exams, admins see everything"""
+    return None if current_user.role == UserRole.ADMIN else current_user.id
 
 
-@submission_router.get("/{submission_id}/exam-data")
+def _gradebook_rows(**filters):
+    """Gradebook rows on a dedicated session that lives as long as the stream.
+
+    The request session from get_db is closed before a StreamingResponse
+    body is produced, so the export opens and closes its own.
+    """
+    db = SessionLocal()
+    db.info["use_replica"] = use_replica()
+    set_statement_timeout(db, settings.DB_REPORT_STATEMENT_TIMEOUT_MS)
+    try:
+        yield from iter_gradebook_rows(db, **filters)
+    finally:
+        db.close()
+
+
+def _stream_csv(rows, chunk_rows: int = 500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens Vietnamese names correctly
+    buffer.write("\ufeff")
+    writer.writerow(GRADEBOOK_COLUMNS)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % chunk_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_xlsx(rows, chunk_size: int = 64 * 1024):
+    import xlsxwriter
+
+    with tempfile.TemporaryFile() as tmp:
+        # constant_memory flushes each row to disk as soon as the next one starts
+        workbook = xlsxwriter.Workbook(
+            tmp, {"constant_memory": True, "remove_timezone": True}
+        )
+        worksheet = workbook.add_worksheet("Gradebook")
+        date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        worksheet.write_row(0, 0, GRADEBOOK_COLUMNS)
+        for row_index, row in enumerate(rows, 1):
+            for column, value in enumerate(row):
+                if isinstance(value, datetime):
+                    worksheet.write_datetime(row_index, column, value, date_format)
+                else:
+                    worksheet.write(row_index, column, value)
+        workbook.close()
+
+        tmp.seek(0)
+        while chunk := tmp.read(chunk_size):
+            yield chunk
+
+
+@submission_router.get(
+    "/{submission_id}/exam-data",
+    dependencies=[Depends(replica_reads)],
+)
 def get_submission_exam_data(
     submission_id: int,
     db: Session = Depends(get_db),
@@ -119,7 +290,6 @@ def get_submission_exam_data(
 ):
     """Get submission with exam schedule and exam data for taking exam"""
     from ...models.submission import Submission
-    from ...models.exam_schedule import ExamSchedule
 
     # Get submission
     submission = db.query(Submission).filter(Submission.id == submission_id).first()
@@ -130,28 +300,27 @@ def get_submission_exam_data(
     if current_user.role not in [UserRole.ADMIN, UserRole.TEACHER] and submission.student_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # Get exam schedule
-    exam_schedule = db.query(ExamSchedule).filter(ExamSchedule.id == submission.exam_schedule_id).first()
-    if not exam_schedule:
+    # Schedule and exam are the same for the whole class: shared between requests
+    exam_data = get_exam_data(db, submission.exam_schedule_id)
+    if exam_data is None:
         raise HTTPException(status_code=404, detail="Exam schedule not found")
-
-    # Get exam with questions
-    from ...services.exam_service import get_exam_by_id
-    exam = get_exam_by_id(db, exam_schedule.exam_id)
-    if not exam:
+    if exam_data["exam"] is None:
         raise HTTPException(status_code=404, detail="Exam not found")
 
-    return {
-        "submission": submission,
-        "exam_schedule": exam_schedule,
-        "exam": exam
-    }
+    return {"submission": submission, **exam_data}
 
 
-@submission_router.put("/{submission_id}", response_model=BaseResponse[SubmissionOut])
+@submission_router.put(
+    "/{submission_id}",
+    response_model=BaseResponse[SubmissionOut],
+    dependencies=[Depends(statement_timeout(settings.DB_HOT_PATH_STATEMENT_TIMEOUT_MS))],
+)
 def update_submission(
     submission_id: int,
     answers: dict,  # {"answers": "json_string"}
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_dependency),
 ):
@@ -160,28 +329,32 @@ def update_submission(
 
     from ...models.submission import Submission
 
-    # Get submission
-    submission = db.query(Submission).filter(Submission.id == submission_id).first()
-    if not submission:
-        raise HTTPException(status_code=404, detail="Submission not found")
-
-    # Check if user owns this submission
-    if submission.student_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-
-    # Update submission with answers and calculate score
-    submission.answers = answers.get("answers", "[]")
-
-    # Calculate score
-    try:
-        import json
-        from ...services.submission_service import calculate_score
-        answers_data = json.loads(submission.answers)
-        submission.score = calculate_score(db, submission.exam_schedule_id, answers_data)
-    except Exception as e:
-        submission.score = 0.0
-
-    db.commit()
-    db.refresh(submission)
-
-    return {"data": submission}
\ No newline at end of file
+    def handler():
+        # Get submission
+        submission = (
+            db.query(Submission).filter(Submission.id == submission_id).first()
+        )
+        if not submission:
+            raise HTTPException(status_code=404, detail="Submission not found")
+
+        # Check if user owns this submission
+        if submission.student_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        # Update submission with answers, calculate score and item statistics
+        grade_submission(db, submission, answers.get("answers", "[]"))
+        mark_submitted(db, submission)
+
+        # Committed by run_idempotent, together with the stored response
+        db.flush()
+        db.refresh(submission)
+
+        return status.HTTP_200_OK, {"data": SubmissionOut.model_validate(submission)}
+
+    return run_idempotent(
+        db,
+        current_user.id,
+        idempotency_key,
+        IdempotencyService.fingerprint("PUT", f"/submissions/{submission_id}", answers),
+        handler,
+    )
\ No newline at end of file
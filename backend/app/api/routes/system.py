@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ...core.cache import hot_reads, response_cache, student_homes
+from ...core.compression import exam_paper_cache
+from ...core.singleflight import async_single_flight, single_flight
+from ...core.permissions import check_admin_only
+from ...core.security import security
+from ...db.database import get_db, get_pool_stats
+from ...db.notify import invalidation_bus
+from ...db.pool import hold_stats
+from ...db.release import EarlyReleaseRoute
+from ...db.replica import get_replica_stats
+from ...services.auth import get_current_user
+
+system_router = APIRouter(prefix="/system", tags=["System"], route_class=EarlyReleaseRoute)
+
+
+def get_current_user_dependency(
+    credentials=Depends(security), db: Session = Depends(get_db)
+):
+    """Dependency to get current user from token"""
+    return get_current_user(db, credentials.credentials)
+
+
+@system_router.get("/db-pool")
+def get_db_pool_stats(current_user=Depends(get_current_user_dependency)):
+    """Connection pool usage: checked out, overflow, checkout wait and per-route hold times (admin only)"""
+    check_admin_only(current_user)
+    return {
+        "data": {
+            **get_pool_stats(),
+            "replica": get_replica_stats(),
+            "hold_by_route": hold_stats.snapshot(),
+        }
+    }
+
+
+@system_router.get("/cache")
+def get_cache_stats(current_user=Depends(get_current_user_dependency)):
+    """Cache hit rates, coalesced requests and invalidation bus state (admin only)"""
+    check_admin_only(current_user)
+    return {
+        "data": {
+            "responses": response_cache.stats() if response_cache is not None else None,
+            "exam_papers": exam_paper_cache.stats(),
+            "hot_reads": hot_reads.stats(),
+            "student_homes": student_homes.stats(),
+            "single_flight": {"sync": single_flight.stats(), "async": async_single_flight.stats()},
+            "invalidation_bus": invalidation_bus.stats(),
+        }
+    }
@@ -5,9 +5,12 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from ...core.constants import UserRole
+from ...core.fields import Fields, sparse_fields, sparse_response
 from ...core.security import security
 from ...core.permissions import check_user_management_permission, check_own_resource_or_admin
+from ...core.responses import encode_response
 from ...db.database import get_db
+from ...db.release import EarlyReleaseRoute
 from ...schemas.user import BaseResponse, MessageResponse, PaginatedResponse, UserOut
 from ...services.auth import get_current_user
 from ...services.user_service import (
@@ -18,7 +21,7 @@ from ...services.user_service import (
     soft_delete_user,
 )
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=EarlyReleaseRoute)
 
 
 def get_current_user_dependency(
@@ -33,6 +36,7 @@ def get_all_users(
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     size: int = Query(10, ge=1, le=100, description="Number of records per page"),
     include_deleted: bool = Query(False, description="Include soft deleted users"),
+    fields: Fields = Depends(sparse_fields(UserOut)),
     db: Session = Depends(get_db),
     current_user: UserOut = Depends(get_current_user_dependency),
 ):
@@ -45,15 +49,19 @@ def get_all_users(
 
     # Get total count and users
     total = get_users_count(db, include_deleted=include_deleted)
-    users = get_users(db, skip=skip, limit=size, include_deleted=include_deleted)
+    users = get_users(db, skip=skip, limit=size, include_deleted=include_deleted, fields=fields)
 
     # Calculate total pages
     pages = math.ceil(total / size) if total > 0 else 1
 
-    return {
-        "data": users,
-        "pagination": {"page": page, "size": size, "total": total, "pages": pages},
-    }
+    return encode_response(
+        sparse_response(PaginatedResponse[UserOut], UserOut, fields),
+        {
+            "data": users,
+            "pagination": {"page": page, "size": size, "total": total, "pages": pages},
+        },
+        db=db,
+    )
 
 
 @router.delete("/{user_id}", response_model=BaseResponse[MessageResponse])
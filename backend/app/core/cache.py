@@ -0,0 +1,628 @@
+"""
+Response cache for read-heavy endpoints, invalidated by entity tags
+
+Endpoints decorated with ``@cache_response(tags=...)`` store their rendered
+response (body, media type and validator headers) under a key built from
+the route, its path and query parameters, the caller's role (or the caller
+itself with ``per_user=True``, for ownership-scoped routes) and the
+negotiated format. A hit skips the endpoint entirely, including its
+queries and serialization, and answers If-None-Match against the stored
+ETag. Decorated endpoints must return a Response (encode_response) and do
+their permission checks inside: errors are never cached, and the role in
+the key keeps roles apart.
+
+Entries are tagged by entity (``"questions"``, ``"exam:12"``...). Service
+writes call ``invalidate(...)`` with the tags they touch after committing;
+per-worker caches (the memory backend and ``hot_reads``) also get the tags
+from the other workers over the invalidation bus (app/db/notify.py). TTL
+(RESPONSE_CACHE_TTL_SECONDS) only bounds staleness from writes made
+outside the services. Backends keep a version per tag, bumped by every
+invalidation: a response is only stored if none of its tags changed since
+the request looked it up, so a write committing while the endpoint runs
+cannot leave the stale response behind.
+
+Backends (RESPONSE_CACHE_BACKEND):
+    memory   in-process LRU (default)
+    redis    shared store at REDIS_URL (needs the redis package)
+    fake     in-process stand-in for a Redis server, same code path
+    off      no caching
+
+``hot_reads`` sits one level lower, in the services: identical reads made
+at the same moment (a whole class opening the same schedule) share one
+query, and its result is kept for HOT_READ_TTL_SECONDS. ``student_homes``
+is the same kind of cache with one entry per student, kept apart so a
+school's worth of students does not push the shared entries out.
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from ..db.notify import invalidation_bus
+from .conditional import is_not_modified
+from .config import settings
+from .responses import negotiated_media_type
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Headers kept with a cached body
+_STORED_HEADERS = ("etag", "last-modified", "cache-control", "vary")
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    media_type: Optional[str]
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        headers = {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers}
+        return cls(response.body, response.media_type, headers)
+
+    def to_bytes(self) -> bytes:
+        meta = orjson.dumps({"media_type": self.media_type, "headers": self.headers})
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        meta, _, body = data.partition(b"\n")
+        meta = orjson.loads(meta)
+        return cls(body, meta["media_type"], meta["headers"])
+
+    def response(self, request: Request) -> Response:
+        if is_not_modified(request, self.headers.get("etag"), self.headers.get("last-modified")):
+            return Response(status_code=304, headers=self.headers)
+        return Response(self.body, headers=self.headers, media_type=self.media_type)
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry TTL and a tag index"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        # Invalidation count per tag (only tags invalidated since the last clear)
+        self._versions: Dict[str, int] = {}
+        self._generation = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return self._versions_of(tags)
+
+    def _versions_of(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        return (self._generation,) + tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(
+        self,
+        key: str,
+        entry: CachedResponse,
+        tags: Sequence[str],
+        ttl: float,
+        versions: Optional[Tuple[int, ...]] = None,
+    ) -> bool:
+        """Store an entry; with ``versions`` (from versions()), only if no tag was invalidated since"""
+        with self._lock:
+            if versions is not None and versions != self._versions_of(tags):
+                return False
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, entry, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in self._tags.pop(tag, ()):
+                    removed += self._remove(key)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._versions.clear()
+
+    def _remove(self, key: str) -> int:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return 0
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Entries as SETEX values, tags as Redis sets of entry keys and INCR versions"""
+
+    def __init__(self, client, prefix: str = "rc:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        data = self.client.get(self.prefix + key)
+        return CachedResponse.from_bytes(data) if data is not None else None
+
+    def versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        if not tags:
+            return ()
+        values = self.client.mget([self.prefix + "ver:" + tag for tag in tags])
+        return tuple(int(value) if value is not None else 0 for value in values)
+
+    def set(
+        self,
+        key: str,
+        entry: CachedResponse,
+        tags: Sequence[str],
+        ttl: float,
+        versions: Optional[Tuple[int, ...]] = None,
+    ) -> bool:
+        """Store an entry; with ``versions`` (from versions()), only if no tag was invalidated since"""
+        if versions is not None and self.versions(tags) != versions:
+            return False
+        seconds = max(1, int(ttl))
+        self.client.set(self.prefix + key, entry.to_bytes(), ex=seconds)
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            self.client.sadd(tag_key, key)
+            # Tag sets outlive their entries by at most one TTL
+            self.client.expire(tag_key, seconds)
+        # An invalidation between the check and the SADD may have missed this key:
+        # it bumped the version first, so look again
+        if versions is not None and self.versions(tags) != versions:
+            self.client.delete(self.prefix + key)
+            return False
+        return True
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            # Version first: a concurrent set() either sees it or has already added its key
+            self.client.incr(self.prefix + "ver:" + tag)
+            tag_key = self.prefix + "tag:" + tag
+            keys = [
+                self.prefix + (member.decode() if isinstance(member, bytes) else member)
+                for member in self.client.smembers(tag_key)
+            ]
+            if keys:
+                removed += self.client.delete(*keys)
+            self.client.delete(tag_key)
+        return removed
+
+    def clear(self) -> None:
+        # Versions are kept: resetting them could let an older snapshot match again
+        versions = self.prefix + "ver:"
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            name = key.decode() if isinstance(key, bytes) else key
+            if not name.startswith(versions):
+                self.client.delete(key)
+
+
+class FakeRedis:
+    """In-process stand-in for the redis client calls RedisBackend makes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[bytes, object] = {}
+        self._expires: Dict[bytes, float] = {}
+
+    @staticmethod
+    def _key(name) -> bytes:
+        return name.encode() if isinstance(name, str) else name
+
+    def _live(self, key: bytes):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def get(self, name):
+        with self._lock:
+            value = self._live(self._key(name))
+            return value if isinstance(value, bytes) else None
+
+    def set(self, name, value, ex: Optional[int] = None):
+        key = self._key(name)
+        with self._lock:
+            self._data[key] = self._key(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+        return True
+
+    def mget(self, names) -> List[Optional[bytes]]:
+        return [self.get(name) for name in names]
+
+    def incr(self, name) -> int:
+        key = self._key(name)
+        with self._lock:
+            value = self._live(key)
+            value = int(value) + 1 if isinstance(value, bytes) else 1
+            self._data[key] = str(value).encode()
+            return value
+
+    def sadd(self, name, *values) -> int:
+        key = self._key(name)
+        with self._lock:
+            members = self._live(key)
+            if not isinstance(members, set):
+                members = self._data[key] = set()
+            before = len(members)
+            members.update(self._key(value) for value in values)
+            return len(members) - before
+
+    def smembers(self, name) -> Set[bytes]:
+        with self._lock:
+            members = self._live(self._key(name))
+            return set(members) if isinstance(members, set) else set()
+
+    def expire(self, name, seconds: int) -> bool:
+        key = self._key(name)
+        with self._lock:
+            if self._live(key) is None:
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *names) -> int:
+        removed = 0
+        with self._lock:
+            for name in names:
+                key = self._key(name)
+                if self._live(key) is not None:
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+        return removed
+
+    def scan_iter(self, match: str = "*"):
+        prefix = self._key(match.rstrip("*"))
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+        return iter(keys)
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_skipped = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        return self.backend.versions(tags)
+
+    def set(
+        self,
+        key: str,
+        response: Response,
+        tags: Sequence[str],
+        versions: Optional[Tuple[int, ...]] = None,
+    ) -> None:
+        """Store ``response`` unless one of ``tags`` was invalidated after ``versions`` was taken"""
+        if not self.backend.set(key, CachedResponse.from_response(response), tags, self.ttl, versions):
+            self.stale_skipped += 1
+
+    def invalidate(self, *tags: str) -> int:
+        removed = self.backend.invalidate(tags)
+        self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, object]:
+        entries = len(self.backend) if hasattr(self.backend, "__len__") else None
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidations,
+            "stale_skipped": self.stale_skipped,
+        }
+
+
+class HotReadCache:
+    """Service reads shared by concurrent callers, then cached for a short TTL.
+
+    A miss runs ``load`` once for every caller asking for the same key at
+    the same time (single-flight). In the last ``early_refresh`` fraction of
+    an entry's TTL, the first caller reloads it while the others keep
+    getting the cached value, so a hot entry never expires under load.
+    Values are shared between requests and threads: return plain data
+    (schemas, dicts, tuples), never ORM objects. None is not cached.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, early_refresh: float):
+        self.backend = MemoryBackend(max_entries)
+        self.ttl = ttl
+        self.early_refresh = early_refresh
+        self._lock = threading.Lock()
+        self._refreshing: Set[Hashable] = set()
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.early_refreshes = 0
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return repr(key)
+
+    def _cached(self, key: str) -> Tuple[bool, Any]:
+        """(whether the caller should reload, cached value or None)"""
+        item = self.backend.get(key)
+        if item is None:
+            self.misses += 1
+            return True, None
+        refresh_at, value = item
+        if time.monotonic() >= refresh_at:
+            with self._lock:
+                claimed = key not in self._refreshing
+                self._refreshing.add(key)
+            if claimed:
+                self.early_refreshes += 1
+                return True, value
+        self.hits += 1
+        return False, value
+
+    def _store(
+        self, key: str, tags: Sequence[str], versions: Tuple[int, ...], value: Any, ttl: Optional[float]
+    ) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if value is None or ttl <= 0:
+            return
+        # Not stored if one of the entry's own tags was invalidated during the load
+        refresh_at = time.monotonic() + ttl * (1 - self.early_refresh)
+        self.backend.set(key, (refresh_at, value), tags, ttl, versions=versions)
+
+    def _refreshed(self, key: str, stale: Any, error: Exception) -> Any:
+        # A failed early refresh keeps serving the current value until it expires
+        logger.warning("Early refresh of %s failed: %s", key, error)
+        return stale
+
+    def get(
+        self,
+        key: Hashable,
+        tags: Sequence[str],
+        load: Callable[[], Any],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """Cached ``load()``; ``ttl`` overrides the cache's TTL for this entry"""
+        key = self._key(key)
+        reload, value = self._cached(key)
+        if not reload:
+            return value
+
+        def run():
+            versions = self.backend.versions(tags)
+            result = load()
+            self._store(key, tags, versions, result, ttl)
+            return result
+
+        if value is None:
+            return self._flight.do(key, run)
+        try:
+            return run()
+        except Exception as error:
+            return self._refreshed(key, value, error)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def aget(
+        self,
+        key: Hashable,
+        tags: Sequence[str],
+        load: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """get() for coroutine loaders"""
+        key = self._key(key)
+        reload, value = self._cached(key)
+        if not reload:
+            return value
+
+        async def run():
+            versions = self.backend.versions(tags)
+            result = await load()
+            self._store(key, tags, versions, result, ttl)
+            return result
+
+        if value is None:
+            return await self._async_flight.do(key, run)
+        try:
+            return await run()
+        except Exception as error:
+            return self._refreshed(key, value, error)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, *tags: str) -> int:
+        return self.backend.invalidate(tags)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, object]:
+        sync_flight, async_flight = self._flight.stats(), self._async_flight.stats()
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": sync_flight["executed"] + async_flight["executed"],
+            "coalesced": sync_flight["coalesced"] + async_flight["coalesced"],
+            "early_refreshes": self.early_refreshes,
+        }
+
+
+def _build_cache() -> Optional[ResponseCache]:
+    backend_name = settings.RESPONSE_CACHE_BACKEND
+    if backend_name == "off":
+        return None
+    if backend_name == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_BACKEND=redis but redis is not installed, using memory")
+        else:
+            backend = RedisBackend(redis.Redis.from_url(settings.REDIS_URL))
+            return ResponseCache(backend, settings.RESPONSE_CACHE_TTL_SECONDS)
+    if backend_name == "fake":
+        return ResponseCache(RedisBackend(FakeRedis()), settings.RESPONSE_CACHE_TTL_SECONDS)
+    return ResponseCache(
+        MemoryBackend(settings.RESPONSE_CACHE_SIZE), settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+
+
+response_cache = _build_cache()
+hot_reads = HotReadCache(
+    settings.HOT_READ_CACHE_SIZE, settings.HOT_READ_TTL_SECONDS, settings.HOT_READ_EARLY_REFRESH
+)
+student_homes = HotReadCache(
+    settings.STUDENT_HOME_CACHE_SIZE, settings.STUDENT_HOME_TTL_SECONDS, settings.HOT_READ_EARLY_REFRESH
+)
+
+# Per-worker caches hear about the other workers' writes over the bus
+_local_caches: List[Any] = [hot_reads, student_homes]
+if response_cache is not None and isinstance(response_cache.backend, MemoryBackend):
+    _local_caches.append(response_cache)
+for _cache in _local_caches:
+    invalidation_bus.subscribe(_cache.invalidate, _cache.clear)
+
+
+def invalidate(*tags: str) -> None:
+    """Drop cached entries tagged with any of ``tags``, in every worker (call after commit)"""
+    caches = list(_local_caches)
+    if response_cache is not None and response_cache not in caches:
+        caches.append(response_cache)
+    for cache in caches:
+        try:
+            cache.invalidate(*tags)
+        except Exception:
+            # A cache outage must not fail the write that already committed
+            logger.exception("Cache invalidation failed for %s", tags)
+    if not settings.CACHE_BUS_ENABLED:
+        return
+    # Queued: the NOTIFY goes out on the bus's own connection and thread
+    invalidation_bus.publish(tags)
+
+
+def _cache_key(request: Request, current_user, per_user: bool) -> str:
+    route = request.scope.get("route")
+    scope = f"user:{current_user.id}" if per_user else f"role:{current_user.role}"
+    parts = (
+        getattr(route, "path_format", request.url.path),
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        scope,
+        negotiated_media_type(),
+    )
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def cache_response(tags: Sequence[str], per_user: bool = False):
+    """Cache a read endpoint's Response, tagged by entity.
+
+    ``tags`` may use the endpoint's parameters: ``"exam:{exam_id}"``. The
+    endpoint must take ``request: Request`` and ``current_user``.
+    """
+
+    def decorator(endpoint):
+        def lookup(values) -> Tuple[Optional[str], Optional[CachedResponse], List[str], tuple]:
+            if response_cache is None:
+                return None, None, [], ()
+            key = _cache_key(values["request"], values["current_user"], per_user)
+            entry_tags = [tag.format(**values) for tag in tags]
+            try:
+                # Taken before the endpoint reads anything: a write committing
+                # while it runs bumps a version and the response is not stored
+                versions = response_cache.versions(entry_tags)
+                entry = response_cache.get(key)
+            except Exception:
+                logger.exception("Response cache read failed")
+                return None, None, [], ()
+            return key, entry, entry_tags, versions
+
+        def store(key, entry_tags, versions, response) -> None:
+            if key is None or not isinstance(response, Response) or response.status_code != 200:
+                return
+            try:
+                response_cache.set(key, response, entry_tags, versions)
+            except Exception:
+                logger.exception("Response cache write failed")
+
+        if inspect.iscoroutinefunction(endpoint):
+
+            @functools.wraps(endpoint)
+            async def cached_async(**values):
+                key, entry, entry_tags, versions = lookup(values)
+                if entry is not None:
+                    return entry.response(values["request"])
+                response = await endpoint(**values)
+                store(key, entry_tags, versions, response)
+                return response
+
+            return cached_async
+
+        @functools.wraps(endpoint)
+        def cached(**values):
+            key, entry, entry_tags, versions = lookup(values)
+            if entry is not None:
+                return entry.response(values["request"])
+            response = endpoint(**values)
+            store(key, entry_tags, versions, response)
+            return response
+
+        return cached
+
+    return decorator
@@ -0,0 +1,264 @@
+"""
+Response compression: gzip or brotli, negotiated from Accept-Encoding
+
+CompressionMiddleware compresses text-like responses (JSON, MessagePack,
+CSV, ...) of at least COMPRESSION_MIN_SIZE bytes. Streaming responses are
+compressed chunk by chunk and flushed after each one, so a CSV export
+still reaches the client as it is produced. Server-sent events, binary
+formats (xlsx is already a zip) and responses that already carry a
+Content-Encoding pass through untouched.
+
+Payloads that many clients download unchanged, such as compiled exam
+papers, go through PrecompressedCache instead: the body is rendered once
+and each encoding is computed once, at the highest level, then reused.
+brotli is optional; without it clients get gzip.
+"""
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from starlette.datastructures import MutableHeaders
+
+from .config import settings
+from .singleflight import async_single_flight
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/x-msgpack",
+    "application/javascript",
+    "application/xml",
+)
+_STREAMED_TYPES = ("text/event-stream",)
+
+# Precompressed payloads are encoded once, so the slowest levels pay off
+_PRECOMPRESS_LEVELS = {"br": 11, "gzip": 9}
+
+
+@lru_cache(maxsize=None)
+def _brotli():
+    # Optional dependency: without it only gzip is offered
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best of br/gzip for an Accept-Encoding header, None for identity"""
+    ranks: Dict[str, float] = {}
+    wildcard = 0.0
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == "*":
+            wildcard = q
+        elif name:
+            ranks[name] = q
+
+    offered = ["br", "gzip"] if _brotli() is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for name in offered:
+        q = ranks.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return _brotli().compress(body, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = _brotli().Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(
+                settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush so each streamed chunk reaches the client now
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+def _compressible(headers: MutableHeaders) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(_COMPRESSIBLE_TYPES) and not content_type.startswith(
+        _STREAMED_TYPES
+    )
+
+
+class CompressionMiddleware:
+    """gzip/brotli for responses above the size threshold, streaming included"""
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = (
+            settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                passthrough = True
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not _compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _StreamCompressor(encoding)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                    body = compressor.chunk(body)
+                else:
+                    body = compressor.finish(body)
+                    headers["content-length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            body = compressor.chunk(body) if more_body else compressor.finish(body)
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class Precompressed:
+    """A rendered body and its compressed variants, each computed once"""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self._variants: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_response(cls, response: Response) -> "Precompressed":
+        return cls(response.body, response.media_type)
+
+    def encoded(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = self._variants[encoding] = compress(
+                self.body, encoding, _PRECOMPRESS_LEVELS[encoding]
+            )
+        return variant
+
+    async def response(self, accept_encoding: str) -> Response:
+        headers = {"vary": "Accept, Accept-Encoding"}
+        encoding = None
+        if accept_encoding and len(self.body) >= settings.COMPRESSION_MIN_SIZE:
+            encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return Response(self.body, headers=headers, media_type=self.media_type)
+        body = self._variants.get(encoding)
+        if body is None:
+            # brotli at level 11 takes a while: keep it off the event loop
+            body = await run_in_threadpool(self.encoded, encoding)
+        headers["content-encoding"] = encoding
+        return Response(body, headers=headers, media_type=self.media_type)
+
+
+class PrecompressedCache:
+    """LRU of Precompressed payloads; key them by everything the body depends on"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Precompressed]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self, key: Hashable, build: Callable[[], Awaitable[Precompressed]]
+    ) -> Precompressed:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return payload
+
+        self.misses += 1
+        # Concurrent misses for the same key build it once
+        payload = await async_single_flight.do(("precompressed", id(self), key), build)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return payload
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Compiled exam papers (GET /exam-schedules/{id}/with-exam)
+exam_paper_cache = PrecompressedCache(settings.EXAM_PAPER_CACHE_SIZE)
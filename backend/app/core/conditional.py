@@ -0,0 +1,99 @@
+"""
+Conditional GET: ETag and Last-Modified from row versions
+
+Read routes ask their service for a version of what the response depends
+on: a one-row aggregate of updated_at (plus counts and ids for lists) that
+never loads the rows themselves. Conditional turns it into a weak ETag and,
+for single resources, a Last-Modified (the latest timestamp in the
+version). Lists, and resources made of child rows (an exam and its
+questions), only get the ETag: removing a row does not raise their latest
+timestamp, so If-Modified-Since would answer a false 304. When the client's If-None-Match, or
+If-Modified-Since without it, still matches, the route returns the 304
+before loading or serializing anything; otherwise it builds the body as
+before and adds the validators.
+
+Responses are ``Cache-Control: private, no-cache``: the browser keeps them
+and revalidates on every reload, which is then one small query and an
+empty 304.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from .responses import negotiated_media_type
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Whether the client's copy is current, given a response's ETag and Last-Modified headers.
+
+    If-None-Match wins over If-Modified-Since and uses weak comparison
+    (RFC 9110 8.8.3.2: W/ is ignored).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags = {_opaque(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque(etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or last_modified is None:
+        return False
+    since = _parse_http_date(if_modified_since)
+    modified = _parse_http_date(last_modified)
+    # HTTP dates have one-second resolution
+    return since is not None and modified is not None and modified <= since
+
+
+class Conditional:
+    """Validators for one response, from its version tuple"""
+
+    def __init__(self, request: Request, version: Any, last_modified: bool = True):
+        self.request = request
+        # Same rows under another URL or format (JSON/MessagePack) is another body
+        key = (
+            request.url.path,
+            sorted(request.query_params.multi_items()),
+            negotiated_media_type(),
+            version,
+        )
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+        self.etag = f'W/"{digest}"'
+
+        timestamps = [value for value in version if isinstance(value, datetime)]
+        self.last_modified: Optional[datetime] = (
+            max(timestamps) if last_modified and timestamps else None
+        )
+        self.headers = {"etag": self.etag, "cache-control": "private, no-cache"}
+        if self.last_modified is not None:
+            self.headers["last-modified"] = format_datetime(
+                self.last_modified.astimezone(timezone.utc), usegmt=True
+            )
+
+    def matches(self) -> bool:
+        """Whether the client's copy is still current"""
+        return is_not_modified(self.request, self.etag, self.headers.get("last-modified"))
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers={**self.headers, "vary": "Accept"})
+
+    def apply(self, response: Response) -> Response:
+        """Add the validators to a full response"""
+        response.headers.update(self.headers)
+        return response
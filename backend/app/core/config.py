@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from dotenv import load_dotenv
 
@@ -14,12 +15,120 @@ class Settings:
     DB_PORT: str = os.getenv("DB_PORT", "5432")
     DB_NAME: str = os.getenv("DB_NAME", "MSE")
 
+    # Connection pool settings; each worker may open up to
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW + 2
+    # (invalidation listener and publisher) connections to the primary: keep workers x that under max_connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    # Async engine (exam-taking hot path), a separate pool
+    DB_ASYNC_POOL_SIZE: int = int(os.getenv("DB_ASYNC_POOL_SIZE", "10"))
+    DB_ASYNC_MAX_OVERFLOW: int = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # giây chờ lấy kết nối
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    DB_HOT_PATH_STATEMENT_TIMEOUT_MS: int = int(
+        os.getenv("DB_HOT_PATH_STATEMENT_TIMEOUT_MS", "5000")
+    )  # start/submit trong giờ thi
+    DB_REPORT_STATEMENT_TIMEOUT_MS: int = int(
+        os.getenv("DB_REPORT_STATEMENT_TIMEOUT_MS", "300000")
+    )  # export, rebuild thống kê
+    # PgBouncer (transaction pooling): no app-side pool, no startup options
+    DB_PGBOUNCER_MODE: bool = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+    # Connections opened per engine at startup (0: connect on demand)
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "2"))
+    # Trả kết nối về pool khi handler xong, trước khi serialize response
+    DB_EARLY_RELEASE: bool = os.getenv("DB_EARLY_RELEASE", "true").lower() == "true"
+
+    # Read replica (optional): replica-eligible GET routes read from it when set
+    DB_REPLICA_HOST: str = os.getenv("DB_REPLICA_HOST", "")
+    DB_REPLICA_PORT: str = os.getenv("DB_REPLICA_PORT", "5432")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_LAG_CHECK_SECONDS: float = float(
+        os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "2")
+    )
+    # Sau khi ghi, người dùng đọc từ primary trong khoảng thời gian này
+    DB_READ_YOUR_WRITES_SECONDS: float = float(
+        os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10")
+    )
+
+    # SQL instrumentation (debug): X-DB-Query-Count/-Time-Ms headers, N+1 warnings
+    SQL_QUERY_STATS: bool = os.getenv("SQL_QUERY_STATS", "false").lower() == "true"
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+    # Lazy loads that would emit SQL raise instead (dev/tests): add eager loads
+    SQL_RAISELOAD: bool = os.getenv("SQL_RAISELOAD", "false").lower() == "true"
+
+    # Response compression (gzip, brotli if installed)
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    # Đề thi đã biên dịch + bản nén sẵn, giữ trong bộ nhớ mỗi worker
+    EXAM_PAPER_CACHE_SIZE: int = int(os.getenv("EXAM_PAPER_CACHE_SIZE", "256"))
+
+    # Response cache: memory (per worker), redis (REDIS_URL), fake (local stand-in) or off
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Hot reads shared by concurrent requests (per worker); TTL 0 only coalesces
+    HOT_READ_CACHE_SIZE: int = int(os.getenv("HOT_READ_CACHE_SIZE", "512"))
+    HOT_READ_TTL_SECONDS: float = float(os.getenv("HOT_READ_TTL_SECONDS", "60"))
+    # Last fraction of the TTL in which one caller refreshes while others get the cached value
+    HOT_READ_EARLY_REFRESH: float = float(os.getenv("HOT_READ_EARLY_REFRESH", "0.2"))
+    # Admin dashboard counts; "submissions today" is only refreshed by this TTL
+    DASHBOARD_CACHE_TTL_SECONDS: float = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+    # Student home pages, one entry per student (evicted on exam start and submit)
+    STUDENT_HOME_CACHE_SIZE: int = int(os.getenv("STUDENT_HOME_CACHE_SIZE", "4096"))
+    STUDENT_HOME_TTL_SECONDS: float = float(os.getenv("STUDENT_HOME_TTL_SECONDS", "60"))
+
+    # Cross-worker cache invalidation (LISTEN/NOTIFY)
+    CACHE_BUS_ENABLED: bool = os.getenv("CACHE_BUS_ENABLED", "true").lower() == "true"
+    CACHE_BUS_CHANNEL: str = os.getenv("CACHE_BUS_CHANNEL", "cache_invalidation")
+    CACHE_BUS_KEEPALIVE_SECONDS: float = float(os.getenv("CACHE_BUS_KEEPALIVE_SECONDS", "30"))
+    CACHE_BUS_MAX_RECONNECT_SECONDS: float = float(
+        os.getenv("CACHE_BUS_MAX_RECONNECT_SECONDS", "30")
+    )
+
     # Security settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "MSE_2025")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 3
 
+    # Idempotency-Key settings
+    IDEMPOTENCY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "2048"))
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = int(
+        os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "600")
+    )
+    # A request still pending after this long is assumed dead (worker killed); retries take over
+    IDEMPOTENCY_PENDING_TIMEOUT_SECONDS: int = int(
+        os.getenv("IDEMPOTENCY_PENDING_TIMEOUT_SECONDS", "60")
+    )
+
+    # Exam session WebSocket settings
+    EXAM_SESSION_TIME_SYNC_SECONDS: int = int(
+        os.getenv("EXAM_SESSION_TIME_SYNC_SECONDS", "15")
+    )
+    EXAM_SESSION_GRACE_SECONDS: int = int(os.getenv("EXAM_SESSION_GRACE_SECONDS", "10"))
+
+    # Live proctoring feed (SSE) settings
+    PROCTORING_THROTTLE_SECONDS: float = float(
+        os.getenv("PROCTORING_THROTTLE_SECONDS", "1")
+    )
+    PROCTORING_KEEPALIVE_SECONDS: int = int(os.getenv("PROCTORING_KEEPALIVE_SECONDS", "15"))
+    # Watched counters are reloaded from the database this often, picking up
+    # the events handled by the other workers
+    PROCTORING_RECONCILE_SECONDS: float = float(
+        os.getenv("PROCTORING_RECONCILE_SECONDS", "5")
+    )
+
+    # /api/batch: sub-requests per call, reads run at once, per sub-request timeout
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_TIMEOUT_SECONDS: float = float(os.getenv("BATCH_TIMEOUT_SECONDS", "30"))
+
     # CORS settings
     BACKEND_CORS_ORIGINS: list = [
         origin.strip()
@@ -32,5 +141,15 @@ class Settings:
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+    @property
+    def REPLICA_DATABASE_URL(self) -> Optional[str]:
+        if not self.DB_REPLICA_HOST:
+            return None
+        return f"postgresql://{self.DB_USER}:{self.DB_PASS}@{self.DB_REPLICA_HOST}:{self.DB_REPLICA_PORT}/{self.DB_NAME}"
+
 
 settings = Settings()
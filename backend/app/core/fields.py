@@ -0,0 +1,92 @@
+"""
+Sparse fieldsets for list endpoints: ``?fields=id,code,subject``
+
+``Depends(sparse_fields(QuestionOut))`` reads and checks the parameter; it
+gives None when absent, meaning the full schema. Services pass the set to
+``load_only_fields`` so only those columns are selected, and routes encode
+with ``sparse_response(...)``: the response model with its ``data`` items
+narrowed to the requested fields (validating the full schema would load
+every column again). ``id`` is always included. Different ``fields`` are
+different URLs, so ETags and cache keys already tell them apart.
+"""
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+Fields = Optional[FrozenSet[str]]
+
+# Models are built per distinct field set; keep the number bounded
+_MAX_MODELS = 256
+
+
+def sparse_fields(schema: Type[BaseModel], always: Iterable[str] = ("id",)):
+    """Dependency parsing ``fields=`` against the fields of ``schema``"""
+    available = tuple(schema.model_fields)
+    always = frozenset(always)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated fields to return: {', '.join(available)}"
+        ),
+    ) -> Fields:
+        if fields is None:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested.difference(available)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return frozenset(requested | always)
+
+    return dependency
+
+
+@lru_cache(maxsize=_MAX_MODELS)
+def sparse_model(schema: Type[BaseModel], fields: Fields) -> Type[BaseModel]:
+    """``schema`` with only ``fields``, in the schema's order"""
+    if fields is None:
+        return schema
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in schema.model_fields.items()
+        if name in fields
+    }
+    return create_model(
+        f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **definitions
+    )
+
+
+@lru_cache(maxsize=_MAX_MODELS)
+def sparse_response(
+    response_model: Type[BaseModel], schema: Type[BaseModel], fields: Fields
+) -> Type[BaseModel]:
+    """``response_model`` (a page or BaseResponse) whose ``data`` list holds sparse items"""
+    if fields is None:
+        return response_model
+    return create_model(
+        f"{response_model.__name__}Fields",
+        __base__=response_model,
+        data=(List[sparse_model(schema, fields)], ...),
+    )
+
+
+def load_only_fields(query, entity, fields: Fields, *required: str):
+    """Restrict ``query`` (Query or select) to the ``entity`` columns in ``fields``.
+
+    ``required`` names columns needed besides, e.g. the foreign key behind
+    a derived field. The primary key is always loaded.
+    """
+    if fields is None:
+        return query
+    columns = [
+        getattr(entity, column.key)
+        for column in inspect(entity).column_attrs
+        if column.key in fields or column.key in required
+    ]
+    return query.options(load_only(*columns))
@@ -0,0 +1,123 @@
+"""
+Response encoding: orjson by default, MessagePack on request
+
+FastResponse is the app's default response class: JSON rendered by
+orjson, or MessagePack when the client asked for it with
+``Accept: application/msgpack`` (see ContentNegotiationMiddleware). List
+routes return ``encode_response(Model, value)`` instead of letting FastAPI
+serialize ``response_model``: FastAPI dumps returned models to dicts and
+validates them again, while encode_response validates the value (ORM
+objects included) once with a cached TypeAdapter and encodes it directly.
+Pass the request's ``db`` so its connection goes back to the pool before
+the work starts. Keep ``response_model`` on those routes for the OpenAPI
+schema.
+"""
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from ..db.database import release_connection
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+@lru_cache(maxsize=None)
+def _msgpack():
+    # Optional dependency: without it every client gets JSON
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+def prefers_msgpack(accept: str) -> bool:
+    """Whether an Accept header ranks MessagePack at least as high as JSON"""
+    msgpack_q = json_q = 0.0
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.strip().partition(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in _MSGPACK_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+class FastResponse(JSONResponse):
+    """JSON via orjson, or MessagePack when negotiated"""
+
+    def __init__(self, content: Any, *args, **kwargs):
+        if _wants_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)
+        self.headers["vary"] = "Accept"
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return _msgpack().packb(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def negotiated_media_type() -> str:
+    """Media type FastResponse renders for the current request"""
+    return MSGPACK_MEDIA_TYPE if _wants_msgpack.get() else "application/json"
+
+
+@lru_cache(maxsize=1024)
+def type_adapter(tp) -> TypeAdapter:
+    """One TypeAdapter per response type (building one compiles a schema)"""
+    return TypeAdapter(tp)
+
+
+def encode_response(
+    tp, value: Any, status_code: int = 200, db: Optional[Session] = None
+) -> Response:
+    """Validate ``value`` against ``tp`` once and encode it in the negotiated format"""
+    if db is not None:
+        release_connection(db)
+    adapter = type_adapter(tp)
+    model = adapter.validate_python(value, from_attributes=True)
+    headers = {"vary": "Accept"}
+    if _wants_msgpack.get():
+        body = _msgpack().packb(adapter.dump_python(model, mode="json"))
+        return Response(body, status_code, headers, media_type=MSGPACK_MEDIA_TYPE)
+    return Response(adapter.dump_json(model), status_code, headers, media_type="application/json")
+
+
+class ContentNegotiationMiddleware:
+    """Records whether the client accepts MessagePack for the response classes above"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept":
+                accept = value.decode("latin-1")
+                break
+        token = _wants_msgpack.set(bool(accept) and prefers_msgpack(accept) and _msgpack() is not None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _wants_msgpack.reset(token)
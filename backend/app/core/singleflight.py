@@ -0,0 +1,109 @@
+"""
+Single-flight: concurrent calls with the same key share one execution
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def _stats(flight) -> Dict[str, int]:
+    return {
+        "in_flight": len(flight._calls),
+        "executed": flight.executed,
+        "coalesced": flight.coalesced,
+    }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls made from worker threads.
+
+    The first caller for a key runs ``fn``; callers arriving while it runs
+    wait and receive the same result (or exception). Results are shared
+    between threads, so ``fn`` should return plain data rather than ORM
+    objects bound to the leader's session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        return _stats(self)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on the event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            # shield: a cancelled follower must not cancel the shared call
+            return await asyncio.shield(call)
+
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.executed += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as error:
+            call.set_exception(error)
+            # Mark as retrieved so a failure without followers is not logged
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return _stats(self)
+
+
+# Shared instances for request handlers
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
@@ -0,0 +1,45 @@
+"""
+Worker warm-up, run from the app lifespan before the first request
+
+Opens pool connections on both engines and loads what nearly every
+request or the first login would otherwise pay for (JWT library, bcrypt
+backend, replica lag). Rarely used heavy modules (python-docx, numpy)
+stay lazy. A database that is down does not stop the worker from
+starting: it connects on demand instead.
+"""
+import logging
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exc
+
+from ..db.database import warm_up_async_pool, warm_up_pool
+from ..db.replica import lag_monitor
+from ..services.user_service import get_pwd_context
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _prime_libraries() -> None:
+    import jose.jwt  # noqa: F401  (decoded on every authenticated request)
+
+    get_pwd_context().handler("bcrypt").get_backend()
+
+
+async def warm_up() -> None:
+    started = time.perf_counter()
+    opened = 0
+    try:
+        opened += await run_in_threadpool(warm_up_pool, settings.DB_POOL_WARMUP)
+        opened += await warm_up_async_pool(settings.DB_POOL_WARMUP)
+        if lag_monitor is not None:
+            await run_in_threadpool(lag_monitor.usable)
+    except (exc.SQLAlchemyError, OSError) as error:
+        logger.warning("Database warm-up failed, connecting on demand: %s", error)
+    await run_in_threadpool(_prime_libraries)
+    logger.info(
+        "Warm-up done in %.0f ms (%d connections)",
+        (time.perf_counter() - started) * 1000,
+        opened,
+    )
@@ -1,10 +1,85 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import Any, Dict
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, raiseload, sessionmaker
+from sqlalchemy.pool import NullPool
 
 from ..core.config import settings
+from .pool import InstrumentedQueuePool
+
+
+def _engine_options() -> Dict[str, Any]:
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer pools the server connections and rejects the "options"
+        # startup parameter; the statement timeout is set per transaction
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        },
+    }
+
+
+def _async_engine_options() -> Dict[str, Any]:
+    if settings.DB_PGBOUNCER_MODE:
+        # asyncpg's prepared statement cache does not survive transaction pooling
+        return {"poolclass": NullPool, "connect_args": {"statement_cache_size": 0}}
+    return {
+        "pool_size": settings.DB_ASYNC_POOL_SIZE,
+        "max_overflow": settings.DB_ASYNC_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        },
+    }
+
+
+def _replica_engine_options() -> Dict[str, Any]:
+    options = _engine_options()
+    # Fail fast when the replica is down: requests fall back to the primary
+    options.setdefault("connect_args", {})["connect_timeout"] = 3
+    return options
+
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class RoutingSession(Session):
+    """Session that sends reads to the replica once a route opted in (see replica.py)"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("use_replica")
+            and replica_engine is not None
+            and not self._flushing
+            and not getattr(clause, "is_dml", False)
+        ):
+            return replica_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options())
+replica_engine = (
+    create_engine(settings.REPLICA_DATABASE_URL, **_replica_engine_options())
+    if settings.REPLICA_DATABASE_URL
+    else None
+)
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
+)
+
+# Async engine (asyncpg) for the exam-taking hot path
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **_async_engine_options())
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
 
 
@@ -15,3 +90,178 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def run_after_commit(db: Session, callback) -> None:
+    """Run an in-memory callback once the session's transaction commits"""
+    db.info.setdefault("after_commit_callbacks", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session):
+    for callback in session.info.pop("after_commit_callbacks", []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit_callbacks(session):
+    session.info.pop("after_commit_callbacks", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_write(orm_execute_state):
+    # UPDATE/DELETE/INSERT and text() statements count as writes
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("has_writes", None)
+
+
+def release_connection(db: Session) -> bool:
+    """Return the session's connection to the pool once the handler is done reading.
+
+    Only ends read-only transactions: loaded objects stay usable and the
+    session checks out a connection again if it is used afterwards.
+    """
+    if (
+        not db.in_transaction()
+        or db.info.get("has_writes")
+        or db.info.get("after_commit_callbacks")
+        or db.new
+        or db.dirty
+        or db.deleted
+    ):
+        return False
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+    return True
+
+
+async def release_async_connection(db: AsyncSession) -> bool:
+    """Same as release_connection for an AsyncSession"""
+    session = db.sync_session
+    if (
+        not session.in_transaction()
+        or session.info.get("has_writes")
+        or session.new
+        or session.dirty
+        or session.deleted
+    ):
+        return False
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        await db.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+    return True
+
+
+def set_statement_timeout(db: Session, timeout_ms: int) -> None:
+    """Override the statement timeout for every transaction of this session"""
+    db.info["statement_timeout_ms"] = timeout_ms
+    if db.in_transaction():
+        db.connection().exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def statement_timeout(timeout_ms: int):
+    """Route dependency: ``dependencies=[Depends(statement_timeout(5000))]``"""
+
+    def apply(db: Session = Depends(get_db)) -> None:
+        set_statement_timeout(db, timeout_ms)
+
+    return apply
+
+
+def async_statement_timeout(timeout_ms: int):
+    """Same as statement_timeout for routes using get_async_db"""
+
+    async def apply(db: AsyncSession = Depends(get_async_db)) -> None:
+        db.sync_session.info["statement_timeout_ms"] = timeout_ms
+        if db.in_transaction():
+            await db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+    return apply
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    # SET LOCAL only lasts for the transaction, so pooled connections
+    # (and PgBouncer server connections) never keep a route's timeout
+    timeout_ms = session.info.get("statement_timeout_ms")
+    if timeout_ms is None and settings.DB_PGBOUNCER_MODE:
+        timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout_ms is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def _raise_on_lazy_load(orm_execute_state):
+    # Chỉ áp dụng cho câu SELECT gốc, không cho các lần nạp quan hệ/cột
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_relationship_load
+        and not orm_execute_state.is_column_load
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            raiseload("*", sql_only=True)
+        )
+
+
+if settings.SQL_RAISELOAD:
+    # Relationships not loaded eagerly raise instead of running one query per row
+    event.listen(Session, "do_orm_execute", _raise_on_lazy_load)
+
+
+def warm_up_pool(connections: int) -> int:
+    """Open up to ``connections`` pooled connections ahead of the first requests"""
+    if settings.DB_PGBOUNCER_MODE:
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+async def warm_up_async_pool(connections: int) -> int:
+    """Same as warm_up_pool for the async engine"""
+    if settings.DB_PGBOUNCER_MODE:
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(await async_engine.connect())
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Live statistics of the primary engine's connection pool"""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return {"mode": "queue", **pool.stats()}
+    return {"mode": "pgbouncer", "pool": type(pool).__name__}
@@ -0,0 +1,88 @@
+"""
+Request-scoped batching loader for many-to-one relationships
+
+Building a list response often reads one related object per row
+(``exam.creator``, ``exam_question.question``, ``submission.exam_schedule``);
+lazy loading sends one query per row. ``load_related`` collects the keys of
+the whole list and resolves them with one ``IN`` query per entity type,
+then sets the relationship on every object so reading it sends no SQL.
+Objects already loaded in the request (session identity map or an earlier
+call) are not queried again. Routes get one loader per request through
+``Depends(get_loader)``.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set
+
+from fastapi import Depends
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from .database import get_db
+
+
+class BatchLoader:
+    """Loads related rows by primary key, one query per entity type"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._loaded: Dict[type, Dict[Any, Any]] = defaultdict(dict)
+
+    def load_many(self, model: type, keys: Iterable[Any]) -> Dict[Any, Any]:
+        """Rows of ``model`` by primary key; missing keys are left out"""
+        keys = {key for key in keys if key is not None}
+        self._fetch({model: keys})
+        loaded = self._loaded[model]
+        return {key: loaded[key] for key in keys if key in loaded}
+
+    def load_related(self, objects: List[Any], *relationships) -> None:
+        """Populate many-to-one ``relationships`` (e.g. ``Exam.creator``) on ``objects``"""
+        plans = []
+        wanted: Dict[type, Set[Any]] = defaultdict(set)
+        for relationship in relationships:
+            attribute, target = self._foreign_key(relationship)
+            wanted[target].update(getattr(obj, attribute) for obj in objects)
+            plans.append((relationship.key, attribute, target))
+
+        self._fetch(wanted)
+        for name, attribute, target in plans:
+            loaded = self._loaded[target]
+            for obj in objects:
+                set_committed_value(obj, name, loaded.get(getattr(obj, attribute)))
+
+    def _fetch(self, wanted: Dict[type, Set[Any]]) -> None:
+        for model, keys in wanted.items():
+            loaded = self._loaded[model]
+            missing = set()
+            for key in keys:
+                if key is None or key in loaded:
+                    continue
+                # Đã có trong session (vd. người dùng hiện tại): không truy vấn lại
+                obj = self.db.identity_map.get(identity_key(model, key))
+                if obj is not None:
+                    loaded[key] = obj
+                else:
+                    missing.add(key)
+            if missing:
+                mapper = inspect(model)
+                pk = mapper.primary_key[0]
+                pk_attribute = mapper.get_property_by_column(pk).key
+                for obj in self.db.query(model).filter(pk.in_(missing)):
+                    loaded[getattr(obj, pk_attribute)] = obj
+
+    @staticmethod
+    def _foreign_key(relationship):
+        prop = relationship.property
+        if prop.uselist or len(prop.local_remote_pairs) != 1:
+            raise ValueError(f"{relationship} is not a single-column many-to-one relationship")
+        local_column, remote_column = prop.local_remote_pairs[0]
+        target = prop.mapper
+        if list(target.primary_key) != [remote_column]:
+            raise ValueError(f"{relationship} does not reference the primary key of {target.class_}")
+        return prop.parent.get_property_by_column(local_column).key, target.class_
+
+
+def get_loader(db: Session = Depends(get_db)) -> BatchLoader:
+    """Dependency: one loader per request, sharing the request's session"""
+    return BatchLoader(db)
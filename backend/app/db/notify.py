@@ -0,0 +1,219 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY
+
+In-process caches (the memory response cache) only see the writes of
+their own worker. After a service write, ``cache.invalidate(...)`` evicts
+locally and publishes the tags with NOTIFY on CACHE_BUS_CHANNEL; every
+worker runs ``invalidation_bus.run()`` from the app lifespan, LISTENs on
+the channel over a dedicated asyncpg connection and evicts the same tags
+from its local caches. A worker ignores its own messages.
+
+``publish`` only queues the tags: a background thread sends the NOTIFYs
+over its own single connection, so a write (often still holding its
+pooled connection in an after-commit callback) never waits on the pool.
+
+Notifications sent while a listener is disconnected are lost, so each
+(re)connect flushes every local cache before listening again. A keep-alive
+query every CACHE_BUS_KEEPALIVE_SECONDS notices dead connections;
+reconnects back off up to CACHE_BUS_MAX_RECONNECT_SECONDS. LISTEN needs a
+session-level connection: behind PgBouncer in transaction mode, DB_HOST
+must still reach PostgreSQL (or a session-mode pool) for the listener.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, select
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads are limited to 8000 bytes; beyond this, ask for a flush
+_MAX_PAYLOAD = 7900
+
+
+class InvalidationBus:
+    def __init__(
+        self,
+        channel: str,
+        dsn: Optional[str] = None,
+        keepalive: float = 30.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.channel = channel
+        self.dsn = dsn or settings.DATABASE_URL
+        self.keepalive = keepalive
+        self.max_reconnect_delay = max_reconnect_delay
+        self.origin = uuid.uuid4().hex
+        self._handlers: List[Tuple[Callable[..., Any], Callable[[], Any]]] = []
+        self._outbox: "queue.Queue[List[str]]" = queue.Queue()
+        self._publisher: Optional[threading.Thread] = None
+        self._publisher_lock = threading.Lock()
+        self._publish_engine = None
+        self.listener_pid: Optional[int] = None
+        self.published = 0
+        self.received = 0
+        self.flushes = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    def subscribe(self, on_tags: Callable[..., Any], on_flush: Callable[[], Any]) -> None:
+        """Register a local cache: ``on_tags(*tags)`` evicts, ``on_flush()`` empties it"""
+        self._handlers.append((on_tags, on_flush))
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._handlers)
+
+    @property
+    def connected(self) -> bool:
+        return self.listener_pid is not None
+
+    def publish(self, tags: Iterable[str]) -> None:
+        """Queue a NOTIFY to the other workers (call after the write committed)"""
+        self._outbox.put(list(tags))
+        if self._publisher is None:
+            with self._publisher_lock:
+                if self._publisher is None:
+                    self._publisher = threading.Thread(
+                        target=self._publish_loop, name="cache-bus-publisher", daemon=True
+                    )
+                    self._publisher.start()
+
+    def wait_published(self, timeout: Optional[float] = None) -> None:
+        """Block until every queued message was sent (or dropped)"""
+        # queue.join() has no timeout; poll unfinished_tasks instead
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._outbox.all_tasks_done:
+            while self._outbox.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return
+                self._outbox.all_tasks_done.wait(remaining)
+
+    def _connection(self):
+        if self._publish_engine is None:
+            # One connection of its own, outside the request pools
+            self._publish_engine = create_engine(
+                settings.DATABASE_URL,
+                pool_size=1,
+                max_overflow=0,
+                pool_pre_ping=True,
+                pool_recycle=settings.DB_POOL_RECYCLE,
+            )
+        return self._publish_engine.begin()
+
+    def _publish_loop(self) -> None:
+        while True:
+            batch = [self._outbox.get()]
+            # Coalesce whatever piled up while the last NOTIFY was in flight
+            while True:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            tags = list(dict.fromkeys(tag for tags in batch for tag in tags))
+            payload = json.dumps({"origin": self.origin, "tags": tags})
+            if len(payload.encode()) > _MAX_PAYLOAD:
+                payload = json.dumps({"origin": self.origin, "flush": True})
+            try:
+                with self._connection() as connection:
+                    connection.execute(select(func.pg_notify(self.channel, payload)))
+                self.published += 1
+            except Exception:
+                # The write is committed; other workers catch up on TTL or reconnect
+                logger.exception("Could not publish cache invalidation %s", payload)
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+    def _dispatch(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed cache invalidation %r", payload)
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        if message.get("flush"):
+            self.flush()
+            return
+        tags = message.get("tags") or []
+        for on_tags, _ in self._handlers:
+            try:
+                on_tags(*tags)
+            except Exception:
+                logger.exception("Cache eviction failed for %s", tags)
+
+    def flush(self) -> None:
+        self.flushes += 1
+        for _, on_flush in self._handlers:
+            try:
+                on_flush()
+            except Exception:
+                logger.exception("Cache flush failed")
+
+    async def run(self) -> None:
+        """Listen until cancelled, reconnecting (and flushing) after failures"""
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn, timeout=10)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._dispatch)
+                # Messages sent while we were not listening are lost: start clean
+                self.flush()
+                self.listener_pid = connection.get_server_pid()
+                delay = 1.0
+                logger.info("Cache invalidation bus listening on %r", self.channel)
+                while True:
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        # Half-open TCP connections only fail when used
+                        await asyncio.wait_for(connection.fetchval("SELECT 1"), self.keepalive)
+                    else:
+                        raise ConnectionError("listener connection closed")
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                self.last_error = f"{type(error).__name__}: {error}"
+                self.reconnects += 1
+                logger.warning(
+                    "Cache invalidation bus disconnected (%s), retrying in %.0fs", error, delay
+                )
+            finally:
+                self.listener_pid = None
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "published": self.published,
+            "pending": self._outbox.qsize(),
+            "received": self.received,
+            "flushes": self.flushes,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+invalidation_bus = InvalidationBus(
+    settings.CACHE_BUS_CHANNEL,
+    keepalive=settings.CACHE_BUS_KEEPALIVE_SECONDS,
+    max_reconnect_delay=settings.CACHE_BUS_MAX_RECONNECT_SECONDS,
+)
@@ -0,0 +1,152 @@
+"""
+Connection pool with checkout wait-time and per-route hold-time metrics
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool, QueuePool
+
+# Route a connection is checked out for (set by EarlyReleaseRoute)
+connection_owner: ContextVar[Optional[str]] = ContextVar("connection_owner", default=None)
+
+
+class PoolWaitStats:
+    """Counters for how long requests wait to get a connection"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)  # Thời gian chờ gần nhất (giây)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self._recent.append(waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": (
+                    round(self.total_wait / attempts * 1000, 3) if attempts else 0.0
+                ),
+                "wait_ms_max": round(self.max_wait * 1000, 3),
+                "wait_ms_p95_recent": (
+                    round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 3)
+                    if recent
+                    else 0.0
+                ),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+        self._checkout_depth = threading.local()
+
+    def recreate(self):
+        # Giữ số liệu khi pool được tạo lại (vd. engine.dispose())
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself: only time the outer call
+        depth = getattr(self._checkout_depth, "value", 0)
+        if depth:
+            return super()._do_get()
+
+        self._checkout_depth.value = 1
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        finally:
+            self._checkout_depth.value = 0
+        self.wait_stats.record(time.perf_counter() - started)
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            **self.wait_stats.snapshot(),
+        }
+
+
+class ConnectionHoldStats:
+    """How long connections stay checked out, per route"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._window = window
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, route: str, held: float) -> None:
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "recent": deque(maxlen=self._window),
+                }
+            stats["count"] += 1
+            stats["total"] += held
+            stats["max"] = max(stats["max"], held)
+            stats["recent"].append(held)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {route: dict(stats, recent=sorted(stats["recent"])) for route, stats in self._routes.items()}
+        return {
+            route: {
+                "checkouts": stats["count"],
+                "hold_ms_avg": round(stats["total"] / stats["count"] * 1000, 3),
+                "hold_ms_max": round(stats["max"] * 1000, 3),
+                "hold_ms_p95_recent": round(
+                    stats["recent"][min(len(stats["recent"]) - 1, int(len(stats["recent"]) * 0.95))] * 1000, 3
+                ),
+            }
+            for route, stats in sorted(routes.items())
+        }
+
+
+hold_stats = ConnectionHoldStats()
+
+
+@event.listens_for(Pool, "checkout")
+def _start_hold(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["held_since"] = (connection_owner.get(), time.perf_counter())
+
+
+@event.listens_for(Pool, "checkin")
+def _end_hold(dbapi_connection, connection_record):
+    held_since = connection_record.info.pop("held_since", None)
+    if held_since is not None:
+        route, started = held_since
+        hold_stats.record(route or "(no route)", time.perf_counter() - started)
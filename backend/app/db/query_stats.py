@@ -0,0 +1,156 @@
+"""
+Per-request SQL statistics
+
+Every statement sent through any engine (sync, async, replica) is counted
+and timed against the active QueryStats. With SQL_QUERY_STATS on,
+QueryStatsMiddleware tracks each request, reports the totals in the
+X-DB-Query-Count / X-DB-Query-Time-Ms response headers and logs
+statements repeated more than SQL_N_PLUS_ONE_THRESHOLD times in one
+request as a likely N+1. assert_query_budget() fails a block that runs
+more statements than allowed (tests, scripts).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STARTED_KEY = "query_stats_started"
+
+
+class QueryStats:
+    """Number, total time and text of the statements run in one scope"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statements[statement] += 1
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_time * 1000, 2)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements run more than ``threshold`` times (N+1 candidates)"""
+        with self._lock:
+            return [(s, n) for s, n in self.statements.most_common() if n > threshold]
+
+    def describe(self, limit: int = 10) -> str:
+        with self._lock:
+            common = self.statements.most_common(limit)
+        return "\n".join(f"{n:>4}x {' '.join(s.split())[:200]}" for s, n in common)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# Process-wide collectors (assert_query_budget): see statements from every thread
+_collectors: List[QueryStats] = []
+
+
+def _targets() -> List[QueryStats]:
+    current = _current.get()
+    return ([current] if current is not None else []) + list(_collectors)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None or _collectors:
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_STARTED_KEY)
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    for stats in _targets():
+        stats.record(statement, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _drop_timer(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(_STARTED_KEY):
+        connection.info[_STARTED_KEY].pop()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements of the current context (request, task) in the block"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Fail if the block runs more than ``max_queries`` statements.
+
+    Counts statements from every thread (TestClient runs the app in its own),
+    so use it around one request or service call at a time.
+    """
+    stats = QueryStats()
+    _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(stats)
+    if stats.count > max_queries:
+        raise AssertionError(
+            f"{stats.count} queries, budget is {max_queries}:\n{stats.describe()}"
+        )
+
+
+class QueryStatsMiddleware:
+    """Adds per-request query count/time headers and logs likely N+1 queries"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"x-db-query-time-ms", str(stats.total_ms).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+        if repeated:
+            statement, times = repeated[0]
+            logger.warning(
+                "Possible N+1 in %s %s: %d queries, %dx %s",
+                scope["method"],
+                scope["path"],
+                stats.count,
+                times,
+                " ".join(statement.split())[:200],
+            )
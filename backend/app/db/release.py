@@ -0,0 +1,73 @@
+"""
+Early connection release
+
+FastAPI closes the ``get_db`` session only after the response has been
+serialized, so a pooled connection stays checked out while large payloads
+are validated and encoded. Routers created with
+``APIRouter(route_class=EarlyReleaseRoute)`` end the request's read-only
+transaction as soon as the handler returns, before serialization (see
+release_connection). The route is also recorded as the owner of every
+connection checked out for the request, for the per-route hold times in
+/system/db-pool.
+"""
+import functools
+import inspect
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from .database import release_async_connection, release_connection
+from .pool import connection_owner
+
+
+async def _release_sessions(values) -> None:
+    for value in values:
+        if isinstance(value, AsyncSession):
+            await release_async_connection(value)
+        elif isinstance(value, Session):
+            await run_in_threadpool(release_connection, value)
+
+
+def _release_after(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def release_after_async(**values):
+            result = await endpoint(**values)
+            await _release_sessions(values.values())
+            return result
+
+        return release_after_async
+
+    @functools.wraps(endpoint)
+    def release_after(**values):
+        # Chạy trong threadpool: trả kết nối ngay tại đây, trước khi serialize
+        result = endpoint(**values)
+        for value in values.values():
+            if isinstance(value, Session):
+                release_connection(value)
+        return result
+
+    return release_after
+
+
+class EarlyReleaseRoute(APIRoute):
+    """APIRoute that returns DB connections to the pool before serializing the response"""
+
+    def get_route_handler(self):
+        if settings.DB_EARLY_RELEASE:
+            self.dependant.call = _release_after(self.dependant.call)
+        handler = super().get_route_handler()
+        owner = f"{','.join(sorted(self.methods))} {self.path_format}"
+
+        async def route_handler(request):
+            token = connection_owner.set(owner)
+            try:
+                return await handler(request)
+            finally:
+                connection_owner.reset(token)
+
+        return route_handler
@@ -0,0 +1,208 @@
+"""
+Read replica routing
+
+Replica-eligible routes declare ``dependencies=[Depends(replica_reads)]``:
+their session then sends SELECTs to the replica (see RoutingSession). The
+request stays on the primary when no replica is configured, when the
+replica lags more than DB_REPLICA_MAX_LAG_SECONDS or cannot be reached,
+and when the same caller committed a write in the last
+DB_READ_YOUR_WRITES_SECONDS, so users always see their own changes.
+Callers are identified by their bearer token; recent writes are tracked
+per worker process.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+from fastapi import Depends
+from sqlalchemy import event, exc, text
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from .database import get_db, replica_engine
+
+logger = logging.getLogger(__name__)
+
+# Độ trễ replication tính bằng giây; 0 khi replica đã phát lại hết WAL nhận được
+REPLICATION_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+_caller: ContextVar[Optional[str]] = ContextVar("db_caller", default=None)
+
+
+class RecentWriters:
+    """Callers that committed a write within the last ``window`` seconds"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+
+    def mark(self, caller: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._until[caller] = now + self.window
+            self._until.move_to_end(caller)
+            # Entries are ordered by expiry: drop the expired ones from the front
+            while self._until:
+                oldest, until = next(iter(self._until.items()))
+                if until > now:
+                    break
+                del self._until[oldest]
+
+    def wrote_recently(self, caller: str) -> bool:
+        with self._lock:
+            until = self._until.get(caller)
+        return until is not None and until > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+
+class ReplicaLagMonitor:
+    """Replication lag of the replica, measured at most once per interval"""
+
+    def __init__(self, engine, max_lag: float, check_interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_seconds: Optional[float] = None  # None: not measured or unreachable
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def usable(self) -> bool:
+        due = time.monotonic() - self._checked_at >= self.check_interval
+        # Một luồng đo lại, các luồng khác dùng kết quả trước đó
+        if due and self._lock.acquire(blocking=False):
+            try:
+                self._check()
+            finally:
+                self._lock.release()
+        return self.lag_seconds is not None and self.lag_seconds <= self.max_lag
+
+    def _check(self) -> None:
+        try:
+            with self.engine.connect() as connection:
+                self.lag_seconds = float(connection.execute(REPLICATION_LAG_SQL).scalar())
+        except exc.SQLAlchemyError as error:
+            if self.lag_seconds is not None:
+                logger.warning("Read replica unavailable, reading from primary: %s", error)
+            self.lag_seconds = None
+        self._checked_at = time.monotonic()
+
+
+recent_writers = RecentWriters(settings.DB_READ_YOUR_WRITES_SECONDS)
+lag_monitor = (
+    ReplicaLagMonitor(
+        replica_engine,
+        settings.DB_REPLICA_MAX_LAG_SECONDS,
+        settings.DB_REPLICA_LAG_CHECK_SECONDS,
+    )
+    if replica_engine is not None
+    else None
+)
+
+_routing_lock = threading.Lock()
+_routing = {"replica": 0, "primary_recent_write": 0, "primary_lag": 0}
+
+
+def _count(decision: str) -> None:
+    with _routing_lock:
+        _routing[decision] += 1
+
+
+def use_replica() -> bool:
+    """Whether the current request may read from the replica"""
+    if lag_monitor is None:
+        return False
+    caller = _caller.get()
+    if caller is not None and recent_writers.wrote_recently(caller):
+        _count("primary_recent_write")
+        return False
+    if not lag_monitor.usable():
+        _count("primary_lag")
+        return False
+    _count("replica")
+    return True
+
+
+def replica_reads(db: Session = Depends(get_db)) -> None:
+    """Route dependency: ``dependencies=[Depends(replica_reads)]`` on read-only routes.
+
+    List it in the route's ``dependencies`` so it runs before the user
+    lookup, which then reads from the replica as well.
+    """
+    db.info["use_replica"] = use_replica()
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session):
+    caller = _caller.get()
+    # Read-only commits (e.g. release_connection) do not make reads sticky
+    if (
+        lag_monitor is not None
+        and caller is not None
+        and session.info.get("has_writes")
+        and not session.info.get("use_replica")
+    ):
+        recent_writers.mark(caller)
+
+
+def _caller_key(scope) -> Optional[str]:
+    token = None
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            token = value.decode("latin-1").partition(" ")[2]
+            break
+    if not token:
+        # WebSocket channels pass the token in the query string
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+    if not token:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class CallerMiddleware:
+    """Remember which caller a request belongs to so commits can be attributed"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        reset_token = _caller.set(_caller_key(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _caller.reset(reset_token)
+
+
+def get_replica_stats() -> Dict[str, Any]:
+    """Replica lag, pool usage and how reads were routed"""
+    if lag_monitor is None:
+        return {"configured": False}
+    pool = replica_engine.pool
+    with _routing_lock:
+        routing = dict(_routing)
+    return {
+        "configured": True,
+        "lag_seconds": lag_monitor.lag_seconds,
+        "max_lag_seconds": lag_monitor.max_lag,
+        "recent_writers": len(recent_writers),
+        "routing": routing,
+        "pool": pool.stats() if hasattr(pool, "stats") else {"pool": type(pool).__name__},
+    }
@@ -1,20 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import api_router
+from .core.compression import CompressionMiddleware
 from .core.config import settings
-from .db.database import engine
-from .models.question import Question
-from .models.user import User
+from .core.responses import ContentNegotiationMiddleware, FastResponse
+from .core.warmup import warm_up
+from .db.notify import invalidation_bus
+from .db.query_stats import QueryStatsMiddleware
+from .db.replica import CallerMiddleware
+from .services.idempotency_service import IdempotencyService
+
+# Database schema is managed by Alembic migrations: alembic upgrade head
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Mở sẵn kết nối pool và nạp thư viện trước khi nhận request
+    await warm_up()
+    # Dọn các Idempotency-Key đã hết hạn định kỳ
+    tasks = [asyncio.create_task(IdempotencyService.purge_expired_periodically())]
+    # Nhận thông báo invalidate cache từ các worker khác
+    if settings.CACHE_BUS_ENABLED and invalidation_bus.has_subscribers:
+        tasks.append(asyncio.create_task(invalidation_bus.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
 
-# Create database tables (includes all models that inherit from Base)
-User.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Backend API",
     description="A well-structured FastAPI backend",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastResponse,
 )
 
 # Set up CORS
@@ -25,6 +51,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Attributes commits to their caller for read-your-writes on the replica
+app.add_middleware(CallerMiddleware)
+# Accept: application/msgpack -> MessagePack responses
+app.add_middleware(ContentNegotiationMiddleware)
+# gzip/brotli above COMPRESSION_MIN_SIZE, streamed exports included
+app.add_middleware(CompressionMiddleware)
+if settings.SQL_QUERY_STATS:
+    app.add_middleware(QueryStatsMiddleware)
 
 # Include API router
 app.include_router(api_router, prefix="/api")
@@ -3,5 +3,18 @@ from .question import Question
 from .user import User
 from .exam_schedule import ExamSchedule
 from .submission import Submission
+from .analytics import ItemStatistic, ScheduleStatistic, ScoreBucket
+from .idempotency import IdempotencyKey
 
-__all__ = ["User", "Question", "Exam", "ExamQuestion", "ExamSchedule", "Submission"]
+__all__ = [
+    "User",
+    "Question",
+    "Exam",
+    "ExamQuestion",
+    "ExamSchedule",
+    "Submission",
+    "ItemStatistic",
+    "ScheduleStatistic",
+    "ScoreBucket",
+    "IdempotencyKey",
+]
@@ -0,0 +1,104 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    UniqueConstraint,
+    func,
+)
+
+from ..db.database import Base
+
+
+class ScheduleStatistic(Base):
+    """Running totals over the graded submissions of an exam schedule"""
+
+    __tablename__ = "schedule_statistics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    exam_schedule_id = Column(
+        Integer, ForeignKey("exam_schedules.id"), unique=True, nullable=False
+    )
+    n_graded = Column(Integer, nullable=False, default=0)  # Số bài đã chấm
+    sum_raw = Column(Float, nullable=False, default=0)  # Tổng số câu đúng
+    sum_raw_sq = Column(Float, nullable=False, default=0)  # Tổng bình phương
+    sum_score = Column(Float, nullable=False, default=0)  # Tổng điểm
+    sum_score_sq = Column(Float, nullable=False, default=0)
+    # Tăng mỗi khi phân phối điểm thay đổi, để worker biết khi nào cần nạp lại
+    score_version = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return (
+            f"<ScheduleStatistic(exam_schedule_id={self.exam_schedule_id}, "
+            f"n_graded={self.n_graded})>"
+        )
+
+
+class ItemStatistic(Base):
+    """Running totals for one question of an exam schedule"""
+
+    __tablename__ = "item_statistics"
+    __table_args__ = (
+        UniqueConstraint(
+            "exam_schedule_id", "question_id", name="uq_item_statistics_item"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    exam_schedule_id = Column(Integer, ForeignKey("exam_schedules.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_order = Column(Integer, nullable=False)
+
+    n_responses = Column(Integer, nullable=False, default=0)
+    n_correct = Column(Integer, nullable=False, default=0)
+    # Tổng điểm thô của các bài làm đúng câu này (dùng cho point-biserial)
+    sum_raw_correct = Column(Float, nullable=False, default=0)
+
+    # Tần suất chọn từng phương án
+    count_a = Column(Integer, nullable=False, default=0)
+    count_b = Column(Integer, nullable=False, default=0)
+    count_c = Column(Integer, nullable=False, default=0)
+    count_d = Column(Integer, nullable=False, default=0)
+    count_blank = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return (
+            f"<ItemStatistic(exam_schedule_id={self.exam_schedule_id}, "
+            f"question_id={self.question_id}, "
+            f"n_correct={self.n_correct}/{self.n_responses})>"
+        )
+
+
+class ScoreBucket(Base):
+    """Number of graded submissions of a schedule with a given score"""
+
+    __tablename__ = "score_buckets"
+    __table_args__ = (
+        UniqueConstraint("exam_schedule_id", "score", name="uq_score_buckets_score"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    exam_schedule_id = Column(Integer, ForeignKey("exam_schedules.id"), nullable=False)
+    score = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<ScoreBucket(exam_schedule_id={self.exam_schedule_id}, "
+            f"score={self.score}, count={self.count})>"
+        )
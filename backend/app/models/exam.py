@@ -3,10 +3,12 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     func,
+    text,
 )
 from sqlalchemy.orm import relationship
 
@@ -15,6 +17,16 @@ from ..db.database import Base
 
 class Exam(Base):
     __tablename__ = "exams"
+    __table_args__ = (
+        Index(
+            "ix_exams_subject_live", "subject", postgresql_where=text("deleted_at IS NULL")
+        ),
+        Index(
+            "ix_exams_created_by_live",
+            "created_by",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String, unique=True, index=True, nullable=False)  # Mã đề thi
@@ -62,6 +74,10 @@ class Exam(Base):
 class ExamQuestion(Base):
     """Junction table for exam and questions with shuffled choices"""
     __tablename__ = "exam_questions"
+    __table_args__ = (
+        # Câu hỏi của một đề theo thứ tự (làm bài, chấm điểm)
+        Index("ix_exam_questions_exam_order", "exam_id", "question_order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False)
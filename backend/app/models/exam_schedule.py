@@ -3,10 +3,12 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     func,
+    text,
 )
 from sqlalchemy.orm import relationship
 
@@ -14,6 +16,18 @@ from ..db.database import Base
 
 class ExamSchedule(Base):
     __tablename__ = "exam_schedules"
+    __table_args__ = (
+        # Phiên thi đang mở của một đề; không partial vì trang bài nộp lọc theo đề
+        # cả với lịch thi đã xóa
+        Index("ix_exam_schedules_exam_active", "exam_id", "is_active"),
+        # Lịch thi chưa kết thúc (dashboard, trang chủ học sinh): ít dòng so với lịch sử
+        Index(
+            "ix_exam_schedules_end_live",
+            "end_time",
+            "start_time",
+            postgresql_where=text("is_active AND deleted_at IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)  # Tên phiên thi
@@ -0,0 +1,44 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
+
+from ..db.database import Base
+
+
+class IdempotencyKey(Base):
+    """Stored response of a request sent with an Idempotency-Key header"""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    # Hash of method, path and body: the same key must not be reused for another request
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL while the request is running
+    # Start of the running request; a pending row older than the lease can be taken over
+    claimed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    response_body = Column(Text, nullable=True)  # JSON
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return (
+            f"<IdempotencyKey(id={self.id}, "
+            f"user_id={self.user_id}, "
+            f"key='{self.key}', "
+            f"status_code={self.status_code})>"
+        )
@@ -3,10 +3,12 @@ from sqlalchemy import (
     Column,
     DateTime,
     Float,
+    Index,
     Integer,
     String,
     create_engine,
     func,
+    text,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
 
@@ -16,6 +18,15 @@ from ..db.database import Base
 # Define Question table: Question
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # Lọc theo môn trên các câu hỏi chưa xóa (danh sách, sinh đề, danh sách môn)
+        Index(
+            "ix_questions_subject_live",
+            "subject",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     code = Column(String)
@@ -1,18 +1,37 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Index, Integer, String, DateTime, Float, ForeignKey, Text, Boolean, UniqueConstraint, func, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..db.database import Base
 
 class Submission(Base):
     __tablename__ = "submissions"
+    __table_args__ = (
+        # One row per attempt: concurrent starts of the same attempt collide here
+        UniqueConstraint(
+            "student_id", "exam_schedule_id", "attempt_number", name="uq_submissions_attempt"
+        ),
+        # Per-schedule reads (browser, gradebook, statistics, latest attempt per student);
+        # per-student lookups use the unique constraint above
+        Index("ix_submissions_schedule_student", "exam_schedule_id", "student_id", "id"),
+        # Submissions of a day (admin dashboard)
+        Index(
+            "ix_submissions_submitted_at",
+            "submitted_at",
+            postgresql_where=text("submitted_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     exam_schedule_id = Column(Integer, ForeignKey("exam_schedules.id"), nullable=False)
     submitted_at = Column(DateTime, nullable=True)
     answers = Column(Text, nullable=False)  # JSON string or text
-    score = Column(Integer, nullable=True)
+    score = Column(Float, nullable=True)
     is_late = Column(Boolean, default=False)
+    attempt_number = Column(Integer, nullable=True)  # Lần thi thứ mấy (1-based)
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
+    draft_answers = Column(Text, nullable=True)  # Autosaved {"question_id": "option"} JSON
+    answer_seq = Column(Integer, nullable=False, server_default="0")  # Last applied answer frame
 
     student = relationship("User")
     exam_schedule = relationship("ExamSchedule")
\ No newline at end of file
@@ -11,6 +11,7 @@ from .question import QuestionCreate, QuestionInDB, QuestionOut, QuestionUpdate
 from .user import Token, TokenData, UserCreate, UserInDB, UserOut, UserUpdate
 from .exam_schedule import ExamScheduleCreate, ExamScheduleOut, ExamScheduleUpdate
 from .submission import SubmissionCreate, SubmissionOut
+from .analytics import ItemAnalysisOut, ItemStatisticOut, ScoreSummaryOut
 
 __all__ = [
     "UserCreate",
@@ -34,5 +35,8 @@ __all__ = [
     "ExamScheduleOut",
     "ExamScheduleUpdate",
     "SubmissionCreate",
-    "SubmissionOut"
+    "SubmissionOut",
+    "ItemAnalysisOut",
+    "ItemStatisticOut",
+    "ScoreSummaryOut",
 ]
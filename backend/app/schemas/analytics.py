@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class DistractorStat(BaseModel):
+    count: int
+    proportion: Optional[float] = None
+
+
+class ItemStatisticOut(BaseModel):
+    question_id: int
+    question_order: int
+    n_responses: int
+    n_correct: int
+    difficulty: Optional[float] = None  # p-value: tỉ lệ làm đúng
+    discrimination: Optional[float] = None  # point-biserial
+    distractors: Dict[str, DistractorStat]
+
+
+class ItemAnalysisOut(BaseModel):
+    exam_schedule_id: int
+    n_graded: int
+    mean_raw_score: Optional[float] = None
+    sd_raw_score: Optional[float] = None
+    kr20: Optional[float] = None
+    items: List[ItemStatisticOut] = []
+
+
+class ScoreBucketOut(BaseModel):
+    score: float
+    count: int
+
+
+class ScoreSummaryOut(BaseModel):
+    exam_schedule_id: int
+    n_graded: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    histogram: List[ScoreBucketOut] = []
+    student_id: Optional[int] = None
+    student_score: Optional[float] = None
+    student_percentile: Optional[float] = None  # Phần trăm bài có điểm thấp hơn
+
+
+class GroupCountOut(BaseModel):
+    key: Optional[str] = None
+    count: int
+
+
+class AdminDashboardOut(BaseModel):
+    users_by_role: List[GroupCountOut] = []
+    questions_by_subject: List[GroupCountOut] = []
+    exams_by_creator: List[GroupCountOut] = []  # key: tên đăng nhập người tạo
+    active_schedules: int = 0  # Đang bật và chưa kết thúc
+    open_schedules: int = 0  # Trong số đó, đang trong giờ thi
+    submissions_today: int = 0  # Nộp từ 0h UTC hôm nay
+    generated_at: datetime
@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class BatchRequestItem(BaseModel):
+    id: Optional[str] = None  # Trả lại nguyên trong kết quả để client ghép cặp
+    method: str = "GET"
+    path: str  # e.g. "/exams/subjects" or "/api/submissions/?fields=id,score"
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+    @field_validator("method")
+    @classmethod
+    def validate_method(cls, v):
+        v = v.upper()
+        if v not in ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"]:
+            raise ValueError("Unsupported method")
+        return v
+
+    @field_validator("path")
+    @classmethod
+    def validate_path(cls, v):
+        if not v.startswith("/"):
+            raise ValueError("Path must start with /")
+        return v
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem] = Field(..., min_length=1)
+
+
+class BatchResponseItem(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResponseItem]
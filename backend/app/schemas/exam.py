@@ -81,6 +81,7 @@ class ExamOut(ExamBase):
     created_at: datetime
     updated_at: datetime
     deleted_at: Optional[datetime] = None
+    creator_username: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -138,7 +139,6 @@ class ExamQuestionDetail(BaseModel):
 class ExamDetailResponse(ExamOut):
     """Detailed exam response with questions"""
     questions: List[ExamQuestionDetail] = []
-    creator_username: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -19,6 +19,7 @@ class ExamScheduleOut(ExamScheduleBase):
     is_active: bool
     created_at: datetime
     updated_at: datetime
+    exam_title: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -34,3 +35,16 @@ class ExamScheduleUpdate(BaseModel):
 class ExamSchedulePaginationOut(BaseModel):
     data: List[ExamScheduleOut]
     pagination: Dict[str, Any]
+
+class InProgressSubmissionOut(BaseModel):
+    id: int
+    attempt_number: Optional[int] = None
+    started_at: Optional[datetime] = None
+
+class StudentHomeScheduleOut(ExamScheduleOut):
+    attempts: int = 0  # Số lần đã bắt đầu làm (kể cả bài đang làm)
+    remaining_attempts: int = 0
+    in_progress: Optional[InProgressSubmissionOut] = None  # Bài đang làm dở, để vào làm tiếp
+
+class StudentHomeOut(BaseModel):
+    schedules: List[StudentHomeScheduleOut]  # Đang mở hoặc sắp mở, theo giờ bắt đầu
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class SubmissionCreate(BaseModel):
@@ -12,8 +12,24 @@ class SubmissionOut(BaseModel):
     exam_schedule_id: int
     submitted_at: Optional[datetime]
     answers: str
-    score: Optional[int]
+    score: Optional[float]
     is_late: bool
+    attempt_number: Optional[int] = None
+    started_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SubmissionListItem(BaseModel):
+    """Submission row for the teacher browser (answers left out)"""
+    id: int
+    student_id: int
+    student_username: Optional[str] = None
+    exam_schedule_id: int
+    submitted_at: Optional[datetime]
+    score: Optional[float]
+    is_late: Optional[bool]
+
+class SubmissionBrowsePage(BaseModel):
+    data: List[SubmissionListItem]
+    next_cursor: Optional[int] = None  # Truyền lại làm ?cursor= để lấy trang sau
@@ -4,6 +4,11 @@ from .user_service import UserService
 from .exam_service import ExamService
 from .exam_schedule_service import ExamScheduleService
 from .submission_service import create_submission, get_submissions_by_student
+from .item_analysis_service import ItemAnalysisService
+from .score_distribution_service import ScoreDistributionService
+from .idempotency_service import IdempotencyService
+from .exam_session_service import ExamSessionService
+from .proctoring_service import ProctoringService
 
 __all__ = [
     "create_access_token",
@@ -12,5 +17,10 @@ __all__ = [
     "UserService",
     "QuestionService",
     "ExamService",
-    "ExamScheduleService"
+    "ExamScheduleService",
+    "ItemAnalysisService",
+    "ScoreDistributionService",
+    "IdempotencyService",
+    "ExamSessionService",
+    "ProctoringService",
 ]
@@ -1,15 +1,22 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Optional, Tuple
 
-from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..schemas.user import TokenData
 
+# /api/batch resolves its caller once; the sub-requests reuse that user
+_resolved_user: ContextVar[Optional[Tuple[str, Any]]] = ContextVar("resolved_user", default=None)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -27,6 +34,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str, credentials_exception) -> TokenData:
     """Verify JWT token"""
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -49,10 +58,31 @@ def verify_token(token: str, credentials_exception) -> TokenData:
         raise credentials_exception
 
 
+@contextmanager
+def reuse_current_user(token: str, user):
+    """Within this block, get_current_user(…, token) returns ``user`` without a lookup"""
+    reset = _resolved_user.set((token, user))
+    try:
+        yield
+    finally:
+        _resolved_user.reset(reset)
+
+
+def _reused_user(token: str):
+    resolved = _resolved_user.get()
+    if resolved is not None and resolved[0] == token:
+        return resolved[1]
+    return None
+
+
 def get_current_user(db: Session, token: str):
     """Get current user from JWT token"""
     from fastapi import HTTPException, status
 
+    user = _reused_user(token)
+    if user is not None:
+        return user
+
     from .user_service import get_user_by_id, get_user_by_username
 
     credentials_exception = HTTPException(
@@ -74,3 +104,11 @@ def get_current_user(db: Session, token: str):
     if user is None:
         raise credentials_exception
     return user
+
+
+async def get_current_user_async(db: AsyncSession, token: str):
+    """get_current_user for async sessions (runs the same lookup on its sync facade)"""
+    user = _reused_user(token)
+    if user is not None:
+        return user
+    return await db.run_sync(get_current_user, token)
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import case, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from ..core.cache import hot_reads
+from ..core.config import settings
+from ..models.exam import Exam
+from ..models.exam_schedule import ExamSchedule
+from ..models.question import Question
+from ..models.submission import Submission
+from ..models.user import User
+from ..schemas.analytics import AdminDashboardOut, GroupCountOut
+
+# Writes to these evict the dashboard; submissions are too frequent and rely on the TTL
+DASHBOARD_TAGS = ("users", "questions", "exams", "schedules")
+
+
+class DashboardService:
+    """Service for the admin dashboard counts"""
+
+    @staticmethod
+    def _counts_query(today: datetime):
+        """Every dashboard count as (metric, key, count) rows of one statement"""
+        now = func.now()
+        creators = (
+            select(Exam.created_by, func.count().label("count"))
+            .where(Exam.deleted_at.is_(None))
+            .group_by(Exam.created_by)
+            .subquery()
+        )
+        schedules = (
+            select(case((ExamSchedule.start_time <= now, "open"), else_="upcoming").label("state"))
+            .where(
+                ExamSchedule.is_active,
+                ExamSchedule.deleted_at.is_(None),
+                ExamSchedule.end_time > now,
+            )
+            .subquery()
+        )
+        return union_all(
+            select(literal("users_by_role").label("metric"), User.role.label("key"), func.count().label("count"))
+            .where(User.deleted_at.is_(None))
+            .group_by(User.role),
+            select(literal("questions_by_subject"), Question.subject, func.count())
+            .where(Question.deleted_at.is_(None))
+            .group_by(Question.subject),
+            select(literal("exams_by_creator"), User.username, creators.c.count).join_from(
+                creators, User, User.id == creators.c.created_by
+            ),
+            select(literal("schedules"), schedules.c.state, func.count()).group_by(schedules.c.state),
+            # submitted_at is stored as naive UTC
+            select(literal("submissions_today"), null(), func.count()).where(
+                Submission.submitted_at >= today
+            ),
+        )
+
+    @staticmethod
+    def count_admin_dashboard(db: Session) -> AdminDashboardOut:
+        """Compute the dashboard counts (1 query)"""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        groups: Dict[str, List[GroupCountOut]] = {
+            "users_by_role": [],
+            "questions_by_subject": [],
+            "exams_by_creator": [],
+        }
+        schedules: Dict[str, int] = {}
+        submissions_today = 0
+        for metric, key, count in db.execute(DashboardService._counts_query(today)):
+            if metric in groups:
+                groups[metric].append(GroupCountOut(key=key, count=count))
+            elif metric == "schedules":
+                schedules[key] = count
+            else:
+                submissions_today = count
+        for counts in groups.values():
+            counts.sort(key=lambda item: (-item.count, item.key or ""))
+        return AdminDashboardOut(
+            **groups,
+            active_schedules=sum(schedules.values()),
+            open_schedules=schedules.get("open", 0),
+            submissions_today=submissions_today,
+            generated_at=datetime.utcnow(),
+        )
+
+    @staticmethod
+    def get_admin_dashboard(db: Session) -> AdminDashboardOut:
+        """Dashboard counts, cached for DASHBOARD_CACHE_TTL_SECONDS and evicted by writes"""
+        return hot_reads.get(
+            ("admin-dashboard",),
+            DASHBOARD_TAGS,
+            lambda: DashboardService.count_admin_dashboard(db),
+            ttl=settings.DASHBOARD_CACHE_TTL_SECONDS,
+        )
+
+
+# Backward compatibility functions
+def count_admin_dashboard(db: Session) -> AdminDashboardOut:
+    return DashboardService.count_admin_dashboard(db)
+
+def get_admin_dashboard(db: Session) -> AdminDashboardOut:
+    return DashboardService.get_admin_dashboard(db)
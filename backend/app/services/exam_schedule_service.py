@@ -1,11 +1,30 @@
 import math
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, func, select
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from ..core.cache import hot_reads, invalidate, student_homes
+from ..core.fields import Fields, load_only_fields
+from ..models.exam import Exam, ExamQuestion
 from ..models.exam_schedule import ExamSchedule
-from ..schemas.exam_schedule import ExamScheduleCreate, ExamScheduleUpdate
+from ..models.question import Question
+from ..models.submission import Submission
+from ..schemas.exam_schedule import (
+    ExamScheduleCreate,
+    ExamScheduleOut,
+    ExamScheduleUpdate,
+    InProgressSubmissionOut,
+    StudentHomeOut,
+    StudentHomeScheduleOut,
+)
+
+# Advisory lock namespace (first key of pg_advisory_xact_lock(int, int))
+EXAM_START_LOCK = 1
 
 class ExamScheduleService:
     """Service for exam schedule operations"""
@@ -15,6 +34,7 @@ class ExamScheduleService:
         schedule = ExamSchedule(**schedule_in.dict())
         db.add(schedule)
         db.commit()
+        invalidate("schedules")
         db.refresh(schedule)
         return schedule
 
@@ -34,21 +54,15 @@ class ExamScheduleService:
         search: Optional[str] = None,
         is_active: Optional[bool] = None,
         exam_id: Optional[int] = None,
+        fields: Fields = None,
     ) -> Dict[str, Any]:
         query = db.query(ExamSchedule).filter(ExamSchedule.deleted_at.is_(None))
-
-        if search:
-            query = query.filter(
-                ExamSchedule.title.ilike(f"%{search}%")
-                | ExamSchedule.description.ilike(f"%{search}%")
-            )
-        if is_active is not None:
-            query = query.filter(ExamSchedule.is_active == is_active)
-        if exam_id is not None:  # Thêm filter này
-            query = query.filter(ExamSchedule.exam_id == exam_id)
+        query = ExamScheduleService._filter_schedules(query, search, is_active, exam_id)
 
         total = query.count()
-        schedules = query.offset(skip).limit(limit).all()
+        # exam_title is read through exam_id
+        query = load_only_fields(query, ExamSchedule, fields, "exam_id")
+        schedules = query.order_by(ExamSchedule.id).offset(skip).limit(limit).all()
         pages = math.ceil(total / limit) if limit > 0 else 1
 
         return {
@@ -61,6 +75,174 @@ class ExamScheduleService:
             },
         }
 
+    @staticmethod
+    def _filter_schedules(
+        query,
+        search: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        exam_id: Optional[int] = None,
+    ):
+        if search:
+            query = query.filter(
+                ExamSchedule.title.ilike(f"%{search}%")
+                | ExamSchedule.description.ilike(f"%{search}%")
+            )
+        if is_active is not None:
+            query = query.filter(ExamSchedule.is_active == is_active)
+        if exam_id is not None:  # Thêm filter này
+            query = query.filter(ExamSchedule.exam_id == exam_id)
+        return query
+
+    @staticmethod
+    def get_schedules_version(
+        db: Session,
+        search: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        exam_id: Optional[int] = None,
+    ) -> tuple:
+        """Version of a filtered schedule list, for ETags (1 query, no rows loaded).
+
+        The count catches deletions, the highest id additions; exams are
+        included for exam_title.
+        """
+        query = (
+            db.query(
+                func.count(ExamSchedule.id),
+                func.max(ExamSchedule.id),
+                func.max(ExamSchedule.updated_at),
+                func.max(Exam.updated_at),
+            )
+            .outerjoin(Exam, Exam.id == ExamSchedule.exam_id)
+            .filter(ExamSchedule.deleted_at.is_(None))
+        )
+        query = ExamScheduleService._filter_schedules(query, search, is_active, exam_id)
+        return tuple(query.one())
+
+    @staticmethod
+    def get_schedule_version(db: Session, schedule_id: int) -> Optional[tuple]:
+        """Version of one schedule and its exam (1 query); None if not found"""
+        row = (
+            db.query(ExamSchedule.updated_at, Exam.updated_at)
+            .outerjoin(Exam, Exam.id == ExamSchedule.exam_id)
+            .filter(and_(ExamSchedule.id == schedule_id, ExamSchedule.deleted_at.is_(None)))
+            .first()
+        )
+        return tuple(row) if row is not None else None
+
+    @staticmethod
+    def get_schedule_detail(db: Session, schedule_id: int) -> Optional[Tuple[tuple, ExamScheduleOut]]:
+        """get_schedule_version and the schedule with its exam title (1 query, shared by concurrent callers)"""
+
+        def load():
+            row = (
+                db.query(ExamSchedule, Exam.updated_at, Exam.title)
+                .outerjoin(Exam, Exam.id == ExamSchedule.exam_id)
+                .filter(and_(ExamSchedule.id == schedule_id, ExamSchedule.deleted_at.is_(None)))
+                .first()
+            )
+            if row is None:
+                return None
+            schedule, exam_updated_at, exam_title = row
+            schedule_out = ExamScheduleOut.model_validate(schedule).model_copy(
+                update={"exam_title": exam_title}
+            )
+            return (schedule.updated_at, exam_updated_at), schedule_out
+
+        return hot_reads.get(("schedule", schedule_id), [f"schedule:{schedule_id}", "exams"], load)
+
+    @staticmethod
+    def get_exam_data(db: Session, schedule_id: int) -> Optional[Dict[str, Any]]:
+        """Schedule and exam (None if deleted) as plain data for the exam page (1 query, shared)"""
+
+        def load():
+            row = (
+                db.query(ExamSchedule, Exam)
+                .outerjoin(Exam, and_(Exam.id == ExamSchedule.exam_id, Exam.deleted_at.is_(None)))
+                .filter(ExamSchedule.id == schedule_id)
+                .first()
+            )
+            if row is None:
+                return None
+            schedule, exam = row
+            return {"exam_schedule": jsonable_encoder(schedule), "exam": jsonable_encoder(exam)}
+
+        return hot_reads.get(("exam-data", schedule_id), [f"schedule:{schedule_id}", "exams"], load)
+
+    @staticmethod
+    def get_student_home(db: Session, student_id: int) -> StudentHomeOut:
+        """Schedules that have not ended, with the student's attempts and any attempt to resume.
+
+        One query: the running schedules come from a partial index, each
+        one's attempts from the student's rows in uq_submissions_attempt.
+        Cached per student; starting or submitting an attempt evicts it.
+        """
+
+        def load():
+            attempts = (
+                select(func.count().label("attempts"))
+                .where(
+                    Submission.student_id == student_id,
+                    Submission.exam_schedule_id == ExamSchedule.id,
+                )
+                .lateral("attempts")
+            )
+            in_progress = (
+                select(Submission.id, Submission.attempt_number, Submission.started_at)
+                .where(
+                    Submission.student_id == student_id,
+                    Submission.exam_schedule_id == ExamSchedule.id,
+                    Submission.answers == "[]",
+                    Submission.submitted_at.is_(None),
+                )
+                .order_by(Submission.id.desc())
+                .limit(1)
+                .lateral("in_progress")
+            )
+            rows = db.execute(
+                select(
+                    ExamSchedule,
+                    Exam.title,
+                    attempts.c.attempts,
+                    in_progress.c.id,
+                    in_progress.c.attempt_number,
+                    in_progress.c.started_at,
+                )
+                .outerjoin(Exam, Exam.id == ExamSchedule.exam_id)
+                .join(attempts, true())
+                .outerjoin(in_progress, true())
+                .where(
+                    # Matches the ix_exam_schedules_end_live predicate (IS TRUE would not)
+                    ExamSchedule.is_active,
+                    ExamSchedule.deleted_at.is_(None),
+                    ExamSchedule.end_time > func.now(),
+                )
+                .order_by(ExamSchedule.start_time, ExamSchedule.id)
+            ).all()
+
+            schedules = []
+            for schedule, exam_title, count, submission_id, attempt_number, started_at in rows:
+                max_attempts = schedule.max_attempts or 1
+                schedules.append(
+                    StudentHomeScheduleOut.model_validate(schedule).model_copy(
+                        update={
+                            "max_attempts": max_attempts,
+                            "exam_title": exam_title,
+                            "attempts": count,
+                            "remaining_attempts": max(max_attempts - count, 0),
+                            "in_progress": InProgressSubmissionOut(
+                                id=submission_id, attempt_number=attempt_number, started_at=started_at
+                            )
+                            if submission_id is not None
+                            else None,
+                        }
+                    )
+                )
+            return StudentHomeOut(schedules=schedules)
+
+        return student_homes.get(
+            ("student-home", student_id), [f"student:{student_id}", "schedules", "exams"], load
+        )
+
     @staticmethod
     def update_schedule(
         db: Session, schedule_id: int, schedule_in: ExamScheduleUpdate
@@ -85,6 +267,7 @@ class ExamScheduleService:
         new_schedule = ExamSchedule(**new_data)
         db.add(new_schedule)
         db.commit()
+        invalidate("schedules", f"schedule:{schedule_id}")
         db.refresh(new_schedule)
         return new_schedule
 
@@ -96,6 +279,7 @@ class ExamScheduleService:
 
         schedule.is_active = False
         db.commit()
+        invalidate("schedules", f"schedule:{schedule_id}")
         db.refresh(schedule)
         return True
 
@@ -107,8 +291,165 @@ class ExamScheduleService:
 
         schedule.deleted_at = func.now()
         db.commit()
+        invalidate("schedules", f"schedule:{schedule_id}")
         return True
 
+    @staticmethod
+    def _active_schedule_for_exam(exam_id: int):
+        return and_(
+            ExamSchedule.exam_id == exam_id,
+            ExamSchedule.is_active.is_(True),
+            ExamSchedule.deleted_at.is_(None),
+        )
+
+    @staticmethod
+    def get_or_create_exam_session(db: Session, exam_id: int) -> ExamScheduleOut:
+        """Return the exam's running schedule, creating a 60 minute one if none.
+
+        The lookup joins the exam so the common case (schedule exists) is one
+        query. Creation re-checks under a per-exam advisory transaction lock,
+        so concurrent starts cannot create duplicate schedules.
+        """
+        row = db.execute(
+            select(Exam.title, ExamSchedule)
+            .outerjoin(ExamSchedule, ExamScheduleService._active_schedule_for_exam(exam_id))
+            .where(Exam.id == exam_id, Exam.deleted_at.is_(None))
+            .order_by(ExamSchedule.id.desc())
+            .limit(1)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Exam not found")
+        exam_title, schedule = row
+
+        if schedule is None:
+            db.execute(select(func.pg_advisory_xact_lock(EXAM_START_LOCK, exam_id)))
+            schedule = (
+                db.query(ExamSchedule)
+                .filter(ExamScheduleService._active_schedule_for_exam(exam_id))
+                .order_by(ExamSchedule.id.desc())
+                .first()
+            )
+            if schedule is None:
+                # Create new exam schedule
+                now = datetime.now(timezone.utc)
+                schedule = ExamSchedule(
+                    title=f"Bài thi: {exam_title}",
+                    description=f"Bài thi {exam_title} - Thời gian: 60 phút",
+                    exam_id=exam_id,
+                    start_time=now,
+                    end_time=now + timedelta(minutes=60),  # 60 minutes duration
+                    is_active=True,
+                )
+                db.add(schedule)
+                db.commit()  # Also releases the advisory lock
+                invalidate("schedules")
+                db.refresh(schedule)
+                return ExamScheduleOut.model_validate(schedule)
+
+        # Check if it's still within time
+        now = datetime.now(timezone.utc)
+        if schedule.start_time <= now <= schedule.end_time:
+            return ExamScheduleOut.model_validate(schedule)
+        elif now > schedule.end_time:
+            raise HTTPException(status_code=400, detail="Exam time has expired")
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Exam will start at {schedule.start_time.strftime('%Y-%m-%d %H:%M:%S')}",
+            )
+
+    @staticmethod
+    async def get_paper_version(db: AsyncSession, schedule_id: int) -> Optional[tuple]:
+        """What get_schedule_with_exam's result depends on (1 query).
+
+        None when the schedule or its exam does not exist. Exam questions are
+        only inserted, never edited, so their count and highest id cover them.
+        Concurrent callers share the query; the result is kept in hot_reads.
+        """
+
+        async def load():
+            row = (
+                await db.execute(
+                    select(
+                        ExamSchedule.updated_at,
+                        Exam.updated_at,
+                        func.max(Question.updated_at),
+                        func.count(ExamQuestion.id),
+                        func.max(ExamQuestion.id),
+                    )
+                    .join(Exam, Exam.id == ExamSchedule.exam_id)
+                    .outerjoin(ExamQuestion, ExamQuestion.exam_id == Exam.id)
+                    .outerjoin(Question, Question.id == ExamQuestion.question_id)
+                    .where(ExamSchedule.id == schedule_id)
+                    .group_by(ExamSchedule.id, Exam.id)
+                )
+            ).first()
+            return tuple(row) if row is not None else None
+
+        return await hot_reads.aget(
+            ("paper-version", schedule_id), [f"schedule:{schedule_id}", "exams", "questions"], load
+        )
+
+    @staticmethod
+    async def get_schedule_with_exam(db: AsyncSession, schedule_id: int) -> Dict[str, Any]:
+        """Schedule, exam and ordered questions for the exam-taking page (2 queries)"""
+        row = (
+            await db.execute(
+                select(ExamSchedule, Exam)
+                .outerjoin(Exam, Exam.id == ExamSchedule.exam_id)
+                .where(ExamSchedule.id == schedule_id)
+            )
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Exam schedule not found")
+        schedule, exam = row
+        if exam is None:
+            raise HTTPException(status_code=404, detail="Exam not found")
+
+        rows = await db.execute(
+            select(Question, ExamQuestion.question_order)
+            .join(ExamQuestion, ExamQuestion.question_id == Question.id)
+            .where(ExamQuestion.exam_id == exam.id)
+            .order_by(ExamQuestion.question_order)
+        )
+        questions = [
+            {
+                "id": question.id,
+                "content": question.content,
+                "content_img": question.content_img,
+                "choiceA": question.choiceA,
+                "choiceB": question.choiceB,
+                "choiceC": question.choiceC,
+                "choiceD": question.choiceD,
+                "answer": question.answer,
+                "mark": question.mark,
+                "unit": question.unit,
+                "subject": question.subject,
+                "question_order": question_order,
+            }
+            for question, question_order in rows
+        ]
+
+        return {
+            "schedule": {
+                "id": schedule.id,
+                "title": schedule.title,
+                "description": schedule.description,
+                "exam_id": schedule.exam_id,
+                "start_time": schedule.start_time,
+                "end_time": schedule.end_time,
+                "is_active": schedule.is_active,
+            },
+            "exam": {
+                "id": exam.id,
+                "title": exam.title,
+                "description": exam.description,
+                "questions": questions,
+                "duration": exam.duration,
+            },
+        }
+
+
 # Backward compatibility functions
 def create_schedule(db: Session, schedule_in: ExamScheduleCreate) -> ExamSchedule:
     return ExamScheduleService.create_schedule(db, schedule_in)
@@ -123,8 +464,31 @@ def get_schedules_with_pagination(
     search: Optional[str] = None,
     is_active: Optional[bool] = None,
     exam_id: Optional[int] = None,
+    fields: Fields = None,
 ) -> Dict[str, Any]:
-    return ExamScheduleService.get_schedules_with_pagination(db, skip, limit, search, is_active, exam_id)
+    return ExamScheduleService.get_schedules_with_pagination(
+        db, skip, limit, search, is_active, exam_id, fields
+    )
+
+def get_schedules_version(
+    db: Session,
+    search: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    exam_id: Optional[int] = None,
+) -> tuple:
+    return ExamScheduleService.get_schedules_version(db, search, is_active, exam_id)
+
+def get_schedule_version(db: Session, schedule_id: int) -> Optional[tuple]:
+    return ExamScheduleService.get_schedule_version(db, schedule_id)
+
+def get_schedule_detail(db: Session, schedule_id: int) -> Optional[Tuple[tuple, ExamScheduleOut]]:
+    return ExamScheduleService.get_schedule_detail(db, schedule_id)
+
+def get_exam_data(db: Session, schedule_id: int) -> Optional[Dict[str, Any]]:
+    return ExamScheduleService.get_exam_data(db, schedule_id)
+
+def get_student_home(db: Session, student_id: int) -> StudentHomeOut:
+    return ExamScheduleService.get_student_home(db, student_id)
 
 def update_schedule(
     db: Session, schedule_id: int, schedule_in: ExamScheduleUpdate
@@ -135,4 +499,14 @@ def deactivate_schedule(db: Session, schedule_id: int) -> bool:
     return ExamScheduleService.deactivate_schedule(db, schedule_id)
 
 def delete_schedule(db: Session, schedule_id: int) -> bool:
-    return ExamScheduleService.delete_schedule(db, schedule_id)
\ No newline at end of file
+    return ExamScheduleService.delete_schedule(db, schedule_id)
+
+def get_or_create_exam_session(db: Session, exam_id: int) -> ExamScheduleOut:
+    return ExamScheduleService.get_or_create_exam_session(db, exam_id)
+
+
+async def get_schedule_with_exam(db: AsyncSession, schedule_id: int) -> Dict[str, Any]:
+    return await ExamScheduleService.get_schedule_with_exam(db, schedule_id)
+
+async def get_paper_version(db: AsyncSession, schedule_id: int) -> Optional[tuple]:
+    return await ExamScheduleService.get_paper_version(db, schedule_id)
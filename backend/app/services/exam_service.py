@@ -2,8 +2,10 @@ import random
 from typing import List, Optional
 
 from sqlalchemy import and_, func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 
+from ..core.cache import invalidate
+from ..core.fields import Fields, load_only_fields
 from ..models.exam import Exam, ExamQuestion
 from ..models.question import Question
 from ..models.user import User
@@ -26,6 +28,7 @@ class ExamService:
         )
         db.add(db_exam)
         db.commit()
+        invalidate("exams")
         db.refresh(db_exam)
         return db_exam
 
@@ -57,9 +60,11 @@ class ExamService:
         subject: Optional[str] = None,
         created_by: Optional[int] = None,
         include_deleted: bool = False,
+        fields: Fields = None,
     ) -> List[Exam]:
         """Get list of exams with pagination and filters"""
-        query = db.query(Exam)
+        # creator_username is read through created_by
+        query = load_only_fields(db.query(Exam), Exam, fields, "created_by")
         
         if not include_deleted:
             query = query.filter(Exam.deleted_at.is_(None))
@@ -70,7 +75,7 @@ class ExamService:
         if created_by:
             query = query.filter(Exam.created_by == created_by)
         
-        return query.offset(skip).limit(limit).all()
+        return query.order_by(Exam.id).offset(skip).limit(limit).all()
 
     @staticmethod
     def get_exams_count(
@@ -93,6 +98,62 @@ class ExamService:
         
         return query.scalar()
 
+    @staticmethod
+    def get_exams_version(
+        db: Session,
+        subject: Optional[str] = None,
+        created_by: Optional[int] = None,
+    ) -> tuple:
+        """Version of a filtered exam list, for ETags (1 query, no rows loaded).
+
+        The count catches deletions, the highest id additions; creators are
+        included for creator_username.
+        """
+        query = (
+            db.query(
+                func.count(Exam.id),
+                func.max(Exam.id),
+                func.max(Exam.updated_at),
+                func.max(User.updated_at),
+            )
+            .outerjoin(User, User.id == Exam.created_by)
+            .filter(Exam.deleted_at.is_(None))
+        )
+
+        if subject:
+            query = query.filter(Exam.subject == subject)
+
+        if created_by:
+            query = query.filter(Exam.created_by == created_by)
+
+        return tuple(query.one())
+
+    @staticmethod
+    def get_exam_version(db: Session, exam_id: int) -> Optional[tuple]:
+        """Owner and version of an exam with its questions (1 query); None if not found.
+
+        Returns (created_by, version) so callers can check ownership first.
+        """
+        row = (
+            db.query(
+                Exam.created_by,
+                Exam.updated_at,
+                User.updated_at,
+                func.max(Question.updated_at),
+                func.count(ExamQuestion.id),
+            )
+            .outerjoin(User, User.id == Exam.created_by)
+            .outerjoin(ExamQuestion, ExamQuestion.exam_id == Exam.id)
+            .outerjoin(Question, Question.id == ExamQuestion.question_id)
+            .filter(Exam.id == exam_id)
+            .filter(Exam.deleted_at.is_(None))
+            .group_by(Exam.id, User.id)
+            .first()
+        )
+        if row is None:
+            return None
+        return row[0], tuple(row[1:])
+
     @staticmethod
     def update_exam(db: Session, exam_id: int, exam_update: ExamUpdate) -> Optional[Exam]:
         """Update exam"""
@@ -105,6 +166,7 @@ class ExamService:
             setattr(db_exam, field, value)
 
         db.commit()
+        invalidate("exams", f"exam:{exam_id}")
         db.refresh(db_exam)
         return db_exam
 
@@ -117,6 +179,7 @@ class ExamService:
 
         db_exam.deleted_at = func.now()
         db.commit()
+        invalidate("exams", f"exam:{exam_id}")
         return True
 
     @staticmethod
@@ -128,6 +191,7 @@ class ExamService:
 
         db_exam.deleted_at = None
         db.commit()
+        invalidate("exams", f"exam:{exam_id}")
         return True
 
     @staticmethod
@@ -135,7 +199,10 @@ class ExamService:
         """Get exam with its questions"""
         return (
             db.query(Exam)
-            .options(joinedload(Exam.exam_questions))
+            .options(
+                joinedload(Exam.creator),
+                selectinload(Exam.exam_questions).joinedload(ExamQuestion.question),
+            )
             .filter(Exam.id == exam_id)
             .filter(Exam.deleted_at.is_(None))
             .first()
@@ -197,6 +264,7 @@ class ExamService:
             db.add(exam_question)
 
         db.commit()
+        invalidate("exams")
         db.refresh(db_exam)
         return db_exam
 
@@ -237,8 +305,9 @@ def get_exams(
     subject: Optional[str] = None,
     created_by: Optional[int] = None,
     include_deleted: bool = False,
+    fields: Fields = None,
 ) -> List[Exam]:
-    return ExamService.get_exams(db, skip, limit, subject, created_by, include_deleted)
+    return ExamService.get_exams(db, skip, limit, subject, created_by, include_deleted, fields)
 
 
 def get_exams_count(
@@ -250,6 +319,18 @@ def get_exams_count(
     return ExamService.get_exams_count(db, subject, created_by, include_deleted)
 
 
+def get_exams_version(
+    db: Session,
+    subject: Optional[str] = None,
+    created_by: Optional[int] = None,
+) -> tuple:
+    return ExamService.get_exams_version(db, subject, created_by)
+
+
+def get_exam_version(db: Session, exam_id: int) -> Optional[tuple]:
+    return ExamService.get_exam_version(db, exam_id)
+
+
 def update_exam(db: Session, exam_id: int, exam_update: ExamUpdate) -> Optional[Exam]:
     return ExamService.update_exam(db, exam_id, exam_update)
 
@@ -0,0 +1,148 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.exam import Exam
+from ..models.exam_schedule import ExamSchedule
+from ..models.submission import Submission
+from ..schemas.submission import SubmissionOut
+from .proctoring_service import ANSWERING, record_activity
+from .submission_service import format_answers, get_answer_key, grade_submission, mark_submitted
+
+
+class ExamSessionService:
+    """Server-side state of a live exam session (see the WebSocket channel)"""
+
+    @staticmethod
+    async def open_session(
+        db: AsyncSession, submission_id: int, student_id: int
+    ) -> Dict[str, Any]:
+        """Load deadline, autosaved answers and last applied sequence number"""
+        row = (
+            await db.execute(
+                select(Submission, ExamSchedule.end_time, Exam.duration)
+                .join(ExamSchedule, ExamSchedule.id == Submission.exam_schedule_id)
+                .join(Exam, Exam.id == ExamSchedule.exam_id)
+                .where(Submission.id == submission_id)
+            )
+        ).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found"
+            )
+
+        submission, end_time, duration = row
+        if submission.student_id != student_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+            )
+        if submission.submitted_at is not None or submission.answers != "[]":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Submission has already been submitted",
+            )
+
+        # Hết giờ khi hết thời lượng đề hoặc khi lịch thi kết thúc, tùy cái nào đến trước
+        deadline = end_time
+        if submission.started_at is not None and duration:
+            deadline = min(deadline, submission.started_at + timedelta(minutes=duration))
+
+        return {
+            "submission_id": submission.id,
+            "exam_schedule_id": submission.exam_schedule_id,
+            "deadline": deadline,
+            "seq": submission.answer_seq,
+            "answers": json.loads(submission.draft_answers or "{}"),
+        }
+
+    @staticmethod
+    def remaining_seconds(deadline: datetime) -> int:
+        remaining = (deadline - datetime.now(timezone.utc)).total_seconds()
+        return max(0, int(remaining))
+
+    @staticmethod
+    async def save_answers(
+        db: AsyncSession, submission_id: int, seq: int, answers: Dict[str, str]
+    ) -> bool:
+        """Autosave answers up to frame ``seq``.
+
+        Returns False when the submission was already submitted or a newer
+        frame was saved by another connection.
+        """
+        row = (
+            await db.execute(
+                update(Submission)
+                .where(
+                    Submission.id == submission_id,
+                    Submission.answer_seq < seq,
+                    Submission.submitted_at.is_(None),
+                )
+                .values(draft_answers=json.dumps(answers), answer_seq=seq)
+                .returning(Submission.exam_schedule_id, Submission.student_id)
+            )
+        ).first()
+        await db.commit()
+        if row is None:
+            return False
+        record_activity(row.exam_schedule_id, row.student_id, ANSWERING)
+        return True
+
+    @staticmethod
+    async def submit(
+        db: AsyncSession, submission_id: int, answers: Dict[str, str], deadline: datetime
+    ) -> Dict[str, Any]:
+        """Grade the session's answers and mark the submission as submitted"""
+        submission = (
+            await db.execute(
+                select(Submission)
+                .where(Submission.id == submission_id)
+                .with_for_update()
+            )
+        ).scalar_one()
+        if submission.submitted_at is None:
+            now = datetime.now(timezone.utc)
+
+            def grade(sync_db) -> None:
+                # Stored like a REST submit, so both channels grade and display the same way
+                answer_key = get_answer_key(sync_db, submission.exam_schedule_id)
+                grade_submission(
+                    sync_db, submission, format_answers(answer_key, answers), answer_key
+                )
+
+            # Grading and statistics are sync code: run them on the session's sync facade
+            await db.run_sync(grade)
+            submission.draft_answers = json.dumps(answers)
+            await db.run_sync(lambda sync_db: mark_submitted(sync_db, submission))
+            submission.is_late = now > deadline + timedelta(
+                seconds=settings.EXAM_SESSION_GRACE_SECONDS
+            )
+            await db.commit()
+            await db.refresh(submission)
+        else:
+            await db.rollback()
+
+        return SubmissionOut.model_validate(submission).model_dump(mode="json")
+
+
+# Backward compatibility functions
+async def open_exam_session(
+    db: AsyncSession, submission_id: int, student_id: int
+) -> Dict[str, Any]:
+    return await ExamSessionService.open_session(db, submission_id, student_id)
+
+
+async def save_session_answers(
+    db: AsyncSession, submission_id: int, seq: int, answers: Dict[str, str]
+) -> bool:
+    return await ExamSessionService.save_answers(db, submission_id, seq, answers)
+
+
+async def submit_exam_session(
+    db: AsyncSession, submission_id: int, answers: Dict[str, str], deadline: datetime
+) -> Dict[str, Any]:
+    return await ExamSessionService.submit(db, submission_id, answers, deadline)
@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.singleflight import single_flight
+from ..db.database import SessionLocal
+from ..models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# (fingerprint, status_code, body, expires_at)
+StoredResponse = Tuple[str, int, Any, datetime]
+
+
+class IdempotencyService:
+    """Replay stored responses for retried requests carrying an Idempotency-Key.
+
+    Completed responses live in a bounded in-memory LRU in front of the
+    ``idempotency_keys`` table, so most retries are answered without a
+    query. The table row is claimed before the handler runs, which makes
+    the key safe across workers as well. Handlers flush but do not commit:
+    their writes and the stored response commit in one transaction, so a
+    crash in between cannot leave writes a retry would repeat.
+    """
+
+    _cache: "OrderedDict[Tuple[int, str], StoredResponse]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(method: str, path: str, body: Any) -> str:
+        payload = json.dumps(jsonable_encoder(body), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{method} {path}\n{payload}".encode()).hexdigest()
+
+    @staticmethod
+    def _cache_get(user_id: int, key: str) -> Optional[StoredResponse]:
+        with IdempotencyService._lock:
+            stored = IdempotencyService._cache.get((user_id, key))
+            if stored is None:
+                return None
+            if stored[3] <= datetime.now(timezone.utc):
+                del IdempotencyService._cache[(user_id, key)]
+                return None
+            IdempotencyService._cache.move_to_end((user_id, key))
+            return stored
+
+    @staticmethod
+    def _cache_put(user_id: int, key: str, stored: StoredResponse) -> None:
+        with IdempotencyService._lock:
+            IdempotencyService._cache[(user_id, key)] = stored
+            IdempotencyService._cache.move_to_end((user_id, key))
+            while len(IdempotencyService._cache) > settings.IDEMPOTENCY_CACHE_SIZE:
+                IdempotencyService._cache.popitem(last=False)
+
+    @staticmethod
+    def _check_fingerprint(stored_fingerprint: str, fingerprint: str) -> None:
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+
+    @staticmethod
+    def _replay(stored: StoredResponse, fingerprint: str) -> JSONResponse:
+        IdempotencyService._check_fingerprint(stored[0], fingerprint)
+        return JSONResponse(
+            content=stored[2],
+            status_code=stored[1],
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    @staticmethod
+    def _claim(db: Session, user_id: int, key: str, fingerprint: str) -> Optional[datetime]:
+        """Insert a pending row for the key and return its claimed_at, or None.
+
+        Expired rows may be taken over, and so may pending rows past their
+        lease: the request that claimed them is assumed dead (worker killed),
+        otherwise retries would get 409 until the key expires.
+        """
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+        stmt = insert(IdempotencyKey).values(
+            user_id=user_id, key=key, fingerprint=fingerprint, claimed_at=now, expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_idempotency_keys_user_key",
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "status_code": None,
+                "response_body": None,
+                "created_at": func.now(),
+                "claimed_at": stmt.excluded.claimed_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=or_(
+                IdempotencyKey.expires_at < func.now(),
+                and_(
+                    IdempotencyKey.status_code.is_(None),
+                    IdempotencyKey.claimed_at
+                    < now - timedelta(seconds=settings.IDEMPOTENCY_PENDING_TIMEOUT_SECONDS),
+                ),
+            ),
+        ).returning(IdempotencyKey.claimed_at)
+        claimed_at = db.execute(stmt).scalar_one_or_none()
+        db.commit()
+        return claimed_at
+
+    @staticmethod
+    def run(
+        db: Session,
+        user_id: int,
+        key: Optional[str],
+        fingerprint: str,
+        handler: Callable[[], Tuple[int, Any]],
+    ) -> Any:
+        """Run ``handler`` at most once per (user, key) and replay its response.
+
+        ``handler`` returns ``(status_code, body)`` and leaves the commit to
+        this method. Without a key the handler simply runs, is committed and
+        its body is returned unchanged.
+        """
+        if not key:
+            body = handler()[1]
+            db.commit()
+            return body
+
+        stored = IdempotencyService._cache_get(user_id, key)
+        if stored is not None:
+            return IdempotencyService._replay(stored, fingerprint)
+
+        # Retries racing in this worker wait for the first one; each caller
+        # builds its own response object from the shared stored response
+        stored, replayed = single_flight.do(
+            ("idempotency", user_id, key),
+            lambda: IdempotencyService._run_claimed(
+                db, user_id, key, fingerprint, handler
+            ),
+        )
+        if replayed:
+            return IdempotencyService._replay(stored, fingerprint)
+        # Followers merged into the leader's call may have sent a different body
+        IdempotencyService._check_fingerprint(stored[0], fingerprint)
+        return JSONResponse(content=stored[2], status_code=stored[1])
+
+    @staticmethod
+    def _run_claimed(
+        db: Session,
+        user_id: int,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Tuple[int, Any]],
+    ) -> Tuple[StoredResponse, bool]:
+        """Claim the key and run the handler, or load the stored response"""
+        claimed_at = IdempotencyService._claim(db, user_id, key, fingerprint)
+        if claimed_at is None:
+            row = db.execute(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+                )
+            ).scalar_one()
+            if row.status_code is None:
+                IdempotencyService._check_fingerprint(row.fingerprint, fingerprint)
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            stored = (
+                row.fingerprint,
+                row.status_code,
+                json.loads(row.response_body),
+                row.expires_at,
+            )
+            IdempotencyService._cache_put(user_id, key, stored)
+            return stored, True
+
+        try:
+            status_code, body = handler()
+        except BaseException:
+            # Failed requests are not stored: release the key so a retry can run
+            db.rollback()
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                    IdempotencyKey.claimed_at == claimed_at,
+                )
+            )
+            db.commit()
+            raise
+
+        content = jsonable_encoder(body)
+        # Same transaction as the handler's writes. Only our own claim: past
+        # its lease, another request may have taken the key over
+        expires_at = db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.claimed_at == claimed_at,
+            )
+            .values(status_code=status_code, response_body=json.dumps(content))
+            .returning(IdempotencyKey.expires_at)
+        ).scalar_one_or_none()
+        if expires_at is None:
+            # The request that took the key over runs the handler instead
+            db.rollback()
+            logger.warning("Idempotency-Key %r outlived its pending lease; writes rolled back", key)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+            )
+        db.commit()
+
+        stored = (fingerprint, status_code, content, expires_at)
+        IdempotencyService._cache_put(user_id, key, stored)
+        return stored, False
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """Delete expired keys from the table and the in-memory cache"""
+        deleted = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now())
+        ).rowcount
+        db.commit()
+
+        now = datetime.now(timezone.utc)
+        with IdempotencyService._lock:
+            for cache_key in [
+                cache_key
+                for cache_key, stored in IdempotencyService._cache.items()
+                if stored[3] <= now
+            ]:
+                del IdempotencyService._cache[cache_key]
+        return deleted
+
+    @staticmethod
+    async def purge_expired_periodically() -> None:
+        """Background task: purge expired keys every few minutes"""
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+            try:
+                await run_in_threadpool(IdempotencyService._purge_with_new_session)
+            except Exception:
+                logger.exception("Purging expired idempotency keys failed")
+
+    @staticmethod
+    def _purge_with_new_session() -> int:
+        db = SessionLocal()
+        try:
+            return IdempotencyService.purge_expired(db)
+        finally:
+            db.close()
+
+
+# Backward compatibility functions
+def run_idempotent(
+    db: Session,
+    user_id: int,
+    key: Optional[str],
+    fingerprint: str,
+    handler: Callable[[], Tuple[int, Any]],
+) -> Any:
+    return IdempotencyService.run(db, user_id, key, fingerprint, handler)
+
+
+def purge_expired(db: Session) -> int:
+    return IdempotencyService.purge_expired(db)
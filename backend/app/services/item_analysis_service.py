@@ -0,0 +1,240 @@
+import math
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models.analytics import ItemStatistic, ScheduleStatistic
+
+CHOICES = ("A", "B", "C", "D")
+
+
+class AnswerKeyItem(NamedTuple):
+    """One question of an exam as needed for grading"""
+
+    question_id: int
+    question_order: int
+    answer: str
+    mark: float
+
+
+class ItemAnalysisService:
+    """Incremental item statistics (difficulty, discrimination, distractors, KR-20)"""
+
+    @staticmethod
+    def _contribution(
+        answer_key: Sequence[AnswerKeyItem], answers: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Per-item outcome of one graded submission"""
+        selected = []
+        correct = []
+        for item in answer_key:
+            choice = (answers.get(str(item.question_id)) or "").strip().upper()
+            selected.append(choice if choice in CHOICES else "")
+            correct.append(
+                1 if choice and choice == (item.answer or "").strip().upper() else 0
+            )
+        return {"selected": selected, "correct": correct, "raw": float(sum(correct))}
+
+    @staticmethod
+    def record_grading(
+        db: Session,
+        exam_schedule_id: int,
+        answer_key: Sequence[AnswerKeyItem],
+        previous: Optional[Dict[str, str]],
+        current: Optional[Dict[str, str]],
+    ) -> None:
+        """Move a submission's contribution from its previous to its current answers.
+
+        ``None`` means the submission was (or is) not graded. Aggregates are
+        updated with ``INSERT .. ON CONFLICT DO UPDATE`` increments, so concurrent
+        graders never lose updates. The caller commits.
+        """
+        if previous == current or not answer_key:
+            return
+
+        rows = {
+            item.question_id: {
+                "exam_schedule_id": exam_schedule_id,
+                "question_id": item.question_id,
+                "question_order": item.question_order,
+                "n_responses": 0,
+                "n_correct": 0,
+                "sum_raw_correct": 0.0,
+                "count_a": 0,
+                "count_b": 0,
+                "count_c": 0,
+                "count_d": 0,
+                "count_blank": 0,
+            }
+            for item in answer_key
+        }
+        summary = {"n_graded": 0, "sum_raw": 0.0, "sum_raw_sq": 0.0}
+
+        for sign, answers in ((-1, previous), (1, current)):
+            if answers is None:
+                continue
+            outcome = ItemAnalysisService._contribution(answer_key, answers)
+            raw = outcome["raw"]
+            summary["n_graded"] += sign
+            summary["sum_raw"] += sign * raw
+            summary["sum_raw_sq"] += sign * raw * raw
+            for item, choice, is_correct in zip(
+                answer_key, outcome["selected"], outcome["correct"]
+            ):
+                row = rows[item.question_id]
+                row["n_responses"] += sign
+                row["n_correct"] += sign * is_correct
+                row["sum_raw_correct"] += sign * is_correct * raw
+                column = f"count_{choice.lower()}" if choice else "count_blank"
+                row[column] += sign
+
+        counters = [
+            "n_responses",
+            "n_correct",
+            "sum_raw_correct",
+            "count_a",
+            "count_b",
+            "count_c",
+            "count_d",
+            "count_blank",
+        ]
+        stmt = insert(ItemStatistic).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_item_statistics_item",
+            set_={
+                **{
+                    name: getattr(ItemStatistic, name) + getattr(stmt.excluded, name)
+                    for name in counters
+                },
+                "question_order": stmt.excluded.question_order,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+
+        stmt = insert(ScheduleStatistic).values(
+            exam_schedule_id=exam_schedule_id, **summary
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScheduleStatistic.exam_schedule_id],
+            set_={
+                **{
+                    name: getattr(ScheduleStatistic, name)
+                    + getattr(stmt.excluded, name)
+                    for name in summary
+                },
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+
+    @staticmethod
+    def get_item_analysis(db: Session, exam_schedule_id: int) -> Dict[str, Any]:
+        """Compute item statistics from the stored aggregates (no submission scan)"""
+        import numpy as np
+
+        summary = (
+            db.query(ScheduleStatistic)
+            .filter(ScheduleStatistic.exam_schedule_id == exam_schedule_id)
+            .first()
+        )
+        items = (
+            db.query(ItemStatistic)
+            .filter(ItemStatistic.exam_schedule_id == exam_schedule_id)
+            .order_by(ItemStatistic.question_order)
+            .all()
+        )
+
+        n = summary.n_graded if summary else 0
+        result = {
+            "exam_schedule_id": exam_schedule_id,
+            "n_graded": n,
+            "mean_raw_score": None,
+            "sd_raw_score": None,
+            "kr20": None,
+            "items": [],
+        }
+        if not items:
+            return result
+
+        n_correct = np.array([item.n_correct for item in items], dtype=float)
+        sum_raw_correct = np.array([item.sum_raw_correct for item in items], dtype=float)
+        counts = np.array(
+            [
+                [item.count_a, item.count_b, item.count_c, item.count_d, item.count_blank]
+                for item in items
+            ],
+            dtype=float,
+        )
+
+        difficulty = np.full(len(items), np.nan)
+        discrimination = np.full(len(items), np.nan)
+        proportions = np.full(counts.shape, np.nan)
+
+        if n > 0:
+            mean = summary.sum_raw / n
+            variance = max(summary.sum_raw_sq / n - mean * mean, 0.0)
+            sd = math.sqrt(variance)
+            result["mean_raw_score"] = mean
+            result["sd_raw_score"] = sd
+
+            difficulty = n_correct / n
+            proportions = counts / n
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Uncorrected point-biserial: item vs. total number-correct score
+                mean_correct = sum_raw_correct / n_correct
+                mean_wrong = (summary.sum_raw - sum_raw_correct) / (n - n_correct)
+                discrimination = (
+                    (mean_correct - mean_wrong)
+                    / sd
+                    * np.sqrt(difficulty * (1 - difficulty))
+                )
+
+            k = len(items)
+            if k > 1 and variance > 0:
+                pq = np.sum(difficulty * (1 - difficulty))
+                result["kr20"] = float(k / (k - 1) * (1 - pq / variance))
+
+        labels = [choice.lower() for choice in CHOICES] + ["blank"]
+        for index, item in enumerate(items):
+            result["items"].append(
+                {
+                    "question_id": item.question_id,
+                    "question_order": item.question_order,
+                    "n_responses": item.n_responses,
+                    "n_correct": item.n_correct,
+                    "difficulty": _finite_or_none(difficulty[index]),
+                    "discrimination": _finite_or_none(discrimination[index]),
+                    "distractors": {
+                        label: {
+                            "count": int(counts[index, column]),
+                            "proportion": _finite_or_none(proportions[index, column]),
+                        }
+                        for column, label in enumerate(labels)
+                    },
+                }
+            )
+        return result
+
+
+def _finite_or_none(value) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+# Backward compatibility functions
+def record_grading(
+    db: Session,
+    exam_schedule_id: int,
+    answer_key: Sequence[AnswerKeyItem],
+    previous: Optional[Dict[str, str]],
+    current: Optional[Dict[str, str]],
+) -> None:
+    return ItemAnalysisService.record_grading(
+        db, exam_schedule_id, answer_key, previous, current
+    )
+
+
+def get_item_analysis(db: Session, exam_schedule_id: int) -> Dict[str, Any]:
+    return ItemAnalysisService.get_item_analysis(db, exam_schedule_id)
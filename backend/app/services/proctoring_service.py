@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.singleflight import single_flight
+from ..db.database import SessionLocal
+from ..models.submission import Submission
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái của học sinh trong một phiên thi
+STARTED = "started"
+ANSWERING = "answering"
+SUBMITTED = "submitted"
+
+
+class ScheduleActivity:
+    """Latest state of each student in one exam schedule"""
+
+    def __init__(self):
+        self.states: Dict[int, str] = {}
+        self.version = 0
+        self.seeded = False
+        # While a load runs, events are also buffered to be replayed over its result
+        self.loading = False
+        self.buffered: List[Tuple[int, str]] = []
+
+    def set(self, student_id: int, state: str) -> None:
+        if self.states.get(student_id) != state:
+            self.states[student_id] = state
+            self.version += 1
+
+    def snapshot(self, exam_schedule_id: int) -> Dict[str, Any]:
+        states = list(self.states.values())
+        return {
+            "exam_schedule_id": exam_schedule_id,
+            "started": len(states),
+            "answering": states.count(ANSWERING),
+            "submitted": states.count(SUBMITTED),
+        }
+
+
+class ProctoringService:
+    """Live per-schedule counters for the proctoring feed.
+
+    Counters live in memory and are only kept for schedules someone is
+    watching: the first viewer seeds them with one query, after that the
+    start, autosave and submit paths update them. One publisher task per
+    schedule turns changes into at most one SSE message per throttle
+    interval and fans it out to every viewer's queue. Local events show up
+    at once; every PROCTORING_RECONCILE_SECONDS the publisher reloads the
+    counters from the database, which brings in the events other workers
+    handled.
+    """
+
+    _activities: Dict[int, ScheduleActivity] = {}
+    _lock = threading.Lock()
+    # Chỉ truy cập từ event loop
+    _viewers: Dict[int, Set[asyncio.Queue]] = {}
+    _publishers: Dict[int, asyncio.Task] = {}
+
+    @staticmethod
+    def record(exam_schedule_id: int, student_id: int, state: str) -> None:
+        """Record a student's new state (called after the change is committed)"""
+        with ProctoringService._lock:
+            activity = ProctoringService._activities.get(exam_schedule_id)
+            if activity is None:
+                # Nobody is watching: the next viewer seeds from the database
+                return
+            if activity.loading or not activity.seeded:
+                activity.buffered.append((student_id, state))
+            if activity.seeded:
+                activity.set(student_id, state)
+
+    @staticmethod
+    def ensure_seeded(db: Session, exam_schedule_id: int) -> None:
+        """Load the current states from the database once per watched schedule"""
+        single_flight.do(
+            ("proctoring-seed", exam_schedule_id),
+            lambda: ProctoringService._seed(db, exam_schedule_id),
+        )
+
+    @staticmethod
+    def _seed(db: Session, exam_schedule_id: int) -> None:
+        with ProctoringService._lock:
+            activity = ProctoringService._activities.setdefault(
+                exam_schedule_id, ScheduleActivity()
+            )
+            if activity.seeded:
+                return
+        ProctoringService._load(db, exam_schedule_id, activity)
+
+    @staticmethod
+    def _reconcile(exam_schedule_id: int) -> None:
+        """Reload a watched schedule's counters (picks up other workers' events)"""
+        with ProctoringService._lock:
+            activity: Optional[ScheduleActivity] = ProctoringService._activities.get(
+                exam_schedule_id
+            )
+        if activity is None or not activity.seeded:
+            return
+        db = SessionLocal()
+        try:
+            ProctoringService._load(db, exam_schedule_id, activity)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load(db: Session, exam_schedule_id: int, activity: ScheduleActivity) -> None:
+        with ProctoringService._lock:
+            activity.loading = True
+            activity.buffered = []
+
+        # Latest attempt of every student
+        rows = db.execute(
+            select(
+                Submission.student_id,
+                Submission.submitted_at,
+                Submission.answers,
+                Submission.answer_seq,
+            )
+            .where(Submission.exam_schedule_id == exam_schedule_id)
+            .distinct(Submission.student_id)
+            .order_by(Submission.student_id, Submission.id.desc())
+        ).all()
+
+        states: Dict[int, str] = {}
+        for student_id, submitted_at, answers, answer_seq in rows:
+            if submitted_at is not None or answers != "[]":
+                states[student_id] = SUBMITTED
+            elif answer_seq:
+                states[student_id] = ANSWERING
+            else:
+                states[student_id] = STARTED
+
+        with ProctoringService._lock:
+            # Events that arrived while the query ran are newer than it
+            for student_id, state in activity.buffered:
+                states[student_id] = state
+            activity.buffered = []
+            activity.loading = False
+            if not activity.seeded or states != activity.states:
+                activity.states = states
+                activity.version += 1
+            activity.seeded = True
+
+    @staticmethod
+    def _message(exam_schedule_id: int) -> Tuple[int, str]:
+        with ProctoringService._lock:
+            activity = ProctoringService._activities.get(exam_schedule_id)
+            if activity is None or not activity.seeded:
+                return -1, ""
+            snapshot = activity.snapshot(exam_schedule_id)
+            version = activity.version
+        return version, f"event: activity\ndata: {json.dumps(snapshot)}\n\n"
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: str) -> None:
+        # Slow viewers only get the latest snapshot
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    @staticmethod
+    def subscribe(exam_schedule_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        ProctoringService._viewers.setdefault(exam_schedule_id, set()).add(queue)
+        with ProctoringService._lock:
+            ProctoringService._activities.setdefault(exam_schedule_id, ScheduleActivity())
+
+        return queue
+
+    @staticmethod
+    def prime(exam_schedule_id: int, queue: asyncio.Queue) -> None:
+        """After seeding: send the current counters and start the publisher"""
+        version, message = ProctoringService._message(exam_schedule_id)
+        if version >= 0:
+            ProctoringService._offer(queue, message)
+        if exam_schedule_id not in ProctoringService._publishers:
+            ProctoringService._publishers[exam_schedule_id] = asyncio.create_task(
+                ProctoringService._publish(exam_schedule_id, version)
+            )
+
+    @staticmethod
+    def unsubscribe(exam_schedule_id: int, queue: asyncio.Queue) -> None:
+        viewers = ProctoringService._viewers.get(exam_schedule_id, set())
+        viewers.discard(queue)
+        if viewers:
+            return
+
+        ProctoringService._viewers.pop(exam_schedule_id, None)
+        publisher = ProctoringService._publishers.pop(exam_schedule_id, None)
+        if publisher is not None:
+            publisher.cancel()
+        with ProctoringService._lock:
+            ProctoringService._activities.pop(exam_schedule_id, None)
+
+    @staticmethod
+    async def _publish(exam_schedule_id: int, last_version: int) -> None:
+        """Broadcast the counters whenever they changed, at most once per interval"""
+        loop = asyncio.get_running_loop()
+        reconciled_at = loop.time()
+        while True:
+            await asyncio.sleep(settings.PROCTORING_THROTTLE_SECONDS)
+            if loop.time() - reconciled_at >= settings.PROCTORING_RECONCILE_SECONDS:
+                reconciled_at = loop.time()
+                try:
+                    await run_in_threadpool(ProctoringService._reconcile, exam_schedule_id)
+                except Exception:
+                    # Keep serving the local counters; the next interval retries
+                    logger.exception("Reconciling proctoring counters of %s failed", exam_schedule_id)
+            version, message = ProctoringService._message(exam_schedule_id)
+            if version >= 0 and version != last_version:
+                last_version = version
+                for queue in list(ProctoringService._viewers.get(exam_schedule_id, ())):
+                    ProctoringService._offer(queue, message)
+
+
+# Backward compatibility functions
+def record_activity(exam_schedule_id: int, student_id: int, state: str) -> None:
+    return ProctoringService.record(exam_schedule_id, student_id, state)
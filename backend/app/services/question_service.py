@@ -3,12 +3,13 @@ import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from docx import Document
 from fastapi import HTTPException
 from sqlalchemy import and_, create_engine, func, select
 from sqlalchemy.orm import Session, sessionmaker
 
+from ..core.cache import invalidate
 from ..core.config import settings
+from ..core.fields import Fields, load_only_fields
 from ..db.database import SessionLocal
 from ..models.question import Question
 from ..schemas.question import QuestionCreate, QuestionUpdate
@@ -22,6 +23,9 @@ class DocumentParser:
         if not self.file_path.exists():
             raise HTTPException(status_code=400, detail="File not found")
 
+        # python-docx is slow to import: only load it for .docx imports
+        from docx import Document
+
         try:
             self.doc = Document(file_path)
         except Exception as e:
@@ -175,6 +179,7 @@ class QuestionService:
             ]
             session.add_all(questions)
             session.commit()
+            invalidate("questions")
 
             return {
                 "code": 200,
@@ -225,6 +230,7 @@ def create_question(db: Session, question: QuestionCreate, user_id: int) -> Ques
     )
     db.add(db_question)
     db.commit()
+    invalidate("questions")
     db.refresh(db_question)
     return db_question
 
@@ -238,17 +244,7 @@ def get_question_by_id(db: Session, question_id: int) -> Optional[Question]:
     )
 
 
-def get_questions_with_pagination(
-    db: Session,
-    skip: int = 0,
-    limit: int = 10,
-    search: Optional[str] = None,
-    subject: Optional[str] = None,
-) -> Dict[str, Any]:
-    """Get questions with pagination and filters"""
-    query = db.query(Question).filter(Question.deleted_at.is_(None))
-
-    # Apply filters
+def _filter_questions(query, search: Optional[str] = None, subject: Optional[str] = None):
     if search:
         query = query.filter(
             Question.content.ilike(f"%{search}%")
@@ -258,12 +254,50 @@ def get_questions_with_pagination(
 
     if subject:
         query = query.filter(Question.subject == subject)
+    return query
+
+
+def get_questions_version(
+    db: Session, search: Optional[str] = None, subject: Optional[str] = None
+) -> tuple:
+    """Version of a filtered question list, for ETags (1 query, no rows loaded).
+
+    The count catches deletions, the highest id additions.
+    """
+    query = db.query(
+        func.count(Question.id), func.max(Question.id), func.max(Question.updated_at)
+    ).filter(Question.deleted_at.is_(None))
+    return tuple(_filter_questions(query, search, subject).one())
+
+
+def get_question_version(db: Session, question_id: int) -> Optional[tuple]:
+    """Version of one question (1 query); None if not found"""
+    updated_at = (
+        db.query(Question.updated_at)
+        .filter(and_(Question.id == question_id, Question.deleted_at.is_(None)))
+        .scalar()
+    )
+    return (updated_at,) if updated_at is not None else None
+
+
+def get_questions_with_pagination(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    search: Optional[str] = None,
+    subject: Optional[str] = None,
+    fields: Fields = None,
+) -> Dict[str, Any]:
+    """Get questions with pagination and filters (only ``fields`` columns when given)"""
+    query = db.query(Question).filter(Question.deleted_at.is_(None))
+    query = _filter_questions(query, search, subject)
+    query = load_only_fields(query, Question, fields)
 
     # Get total count
     total = query.count()
 
     # Apply pagination
-    questions = query.offset(skip).limit(limit).all()
+    questions = query.order_by(Question.id).offset(skip).limit(limit).all()
 
     # Calculate pagination info
     pages = math.ceil(total / limit) if limit > 0 else 1
@@ -294,6 +328,7 @@ def update_question(
 
     db_question.editor = user_id
     db.commit()
+    invalidate("questions", f"question:{question_id}")
     db.refresh(db_question)
     return db_question
 
@@ -306,6 +341,7 @@ def delete_question(db: Session, question_id: int) -> bool:
 
     db_question.deleted_at = func.now()
     db.commit()
+    invalidate("questions", f"question:{question_id}")
     return True
 
 
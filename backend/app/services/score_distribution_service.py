@@ -0,0 +1,286 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..db.database import run_after_commit
+from ..models.analytics import ScheduleStatistic, ScoreBucket
+from ..models.submission import Submission
+
+
+class ScoreDistribution:
+    """Distinct scores of one schedule with their counts, for log-time lookups.
+
+    ``scores`` is sorted and ``counts`` follows it; cumulative counts live in
+    a Fenwick tree, so a grade change updates its bucket in place and ranks,
+    percentiles and the median cost a bisect plus O(log k) for k distinct
+    scores. Only a score never seen before rebuilds the arrays.
+    """
+
+    def __init__(self, version: int, counts: Dict[float, int]):
+        self.version = version
+        self._build(counts)
+
+    def _build(self, counts: Dict[float, int]) -> None:
+        self.scores: List[float] = sorted(score for score, count in counts.items() if count > 0)
+        self.counts: List[int] = [counts[score] for score in self.scores]
+        self.total = sum(self.counts)
+        self._tree = [0] + self.counts
+        for index in range(1, len(self._tree)):
+            parent = index + (index & -index)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[index]
+
+    def _below(self, index: int) -> int:
+        """Number of scores in the first ``index`` buckets"""
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def _change(self, score: float, delta: int) -> None:
+        index = bisect_left(self.scores, score)
+        if index == len(self.scores) or self.scores[index] != score:
+            if delta > 0:
+                counts = {s: c for s, c in zip(self.scores, self.counts) if c > 0}
+                counts[score] = delta
+                self._build(counts)
+            return
+        if self.counts[index] + delta < 0:
+            return
+        self.counts[index] += delta
+        self.total += delta
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def move(self, previous: Optional[float], current: Optional[float]) -> None:
+        if previous is not None:
+            self._change(previous, -1)
+        if current is not None:
+            self._change(current, 1)
+
+    def nth(self, position: int) -> float:
+        """Score at 0-based ``position`` in sorted order"""
+        index, remaining = 0, position + 1
+        step = 1 << (len(self.scores).bit_length() - 1) if self.scores else 0
+        while step:
+            if index + step < len(self._tree) and self._tree[index + step] < remaining:
+                index += step
+                remaining -= self._tree[index]
+            step >>= 1
+        return self.scores[index]
+
+    def median(self) -> Optional[float]:
+        n = self.total
+        if not n:
+            return None
+        middle = n // 2
+        if n % 2:
+            return self.nth(middle)
+        return (self.nth(middle - 1) + self.nth(middle)) / 2
+
+    def percentile_rank(self, score: float) -> Optional[float]:
+        """Percentage of scores below ``score``, counting ties as half"""
+        n = self.total
+        if not n:
+            return None
+        index = bisect_left(self.scores, score)
+        below = self._below(index)
+        equal = (
+            self.counts[index]
+            if index < len(self.scores) and self.scores[index] == score
+            else 0
+        )
+        return (below + 0.5 * equal) / n * 100
+
+    def histogram(self) -> List[Dict[str, Any]]:
+        return [
+            {"score": score, "count": count}
+            for score, count in zip(self.scores, self.counts)
+            if count
+        ]
+
+
+class ScoreDistributionService:
+    """Per-schedule score histograms and percentiles, maintained on grading"""
+
+    _distributions: Dict[int, ScoreDistribution] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def record_score(
+        db: Session,
+        exam_schedule_id: int,
+        previous: Optional[float],
+        current: Optional[float],
+    ) -> None:
+        """Move one submission from its previous to its current score.
+
+        ``None`` means not graded. The caller commits; the in-memory
+        distribution of this worker is updated once the commit succeeds.
+        """
+        if previous == current:
+            return
+
+        deltas: Dict[float, int] = {}
+        summary = {"sum_score": 0.0, "sum_score_sq": 0.0, "score_version": 1}
+        for sign, score in ((-1, previous), (1, current)):
+            if score is None:
+                continue
+            deltas[score] = deltas.get(score, 0) + sign
+            summary["sum_score"] += sign * score
+            summary["sum_score_sq"] += sign * score * score
+
+        stmt = insert(ScoreBucket).values(
+            [
+                {"exam_schedule_id": exam_schedule_id, "score": score, "count": delta}
+                for score, delta in deltas.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_score_buckets_score",
+            set_={"count": ScoreBucket.count + stmt.excluded.count},
+        )
+        db.execute(stmt)
+
+        stmt = insert(ScheduleStatistic).values(
+            exam_schedule_id=exam_schedule_id, **summary
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScheduleStatistic.exam_schedule_id],
+            set_={
+                name: getattr(ScheduleStatistic, name) + getattr(stmt.excluded, name)
+                for name in summary
+            },
+        ).returning(ScheduleStatistic.score_version)
+        version = db.execute(stmt).scalar_one()
+
+        def apply():
+            with ScoreDistributionService._lock:
+                cached = ScoreDistributionService._distributions.get(exam_schedule_id)
+                if cached is None:
+                    return
+                if cached.version == version - 1:
+                    cached.move(previous, current)
+                    cached.version = version
+                else:
+                    # Another worker graded in between: reload on next read
+                    ScoreDistributionService._distributions.pop(exam_schedule_id, None)
+
+        run_after_commit(db, apply)
+
+    @staticmethod
+    def get_distribution(
+        db: Session, exam_schedule_id: int, summary: Optional[ScheduleStatistic]
+    ) -> ScoreDistribution:
+        """Return the cached distribution, reloading buckets if it is stale"""
+        version = summary.score_version if summary else 0
+        with ScoreDistributionService._lock:
+            cached = ScoreDistributionService._distributions.get(exam_schedule_id)
+        if cached is not None and cached.version == version:
+            return cached
+
+        buckets = (
+            db.query(ScoreBucket.score, ScoreBucket.count)
+            .filter(
+                ScoreBucket.exam_schedule_id == exam_schedule_id, ScoreBucket.count > 0
+            )
+            .all()
+        )
+        distribution = ScoreDistribution(version, dict(buckets))
+        with ScoreDistributionService._lock:
+            ScoreDistributionService._distributions[exam_schedule_id] = distribution
+        return distribution
+
+    @staticmethod
+    def get_student_score(
+        db: Session, exam_schedule_id: int, student_id: int
+    ) -> Optional[float]:
+        """Best graded score of a student in a schedule"""
+        return (
+            db.query(func.max(Submission.score))
+            .filter(
+                Submission.student_id == student_id,
+                Submission.exam_schedule_id == exam_schedule_id,
+                Submission.answers != "[]",
+            )
+            .scalar()
+        )
+
+    @staticmethod
+    def get_score_summary(
+        db: Session, exam_schedule_id: int, student_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Histogram, mean, median and optionally a student's percentile rank"""
+        summary = (
+            db.query(ScheduleStatistic)
+            .filter(ScheduleStatistic.exam_schedule_id == exam_schedule_id)
+            .first()
+        )
+        distribution = ScoreDistributionService.get_distribution(
+            db, exam_schedule_id, summary
+        )
+        student_score = None
+        if student_id is not None:
+            student_score = ScoreDistributionService.get_student_score(
+                db, exam_schedule_id, student_id
+            )
+
+        with ScoreDistributionService._lock:
+            return ScoreDistributionService._summarize(
+                exam_schedule_id, summary, distribution, student_id, student_score
+            )
+
+    @staticmethod
+    def _summarize(
+        exam_schedule_id: int,
+        summary: Optional[ScheduleStatistic],
+        distribution: ScoreDistribution,
+        student_id: Optional[int],
+        student_score: Optional[float],
+    ) -> Dict[str, Any]:
+        n = distribution.total
+        return {
+            "exam_schedule_id": exam_schedule_id,
+            "n_graded": n,
+            "mean": (
+                summary.sum_score / summary.n_graded
+                if summary and summary.n_graded
+                else None
+            ),
+            "median": distribution.median(),
+            "min": distribution.nth(0) if n else None,
+            "max": distribution.nth(n - 1) if n else None,
+            "histogram": distribution.histogram(),
+            "student_id": student_id,
+            "student_score": student_score,
+            "student_percentile": (
+                distribution.percentile_rank(student_score)
+                if student_score is not None
+                else None
+            ),
+        }
+
+
+# Backward compatibility functions
+def record_score(
+    db: Session,
+    exam_schedule_id: int,
+    previous: Optional[float],
+    current: Optional[float],
+) -> None:
+    return ScoreDistributionService.record_score(
+        db, exam_schedule_id, previous, current
+    )
+
+
+def get_score_summary(
+    db: Session, exam_schedule_id: int, student_id: Optional[int] = None
+) -> Dict[str, Any]:
+    return ScoreDistributionService.get_score_summary(db, exam_schedule_id, student_id)
@@ -1,38 +1,404 @@
 import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from ..core.cache import invalidate
+from ..core.fields import Fields, load_only_fields
+from ..db.database import run_after_commit
 from ..models.submission import Submission
 from ..models.exam_schedule import ExamSchedule
-from ..models.exam import Exam
+from ..models.analytics import ItemStatistic, ScheduleStatistic, ScoreBucket
+from ..models.exam import Exam, ExamQuestion
 from ..models.question import Question
+from ..models.user import User
 from ..schemas.submission import SubmissionCreate
+from .item_analysis_service import AnswerKeyItem, record_grading
+from .proctoring_service import STARTED, SUBMITTED, record_activity
+from .score_distribution_service import record_score
 
 def create_submission(db: Session, student_id: int, submission_in: SubmissionCreate) -> Submission:
+    """Create and grade a submission in the caller's transaction (the caller commits)"""
     submission = Submission(
         student_id=student_id,
         exam_schedule_id=submission_in.exam_schedule_id,
-        answers=submission_in.answers,
+        answers="[]",
     )
     db.add(submission)
-    db.commit()
+    db.flush()
+
+    # Grade if answers are provided (actual submission), else score stays 0
+    grade_submission(db, submission, submission_in.answers)
+    mark_submitted(db, submission)
+
+    db.flush()
     db.refresh(submission)
+    return submission
+
+
+def start_submission(db: Session, student_id: int, exam_schedule_id: int) -> Dict[str, Any]:
+    """Atomically start a new attempt, returning the submission as a dict.
+
+    The attempt check and the insert are one INSERT .. SELECT statement:
+    the row is only inserted while the student is under max_attempts, and
+    two concurrent starts computing the same attempt_number collide on the
+    unique constraint instead of both succeeding. In the common case this
+    is a single round trip.
+    """
+    attempts = (
+        select(func.count(Submission.id))
+        .where(
+            Submission.student_id == student_id,
+            Submission.exam_schedule_id == ExamSchedule.id,
+        )
+        .scalar_subquery()
+    )
+    source = select(
+        literal(student_id),
+        ExamSchedule.id,
+        literal("[]"),
+        literal(0.0),
+        literal(False),
+        attempts + 1,
+    ).where(
+        ExamSchedule.id == exam_schedule_id,
+        attempts < func.coalesce(ExamSchedule.max_attempts, 1),
+    )
+    columns = [
+        Submission.id,
+        Submission.student_id,
+        Submission.exam_schedule_id,
+        Submission.submitted_at,
+        Submission.answers,
+        Submission.score,
+        Submission.is_late,
+        Submission.attempt_number,
+        Submission.started_at,
+    ]
+    stmt = (
+        pg_insert(Submission)
+        .from_select(
+            ["student_id", "exam_schedule_id", "answers", "score", "is_late", "attempt_number"],
+            source,
+        )
+        .on_conflict_do_nothing(constraint="uq_submissions_attempt")
+        .returning(*columns)
+    )
+    row = db.execute(stmt).mappings().first()
+    if row is not None:
+        db.commit()
+        invalidate(f"student:{student_id}")
+        record_activity(exam_schedule_id, student_id, STARTED)
+        return dict(row)
+
+    # Nothing inserted: unknown schedule, no attempts left, or a concurrent
+    # start of the same attempt won the race
+    db.rollback()
+    exam_schedule = db.query(ExamSchedule).filter(ExamSchedule.id == exam_schedule_id).first()
+    if not exam_schedule:
+        raise HTTPException(status_code=404, detail="Exam schedule not found")
+
+    # Resume the attempt that is already in progress rather than failing
+    in_progress = db.execute(
+        select(*columns)
+        .where(
+            Submission.student_id == student_id,
+            Submission.exam_schedule_id == exam_schedule_id,
+            Submission.answers == "[]",
+            Submission.submitted_at.is_(None),
+        )
+        .order_by(Submission.id.desc())
+        .limit(1)
+    ).mappings().first()
+    if in_progress is not None:
+        return dict(in_progress)
+
+    max_attempts = exam_schedule.max_attempts or 1
+    raise HTTPException(
+        status_code=400,
+        detail=f"Maximum attempts ({max_attempts}) exceeded"
+    )
+
+
+def parse_answers(answers) -> Optional[Dict[str, str]]:
+    """Normalize answers to {"question_id": "option"}; None if nothing to grade"""
+    try:
+        if isinstance(answers, str):
+            answers = json.loads(answers) if answers.strip() else []
+    except ValueError:
+        return None
+
+    answers_dict = {}
+    if isinstance(answers, list):
+        # Frontend sends: [{"questionId":64,"selectedOption":"A","isAnswered":true}, ...]
+        for answer in answers:
+            if isinstance(answer, dict) and 'questionId' in answer and 'selectedOption' in answer:
+                answers_dict[str(answer['questionId'])] = answer['selectedOption']
+    elif isinstance(answers, dict):
+        # Already in correct format: {"64": "A", "65": "C", ...}
+        answers_dict = dict(answers)
+
+    return {
+        str(question_id): None if option is None else str(option)
+        for question_id, option in answers_dict.items()
+    } or None
+
+
+def get_answer_key(db: Session, exam_schedule_id: int) -> List[AnswerKeyItem]:
+    """Load the questions, answers and marks of a schedule's exam in one query"""
+    rows = (
+        db.query(
+            ExamQuestion.question_id,
+            ExamQuestion.question_order,
+            Question.answer,
+            Question.mark,
+        )
+        .join(ExamSchedule, ExamSchedule.exam_id == ExamQuestion.exam_id)
+        .join(Question, Question.id == ExamQuestion.question_id)
+        .filter(ExamSchedule.id == exam_schedule_id)
+        .order_by(ExamQuestion.question_order)
+        .all()
+    )
+    return [AnswerKeyItem(*row) for row in rows]
+
+
+def format_answers(answer_key: List[AnswerKeyItem], answers: Dict[str, str]) -> str:
+    """{"question_id": "option"} in the stored format: the frontend's Answer[] JSON, in exam order"""
+    return json.dumps(
+        [
+            {
+                "questionId": item.question_id,
+                "selectedOption": answers.get(str(item.question_id)) or "",
+                "isAnswered": bool(answers.get(str(item.question_id))),
+            }
+            for item in answer_key
+        ],
+        separators=(",", ":"),
+    )
 
-    # Calculate score if answers are provided (actual submission)
-    if submission_in.answers and submission_in.answers.strip() != "[]":
-        try:
-            answers_data = json.loads(submission_in.answers)
-            submission.score = calculate_score(db, submission.exam_schedule_id, answers_data)
-        except Exception as e:
-            submission.score = 0.0
-    else:
+
+def score_answers(answer_key: List[AnswerKeyItem], answers: Optional[Dict[str, str]]) -> float:
+    """Sum the marks of correctly answered questions"""
+    total_score = 0.0
+    for item in answer_key:
+        student_answer = (answers or {}).get(str(item.question_id))
+        if student_answer and student_answer.strip().upper() == (item.answer or "").strip().upper():
+            total_score += item.mark if item.mark else 1.0
+    return total_score
+
+
+def grade_submission(
+    db: Session,
+    submission: Submission,
+    answers: str,
+    answer_key: Optional[List[AnswerKeyItem]] = None,
+) -> None:
+    """Store answers, score them and update the schedule's statistics.
+
+    The caller commits. Re-grading a submission replaces its previous
+    contribution to the statistics instead of adding a second one.
+    ``answer_key`` saves the query when the caller already loaded it.
+    """
+    previous = parse_answers(submission.answers)
+    current = parse_answers(answers)
+    submission.answers = answers
+
+    if current is None and previous is None:
         # Initial submission with empty answers
         submission.score = 0.0
+        return
+
+    if answer_key is None:
+        answer_key = get_answer_key(db, submission.exam_schedule_id)
+    submission.score = score_answers(answer_key, current)
+    _record_statistics(db, submission.exam_schedule_id, answer_key, previous, current)
+
+
+def mark_submitted(db: Session, submission: Submission) -> None:
+    """Set submitted_at; the student's home page and the proctoring feed are updated once the caller commits"""
+    submission.submitted_at = datetime.utcnow()
+    exam_schedule_id, student_id = submission.exam_schedule_id, submission.student_id
+    run_after_commit(db, lambda: invalidate(f"student:{student_id}"))
+    run_after_commit(
+        db, lambda: record_activity(exam_schedule_id, student_id, SUBMITTED)
+    )
+
+
+def _record_statistics(db: Session, exam_schedule_id: int, answer_key, previous, current) -> None:
+    record_grading(db, exam_schedule_id, answer_key, previous, current)
+    record_score(
+        db,
+        exam_schedule_id,
+        score_answers(answer_key, previous) if previous is not None else None,
+        score_answers(answer_key, current) if current is not None else None,
+    )
+
+
+def rebuild_schedule_statistics(db: Session, exam_schedule_id: int) -> int:
+    """Recompute a schedule's statistics from its submissions (backfill/repair)"""
+    db.query(ItemStatistic).filter(
+        ItemStatistic.exam_schedule_id == exam_schedule_id
+    ).delete(synchronize_session=False)
+    db.query(ScoreBucket).filter(
+        ScoreBucket.exam_schedule_id == exam_schedule_id
+    ).delete(synchronize_session=False)
+    # Keep the row so score_version keeps increasing for cached distributions
+    db.query(ScheduleStatistic).filter(
+        ScheduleStatistic.exam_schedule_id == exam_schedule_id
+    ).update(
+        {
+            ScheduleStatistic.n_graded: 0,
+            ScheduleStatistic.sum_raw: 0,
+            ScheduleStatistic.sum_raw_sq: 0,
+            ScheduleStatistic.sum_score: 0,
+            ScheduleStatistic.sum_score_sq: 0,
+            ScheduleStatistic.score_version: ScheduleStatistic.score_version + 1,
+        },
+        synchronize_session=False,
+    )
+
+    answer_key = get_answer_key(db, exam_schedule_id)
+    graded = 0
+    query = (
+        db.query(Submission.answers)
+        .filter(Submission.exam_schedule_id == exam_schedule_id)
+        .execution_options(yield_per=1000)
+    )
+    for (answers_text,) in query:
+        answers = parse_answers(answers_text)
+        if answers is not None:
+            _record_statistics(db, exam_schedule_id, answer_key, None, answers)
+            graded += 1
 
     db.commit()
-    db.refresh(submission)
-    return submission
+    return graded
+
+def get_submissions_by_student(db: Session, student_id: int, fields: Fields = None):
+    query = db.query(Submission).filter(Submission.student_id == student_id)
+    return load_only_fields(query, Submission, fields).all()
+
+
+def _filter_submissions(
+    stmt,
+    exam_schedule_id: Optional[int] = None,
+    exam_id: Optional[int] = None,
+    created_by: Optional[int] = None,
+    student_search: Optional[str] = None,
+    graded: Optional[bool] = None,
+):
+    """Apply the submission browser filters to a select joined to users"""
+    if exam_schedule_id is not None:
+        stmt = stmt.where(Submission.exam_schedule_id == exam_schedule_id)
+    if exam_id is not None or created_by is not None:
+        stmt = stmt.join(ExamSchedule, ExamSchedule.id == Submission.exam_schedule_id)
+        if exam_id is not None:
+            stmt = stmt.where(ExamSchedule.exam_id == exam_id)
+        if created_by is not None:
+            # Teachers only see submissions for exams they created
+            stmt = stmt.join(Exam, Exam.id == ExamSchedule.exam_id).where(
+                Exam.created_by == created_by
+            )
+    if student_search:
+        stmt = stmt.where(User.username.ilike(f"%{student_search}%"))
+    if graded is True:
+        stmt = stmt.where(Submission.answers != "[]")
+    elif graded is False:
+        stmt = stmt.where(Submission.answers == "[]")
+    return stmt
+
+
+def get_submissions_page(
+    db: Session,
+    exam_schedule_id: Optional[int] = None,
+    exam_id: Optional[int] = None,
+    created_by: Optional[int] = None,
+    student_search: Optional[str] = None,
+    graded: Optional[bool] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+    fields: Fields = None,
+) -> Dict[str, Any]:
+    """List submissions newest first, paginated by id (keyset, no OFFSET/COUNT)"""
+    columns = [
+        Submission.id,
+        Submission.student_id,
+        User.username.label("student_username"),
+        Submission.exam_schedule_id,
+        Submission.submitted_at,
+        Submission.score,
+        Submission.is_late,
+    ]
+    if fields is not None:
+        # id is the cursor, always selected
+        columns = [column for column in columns if column.key in fields or column.key == "id"]
+    stmt = select(*columns).join(User, User.id == Submission.student_id)
+    stmt = _filter_submissions(
+        stmt, exam_schedule_id, exam_id, created_by, student_search, graded
+    )
+    if cursor is not None:
+        stmt = stmt.where(Submission.id < cursor)
+    # Fetch one extra row to know whether another page exists
+    stmt = stmt.order_by(Submission.id.desc()).limit(limit + 1)
 
-def get_submissions_by_student(db: Session, student_id: int):
-    return db.query(Submission).filter(Submission.student_id == student_id).all()
+    rows = db.execute(stmt).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "data": [dict(row) for row in rows],
+        "next_cursor": rows[-1]["id"] if has_more else None,
+    }
+
+
+GRADEBOOK_COLUMNS = [
+    "submission_id",
+    "student_id",
+    "student_username",
+    "exam_schedule_id",
+    "exam_schedule_title",
+    "submitted_at",
+    "score",
+    "is_late",
+]
+
+
+def iter_gradebook_rows(
+    db: Session,
+    exam_schedule_id: Optional[int] = None,
+    exam_id: Optional[int] = None,
+    created_by: Optional[int] = None,
+    batch_size: int = 1000,
+) -> Iterator[tuple]:
+    """Stream gradebook rows from a server-side cursor, batch_size rows at a time"""
+    stmt = (
+        select(
+            Submission.id,
+            Submission.student_id,
+            User.username,
+            Submission.exam_schedule_id,
+            ExamSchedule.title,
+            Submission.submitted_at,
+            Submission.score,
+            Submission.is_late,
+        )
+        .join(User, User.id == Submission.student_id)
+        .join(ExamSchedule, ExamSchedule.id == Submission.exam_schedule_id)
+    )
+    if exam_schedule_id is not None:
+        stmt = stmt.where(Submission.exam_schedule_id == exam_schedule_id)
+    if exam_id is not None:
+        stmt = stmt.where(ExamSchedule.exam_id == exam_id)
+    if created_by is not None:
+        stmt = stmt.join(Exam, Exam.id == ExamSchedule.exam_id).where(
+            Exam.created_by == created_by
+        )
+    stmt = stmt.order_by(Submission.exam_schedule_id, User.username, Submission.id)
+
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
 
 def calculate_score(db: Session, exam_schedule_id: int, answers) -> float:
     """Calculate score based on answers"""
@@ -50,42 +416,8 @@ def calculate_score(db: Session, exam_schedule_id: int, answers) -> float:
         else:
             return 0.0
 
-        # Get exam schedule
-        exam_schedule = db.query(ExamSchedule).filter(ExamSchedule.id == exam_schedule_id).first()
-        if not exam_schedule:
-            return 0.0
-
-        # Get exam
-        exam = db.query(Exam).filter(Exam.id == exam_schedule.exam_id).first()
-        if not exam:
-            return 0.0
-
-        # Get questions for this exam through exam_questions table
-        from ..models.exam import ExamQuestion
-        exam_questions = db.query(ExamQuestion).filter(ExamQuestion.exam_id == exam.id).all()
-
-        total_score = 0.0
-        total_possible = 0.0
-
-        for exam_question in exam_questions:
-            # Get the actual question
-            question = db.query(Question).filter(Question.id == exam_question.question_id).first()
-            if not question:
-                continue
-
-            # Get student's answer for this question
-            question_id_str = str(question.id)
-            student_answer = answers_dict.get(question_id_str)
-
-            # Question mark (default to 1 if not set)
-            question_mark = question.mark if question.mark else 1.0
-            total_possible += question_mark
-
-            # Check if answer is correct
-            if student_answer and student_answer.strip().upper() == question.answer.strip().upper():
-                total_score += question_mark
-
-        return total_score
+        # Đáp án và điểm của cả đề trong một truy vấn (trước đây: một truy vấn mỗi câu)
+        return score_answers(get_answer_key(db, exam_schedule_id), answers_dict)
 
     except Exception as e:
         return 0.0
\ No newline at end of file
@@ -1,14 +1,23 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
-from passlib.context import CryptContext
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from ..core.cache import invalidate
+from ..core.fields import Fields, load_only_fields
+from ..db.database import release_connection
 from ..models.user import User
 from ..schemas.user import UserCreate
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """bcrypt context, created on first use (passlib is slow to import)"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class UserService:
@@ -36,10 +45,14 @@ class UserService:
 
     @staticmethod
     def get_users(
-        db: Session, skip: int = 0, limit: int = 100, include_deleted: bool = False
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        include_deleted: bool = False,
+        fields: Fields = None,
     ):
         """Get users with pagination (excluding soft deleted by default)"""
-        stmt = select(User)
+        stmt = load_only_fields(select(User), User, fields)
         if not include_deleted:
             stmt = stmt.where(User.deleted_at.is_(None))
         stmt = stmt.offset(skip).limit(limit)
@@ -56,7 +69,7 @@ class UserService:
     @staticmethod
     def create_user(db: Session, user: UserCreate) -> User:
         """Create a new user"""
-        hashed_password = pwd_context.hash(user.password)
+        hashed_password = get_pwd_context().hash(user.password)
         db_user = User(
             username=user.username,
             hashed_password=hashed_password,
@@ -64,6 +77,7 @@ class UserService:
         )
         db.add(db_user)
         db.commit()
+        invalidate("users")
         db.refresh(db_user)
         return db_user
 
@@ -76,6 +90,7 @@ class UserService:
 
         user.deleted_at = datetime.utcnow()
         db.commit()
+        invalidate("users")
         db.refresh(user)
         return user
 
@@ -88,18 +103,19 @@ class UserService:
 
         user.deleted_at = None
         db.commit()
+        invalidate("users")
         db.refresh(user)
         return user
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
 
     @staticmethod
     def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -107,6 +123,8 @@ class UserService:
         user = UserService.get_user_by_username(db, username)
         if not user:
             return None
+        # bcrypt takes hundreds of ms: do not hold a pooled connection meanwhile
+        release_connection(db)
         if not UserService.verify_password(password, user.hashed_password):
             return None
         return user
@@ -126,9 +144,13 @@ def get_user_by_id(
 
 
 def get_users(
-    db: Session, skip: int = 0, limit: int = 100, include_deleted: bool = False
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    include_deleted: bool = False,
+    fields: Fields = None,
 ):
-    return UserService.get_users(db, skip, limit, include_deleted)
+    return UserService.get_users(db, skip, limit, include_deleted, fields)
 
 
 def get_users_count(db: Session, include_deleted: bool = False) -> int:
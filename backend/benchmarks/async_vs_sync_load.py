@@ -0,0 +1,179 @@
+"""
+Load comparison: sync route + threadpool vs async route + asyncpg, one worker.
+
+Both routes run the same query (``SELECT pg_sleep(latency)`` standing in for
+a hot-path query) against the configured database. The connection pool is
+sized above the thread limit, so the difference measured is the sync
+route's threadpool (AnyIO default: 40 threads) versus the event loop.
+Each variant runs in its own single-worker uvicorn process; the load
+generator runs in this process.
+
+Usage (from backend/, database running):
+    python -m benchmarks.async_vs_sync_load --concurrency 80 --requests 800 --latency 0.5
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+
+
+def build_app(mode: str, pool_size: int, latency: float) -> FastAPI:
+    app = FastAPI()
+
+    if mode == "sync":
+        engine = create_engine(settings.DATABASE_URL, pool_size=pool_size, max_overflow=0)
+        SyncSession = sessionmaker(bind=engine)
+
+        def get_db():
+            db = SyncSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.get("/query")
+        def sync_route(db: Session = Depends(get_db)):
+            db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+            return {"ok": True}
+
+    else:
+        async_engine = create_async_engine(
+            settings.ASYNC_DATABASE_URL, pool_size=pool_size, max_overflow=0
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine)
+
+        async def get_async_db():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        @app.get("/query")
+        async def async_route(db: AsyncSession = Depends(get_async_db)):
+            await db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+            return {"ok": True}
+
+    return app
+
+
+async def _get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes) -> int:
+    """One keep-alive GET; returns the status code"""
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def run_load(port: int, concurrency: int, total: int):
+    # Minimal keep-alive client: a full HTTP client library costs more CPU
+    # than the server under test on small machines
+    request = f"GET /query HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode()
+    latencies = []
+    errors = 0
+    remaining = total
+    warmed = 0
+
+    async def client_loop():
+        nonlocal errors, remaining, warmed
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await _get(reader, writer, request)  # Warm up connection and pool
+        warmed += 1
+        if warmed == concurrency:
+            ready.set()
+        await ready.wait()
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            if await _get(reader, writer, request) == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        writer.close()
+
+    ready = asyncio.Event()
+    clients = [asyncio.create_task(client_loop()) for _ in range(concurrency)]
+    await ready.wait()
+    started = time.perf_counter()
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=5)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=80)
+    parser.add_argument("--requests", type=int, default=800)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per query")
+    parser.add_argument("--pool-size", type=int, default=80)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        app = build_app(args.serve, args.pool_size, args.latency)
+        uvicorn.run(app, port=args.port, log_level="warning")
+        return
+
+    print(
+        f"concurrency={args.concurrency} requests={args.requests} "
+        f"pool={args.pool_size} query latency={args.latency * 1000:.0f}ms, 1 worker"
+    )
+    url = f"http://127.0.0.1:{args.port}/query"
+    for mode in ("sync", "async"):
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "benchmarks.async_vs_sync_load",
+                "--serve", mode,
+                "--port", str(args.port),
+                "--pool-size", str(args.pool_size),
+                "--latency", str(args.latency),
+            ]
+        )
+        try:
+            wait_until_up(url)
+            result = asyncio.run(run_load(args.port, args.concurrency, args.requests))
+            print(f"{mode:>5}: {result}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
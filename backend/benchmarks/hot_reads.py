@@ -0,0 +1,118 @@
+"""
+Hot reads: a burst of identical requests on a cold cache, and early refresh.
+
+    burst     N threads (one session each) read the same schedule at once,
+              as when a class opens it: through hot_reads (coalesced) and
+              through the uncached version + schedule queries
+    refresh   a short-TTL HotReadCache with a slow loader, read in a loop
+              by several threads: after the first load, callers should
+              never wait on the loader (one of them refreshes early)
+
+Usage (from backend/, database running):
+    python -m benchmarks.hot_reads [--threads 100] [--schedule-id ID]
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from sqlalchemy import select
+
+from app.core.cache import HotReadCache, hot_reads
+from app.db.database import SessionLocal
+from app.models.exam_schedule import ExamSchedule
+from app.services.exam_schedule_service import ExamScheduleService
+
+
+def burst(threads: int, read: Callable) -> List[float]:
+    barrier = threading.Barrier(threads)
+
+    def call(_):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            read(db)
+            return (time.perf_counter() - started) * 1000
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(call, range(threads)))
+
+
+def uncached(db, schedule_id: int) -> None:
+    ExamScheduleService.get_schedule_version(db, schedule_id)
+    schedule = ExamScheduleService.get_schedule_by_id(db, schedule_id)
+    schedule.exam.title
+
+
+def report(name: str, latencies: List[float], extra: str = "") -> None:
+    latencies = sorted(latencies)
+    print(
+        f"{name:<12} median {statistics.median(latencies):7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.1f} ms  {extra}"
+    )
+
+
+def refresh_check(threads: int, seconds: float = 2.0) -> None:
+    cache = HotReadCache(16, ttl=0.5, early_refresh=0.5)
+    loads = []
+
+    def load():
+        loads.append(time.perf_counter())
+        time.sleep(0.05)
+        return len(loads)
+
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+    cache.get("key", [], load)
+
+    def reader(_):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            cache.get("key", [], load)
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.001)
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(reader, range(threads)))
+    waited = sum(1 for latency in latencies if latency >= 40)
+    print(
+        f"refresh      {len(latencies)} reads, {len(loads)} loads, "
+        f"{cache.early_refreshes} early refreshes, {waited} reads waited on the loader "
+        f"(the refreshing callers), misses after warm-up: {cache.misses - 1}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--schedule-id", type=int)
+    args = parser.parse_args()
+
+    schedule_id = args.schedule_id
+    if schedule_id is None:
+        with SessionLocal() as db:
+            schedule_id = db.scalar(
+                select(ExamSchedule.id).where(ExamSchedule.deleted_at.is_(None)).limit(1)
+            )
+
+    report("uncached", burst(args.threads, lambda db: uncached(db, schedule_id)))
+    hot_reads.clear()
+    before = hot_reads.stats()
+    latencies = burst(args.threads, lambda db: ExamScheduleService.get_schedule_detail(db, schedule_id))
+    after = hot_reads.stats()
+    report(
+        "coalesced",
+        latencies,
+        f"{after['loads'] - before['loads']} load(s) for {args.threads} callers, "
+        f"{after['coalesced'] - before['coalesced']} coalesced",
+    )
+    refresh_check(8)
+
+
+if __name__ == "__main__":
+    main()
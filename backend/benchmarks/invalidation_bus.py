@@ -0,0 +1,108 @@
+"""
+Invalidation bus check: two workers' caches kept in sync over LISTEN/NOTIFY.
+
+Runs two InvalidationBus instances in this process, each with its own
+in-memory cache, on a scratch channel of the configured database:
+
+    propagation   worker A publishes a tag, time until worker B evicted it
+    gap flush     B's listener is killed (pg_terminate_backend), A publishes
+                  while B is disconnected; B must flush everything when it
+                  reconnects, since that message is lost
+
+Exits non-zero when a step fails.
+
+Usage (from backend/, database running):
+    python -m benchmarks.invalidation_bus [--rounds 50]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.core.cache import CachedResponse, MemoryBackend
+from app.db.database import engine
+from app.db.notify import InvalidationBus
+
+CHANNEL = "cache_invalidation_check"
+ENTRY = CachedResponse(b"{}", "application/json")
+
+
+def make_worker() -> tuple:
+    cache = MemoryBackend(100)
+    bus = InvalidationBus(CHANNEL, keepalive=5, max_reconnect_delay=1)
+    bus.subscribe(lambda *tags: cache.invalidate(tags), cache.clear)
+    return bus, cache
+
+
+async def wait_for(condition, timeout: float) -> Optional[float]:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if condition():
+            return time.perf_counter() - started
+        await asyncio.sleep(0.001)
+    return None
+
+
+async def check(rounds: int) -> int:
+    loop = asyncio.get_running_loop()
+    (bus_a, _), (bus_b, cache_b) = make_worker(), make_worker()
+    tasks = [asyncio.create_task(bus_a.run()), asyncio.create_task(bus_b.run())]
+    failures = 0
+    try:
+        if await wait_for(lambda: bus_a.connected and bus_b.connected, 15) is None:
+            print("FAIL  listeners did not connect")
+            return 1
+
+        latencies: List[float] = []
+        for index in range(rounds):
+            tag = f"exam:{index}"
+            cache_b.set(f"key-{index}", ENTRY, [tag], 60)
+            started = time.perf_counter()
+            await loop.run_in_executor(None, bus_a.publish, [tag])
+            if await wait_for(lambda: len(cache_b) == 0, 5) is None:
+                failures += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+        if latencies:
+            print(
+                f"{'ok' if not failures else 'FAIL':>4}  propagation: {len(latencies)}/{rounds} evicted, "
+                f"median {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms"
+            )
+
+        cache_b.set("stale", ENTRY, ["schedules"], 60)
+        flushes = bus_b.flushes
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": bus_b.listener_pid})
+        if await wait_for(lambda: not bus_b.connected, 5) is None:
+            print("FAIL  killed listener was not noticed")
+            return failures + 1
+        # Lost: B is not listening
+        await loop.run_in_executor(None, bus_a.publish, ["schedules"])
+        reconnected = await wait_for(lambda: bus_b.connected, 15)
+        ok = reconnected is not None and bus_b.flushes > flushes and len(cache_b) == 0
+        failures += not ok
+        print(
+            f"{'ok' if ok else 'FAIL':>4}  gap flush: reconnected after "
+            f"{reconnected if reconnected is not None else float('nan'):.2f} s, "
+            f"cache {'flushed' if len(cache_b) == 0 else 'still holds stale entries'}"
+        )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    return 1 if asyncio.run(check(args.rounds)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""
+Query plan check: EXPLAIN every service query against a seeded database.
+
+Creates a scratch database next to the configured one, migrates it to
+head, fills it with generated data (tens of thousands of users and
+questions, hundreds of thousands of submissions), runs VACUUM ANALYZE and
+then calls the service functions behind the API. Every statement they
+send is EXPLAINed; a sequential scan over a large table fails the check
+unless the query is listed as an accepted full scan, and so does a check
+that sends more statements than its query budget (N+1 loads). The scratch
+database is dropped afterwards.
+
+Usage (from backend/, database running):
+    python -m benchmarks.query_plans [--scale 1.0] [--min-rows 10000] [--keep]
+"""
+import argparse
+import json
+import sys
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.query_stats import assert_query_budget
+from app.services.dashboard_service import count_admin_dashboard
+from app.services.exam_schedule_service import (
+    get_or_create_exam_session,
+    get_schedule_by_id,
+    get_schedule_version,
+    get_schedules_version,
+    get_schedules_with_pagination,
+    get_student_home,
+)
+from app.services.exam_service import ExamService
+from app.services.item_analysis_service import get_item_analysis
+from app.services.proctoring_service import ProctoringService
+from app.services.question_service import (
+    get_question_by_id,
+    get_question_version,
+    get_questions_version,
+    get_questions_with_pagination,
+    get_subjects,
+)
+from app.services.score_distribution_service import get_score_summary
+from app.services.submission_service import (
+    calculate_score,
+    get_submissions_by_student,
+    get_submissions_page,
+    iter_gradebook_rows,
+    rebuild_schedule_statistics,
+    start_submission,
+)
+from app.services.user_service import get_user_by_username
+from app.schemas.exam import ExamGenerateRequest
+from init_db import create_tables
+
+SUBJECTS = 40
+
+# Statements a check may send; None: grows with the data on purpose
+DEFAULT_QUERY_BUDGET = 3
+QUERY_BUDGETS = {
+    "exams.generate": 5,
+    "statistics.rebuild": None,  # repair job, upserts the statistics per submission
+}
+
+SEED_SQL = [
+    # Teachers first, then students
+    """
+    INSERT INTO users (username, hashed_password, role)
+    SELECT 'teacher' || g, 'x', 'teacher' FROM generate_series(1, 50) g
+    """,
+    """
+    INSERT INTO users (username, hashed_password, role)
+    SELECT 'student' || g, 'x', 'student' FROM generate_series(1, :students) g
+    """,
+    """
+    INSERT INTO questions (code, content, "choiceA", "choiceB", "choiceC", "choiceD",
+                           answer, mark, subject, deleted_at)
+    SELECT 'Q' || g, 'Question ' || g, 'a', 'b', 'c', 'd',
+           (ARRAY['A','B','C','D'])[1 + g % 4], 1,
+           'subject_' || (g % :subjects),
+           CASE WHEN g % 50 = 0 THEN now() END
+    FROM generate_series(1, :questions) g
+    """,
+    """
+    INSERT INTO exams (code, title, subject, duration, total_questions, is_active,
+                       created_by, deleted_at)
+    SELECT 'E' || g, 'Exam ' || g, 'subject_' || (g % :subjects), 60, 20, true,
+           1 + g % 50, CASE WHEN g % 100 = 0 THEN now() END
+    FROM generate_series(1, :exams) g
+    """,
+    """
+    INSERT INTO exam_questions (exam_id, question_id, question_order, choice_order)
+    SELECT e.id, 1 + (e.id * 37 + o * 101) % :questions, o, 'A,B,C,D'
+    FROM exams e CROSS JOIN generate_series(1, 20) o
+    """,
+    """
+    INSERT INTO exam_schedules (title, exam_id, start_time, end_time, max_attempts,
+                                is_active, deleted_at)
+    SELECT 'Schedule ' || g, 1 + g % :exams,
+           now() - (g % 30) * interval '1 day', now() + interval '2 hours', 3,
+           g % 10 <> 0, CASE WHEN g % 200 = 0 THEN now() END
+    FROM generate_series(1, :schedules) g
+    """,
+    """
+    -- About 100 students per schedule, one attempt each
+    INSERT INTO submissions (student_id, exam_schedule_id, submitted_at, answers, score,
+                             is_late, attempt_number)
+    SELECT 51 + (g::bigint * 7919) % :students, 1 + (g / 100) % :schedules,
+           CASE WHEN g % 10 <> 0 THEN now() END,
+           CASE WHEN g % 10 <> 0 THEN '{"1": "A", "2": "B"}' ELSE '[]' END,
+           g % 11, false, 1
+    FROM generate_series(0, :submissions - 1) g
+    """,
+]
+
+
+class PlanRecorder:
+    """EXPLAINs every statement sent through an engine while a check runs"""
+
+    def __init__(self, engine):
+        self.plans: List[Dict[str, Any]] = []
+        self.active = False
+        event.listen(engine, "before_cursor_execute", self._explain)
+
+    def _explain(self, conn, cursor, statement, parameters, context, executemany):
+        keyword = statement.lstrip().split(None, 1)[0].upper()
+        if not self.active or executemany or keyword not in (
+            "SELECT", "WITH", "INSERT", "UPDATE", "DELETE"
+        ):
+            return
+        # A separate cursor: streamed queries run on a named (server-side) cursor
+        explain_cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            explain_cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = explain_cursor.fetchone()[0][0]["Plan"]
+        finally:
+            explain_cursor.close()
+        self.plans.append({"statement": " ".join(statement.split()), "plan": plan})
+
+
+def seq_scans(plan: Dict[str, Any], large_tables: Set[str]) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in large_tables:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child, large_tables))
+    return found
+
+
+def build_checks(fx: Dict[str, Any]):
+    """(label, call, tables a full scan is accepted on and why)"""
+    generate = ExamGenerateRequest(
+        code="PLAN-CHECK",
+        title="Plan check",
+        subject=fx["subject"],
+        duration=60,
+        total_questions=20,
+    )
+    trigram = "leading-wildcard ILIKE needs a pg_trgm index"
+    all_live = "aggregates over every live row"
+    checks = [
+        ("users.by_username", lambda db: get_user_by_username(db, fx["student_name"]), {}),
+        (
+            "questions.list",
+            lambda db: get_questions_with_pagination(db, skip=200, limit=10),
+            {"questions": all_live + " (pagination total)"},
+        ),
+        (
+            "questions.list_by_subject",
+            lambda db: get_questions_with_pagination(db, limit=10, subject=fx["subject"]),
+            {},
+        ),
+        (
+            "questions.search",
+            lambda db: get_questions_with_pagination(db, limit=10, search="Question 12"),
+            {"questions": trigram},
+        ),
+        ("questions.detail", lambda db: get_question_by_id(db, fx["question_id"]), {}),
+        ("questions.version", lambda db: get_questions_version(db), {"questions": all_live}),
+        ("questions.version_detail", lambda db: get_question_version(db, fx["question_id"]), {}),
+        ("questions.subjects", lambda db: get_subjects(db), {"questions": all_live}),
+        ("exams.list_by_teacher", lambda db: ExamService.get_exams(db, created_by=fx["teacher_id"]), {}),
+        ("exams.list_by_subject", lambda db: ExamService.get_exams(db, subject=fx["subject"]), {}),
+        ("exams.count_by_teacher", lambda db: ExamService.get_exams_count(db, created_by=fx["teacher_id"]), {}),
+        ("exams.detail", lambda db: ExamService.get_exam_with_questions(db, fx["exam_id"]), {}),
+        ("exams.version_by_teacher", lambda db: ExamService.get_exams_version(db, created_by=fx["teacher_id"]), {}),
+        ("exams.version_detail", lambda db: ExamService.get_exam_version(db, fx["exam_id"]), {}),
+        ("exams.subjects", lambda db: ExamService.get_subjects(db), {"questions": all_live}),
+        ("exams.generate", lambda db: ExamService.generate_exam_from_questions(db, generate, fx["teacher_id"]), {}),
+        ("schedules.list_by_exam", lambda db: get_schedules_with_pagination(db, exam_id=fx["exam_id"]), {}),
+        (
+            "schedules.list_active",
+            lambda db: get_schedules_with_pagination(db, is_active=True),
+            {"exam_schedules": "most schedules are active (pagination total)"},
+        ),
+        ("schedules.detail", lambda db: get_schedule_by_id(db, fx["schedule_id"]), {}),
+        (
+            "schedules.version_active",
+            lambda db: get_schedules_version(db, is_active=True),
+            {"exam_schedules": "most schedules are active", "exams": "hash-joined for exam_title"},
+        ),
+        ("schedules.version_detail", lambda db: get_schedule_version(db, fx["schedule_id"]), {}),
+        ("schedules.running_for_exam", lambda db: get_or_create_exam_session(db, fx["exam_id"]), {}),
+        (
+            "schedules.student_home",
+            lambda db: get_student_home(db, fx["student_id"]),
+            {
+                "exam_schedules": "every seeded schedule is still running",
+                "exams": "hash-joined for exam_title",
+            },
+        ),
+        ("submissions.start", lambda db: start_submission(db, fx["student_id"], fx["schedule_id"]), {}),
+        ("submissions.by_student", lambda db: get_submissions_by_student(db, fx["student_id"]), {}),
+        (
+            "submissions.browse_schedule",
+            lambda db: get_submissions_page(db, exam_schedule_id=fx["schedule_id"]),
+            {},
+        ),
+        (
+            "submissions.browse_exam",
+            lambda db: get_submissions_page(db, exam_id=fx["exam_id"], created_by=fx["teacher_id"]),
+            {},
+        ),
+        (
+            "submissions.browse_student_search",
+            lambda db: get_submissions_page(db, exam_schedule_id=fx["schedule_id"], student_search="student1"),
+            {},
+        ),
+        (
+            "submissions.gradebook",
+            lambda db: list(iter_gradebook_rows(db, exam_schedule_id=fx["schedule_id"])),
+            {},
+        ),
+        ("submissions.grade", lambda db: calculate_score(db, fx["schedule_id"], {"1": "A"}), {}),
+        ("statistics.rebuild", lambda db: rebuild_schedule_statistics(db, fx["schedule_id"]), {}),
+        ("statistics.item_analysis", lambda db: get_item_analysis(db, fx["schedule_id"]), {}),
+        (
+            "statistics.score_summary",
+            lambda db: get_score_summary(db, fx["schedule_id"], fx["student_id"]),
+            {},
+        ),
+        ("proctoring.seed", lambda db: ProctoringService.ensure_seeded(db, fx["schedule_id"]), {}),
+        (
+            "dashboard.counts",
+            lambda db: count_admin_dashboard(db),
+            {
+                "users": all_live,
+                "questions": all_live,
+                "exam_schedules": "every seeded schedule is still running",
+            },
+        ),
+    ]
+    return checks
+
+
+def fixtures(db) -> Dict[str, Any]:
+    # Một lịch thi đang mở có bài nộp, cùng đề, môn và giáo viên của nó
+    row = db.execute(
+        text(
+            """
+            SELECT s.id AS schedule_id, e.id AS exam_id, e.subject, e.created_by AS teacher_id,
+                   (SELECT student_id FROM submissions WHERE exam_schedule_id = s.id LIMIT 1)
+                       AS student_id
+            FROM exam_schedules s JOIN exams e ON e.id = s.exam_id
+            WHERE s.is_active AND s.deleted_at IS NULL AND e.deleted_at IS NULL
+            ORDER BY s.id LIMIT 1
+            """
+        )
+    ).mappings().one()
+    fx = dict(row)
+    fx["student_name"] = db.execute(
+        text("SELECT username FROM users WHERE id = :id"), {"id": fx["student_id"]}
+    ).scalar_one()
+    fx["question_id"] = db.execute(
+        text("SELECT question_id FROM exam_questions WHERE exam_id = :id LIMIT 1"),
+        {"id": fx["exam_id"]},
+    ).scalar_one()
+    return fx
+
+
+def seed(engine, scale: float) -> None:
+    sizes = {
+        "students": int(20_000 * scale),
+        "questions": int(50_000 * scale),
+        "exams": int(10_000 * scale),
+        "schedules": int(20_000 * scale),
+        "submissions": int(300_000 * scale),
+        "subjects": SUBJECTS,
+    }
+    with engine.begin() as connection:
+        for statement in SEED_SQL:
+            params = {k: v for k, v in sizes.items() if f":{k}" in statement}
+            connection.execute(text(statement), params)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE"))
+
+
+def large_tables(engine, min_rows: int) -> Set[str]:
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(
+                "SELECT relname FROM pg_class WHERE relkind = 'r' "
+                "AND relnamespace = 'public'::regnamespace AND reltuples >= :n"
+            ),
+            {"n": min_rows},
+        )
+        return {name for (name,) in rows}
+
+
+def run_checks(engine, min_rows: int, verbose: bool) -> int:
+    recorder = PlanRecorder(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    large = large_tables(engine, min_rows)
+    print(f"large tables (>= {min_rows} rows): {', '.join(sorted(large))}")
+
+    with Session() as db:
+        fx = fixtures(db)
+
+    failures = 0
+    for label, call, accepted in build_checks(fx):
+        recorder.plans = []
+        recorder.active = True
+        budget = QUERY_BUDGETS.get(label, DEFAULT_QUERY_BUDGET)
+        over_budget = None
+        started = time.perf_counter()
+        with Session() as db:
+            try:
+                with assert_query_budget(budget) if budget is not None else nullcontext():
+                    call(db)
+            except HTTPException as error:
+                print(f"      {label}: HTTP {error.status_code} {error.detail}")
+            except AssertionError as error:
+                over_budget = str(error)
+            db.rollback()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        recorder.active = False
+
+        problems = []
+        for entry in recorder.plans:
+            scanned = [t for t in seq_scans(entry["plan"], large) if t not in accepted]
+            if scanned:
+                problems.append((scanned, entry))
+        status = "FAIL" if problems or over_budget else "ok"
+        note = "; ".join(f"{t}: {why}" for t, why in accepted.items())
+        print(
+            f"{status:>4}  {label:<36} {len(recorder.plans):>3} queries "
+            f"{elapsed_ms:8.1f} ms{'  (accepted: ' + note + ')' if note else ''}"
+        )
+        for scanned, entry in problems:
+            failures += 1
+            print(f"      Seq Scan on {', '.join(scanned)}: {entry['statement'][:200]}")
+            if verbose:
+                print(json.dumps(entry["plan"], indent=2))
+        if over_budget:
+            failures += 1
+            print("      Over query budget: " + over_budget.replace("\n", "\n      "))
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the seeded row counts")
+    parser.add_argument("--min-rows", type=int, default=10_000, help="tables at least this big must not be seq scanned")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    parser.add_argument("--verbose", action="store_true", help="print the plans of failing queries")
+    args = parser.parse_args(argv)
+
+    url = make_url(settings.DATABASE_URL)
+    scratch = f"{url.database}_query_plans"
+    admin = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{scratch}"'))
+        connection.execute(text(f'CREATE DATABASE "{scratch}"'))
+
+    engine = create_engine(url.set(database=scratch))
+    try:
+        with engine.connect() as connection:
+            create_tables(connection)
+        started = time.perf_counter()
+        seed(engine, args.scale)
+        print(f"seeded {scratch} in {time.perf_counter() - started:.1f}s")
+        failures = run_checks(engine, args.min_rows, args.verbose)
+    finally:
+        engine.dispose()
+        if not args.keep:
+            with admin.connect() as connection:
+                connection.execute(text(f'DROP DATABASE IF EXISTS "{scratch}"'))
+    print(f"{failures} sequential scan(s) over large tables or checks over budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
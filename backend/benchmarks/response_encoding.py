@@ -0,0 +1,133 @@
+"""
+Response encoding: FastAPI response_model serialization vs encode_response.
+
+Encodes the same page of ORM objects (questions and exam schedules, built
+in memory so no database is involved) the way each response path does,
+and reports the best of several timed rounds per variant:
+
+    default    FastAPI serialize_response + JSONResponse (json.dumps), as before
+    orjson     FastAPI serialize_response + FastResponse (orjson)
+    adapter    encode_response: one TypeAdapter validation, dump_json
+    msgpack    encode_response for a client that accepts MessagePack
+
+``--models`` feeds already built response models instead of ORM objects,
+as routes that build their items (exam and schedule lists) do: FastAPI
+dumps them to dicts and validates them again, encode_response does not.
+
+Usage (from backend/):
+    python -m benchmarks.response_encoding [--rows 100 1000] [--models]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core import responses
+from app.core.responses import FastResponse, encode_response
+from app.models.exam_schedule import ExamSchedule
+from app.models.question import Question
+from app.schemas.exam_schedule import ExamScheduleOut
+from app.schemas.question import QuestionOut
+from app.schemas.user import PaginatedResponse
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_questions(n: int):
+    return [
+        Question(
+            id=i, code=f"Q{i}", content=f"Question {i} " + "lorem ipsum " * 10,
+            content_img=None, choiceA="a", choiceB="b", choiceC="c", choiceD="d",
+            answer="A", mark=1.0, unit="unit", mix=False, subject="math",
+            lecturer="lecturer", importer=1, editor=None,
+            created_at=NOW, updated_at=NOW, deleted_at=None,
+        )
+        for i in range(n)
+    ]
+
+
+def make_schedules(n: int):
+    return [
+        ExamSchedule(
+            id=i, title=f"Schedule {i}", description="Midterm", exam_id=1 + i % 50,
+            start_time=NOW, end_time=NOW + timedelta(hours=2), max_attempts=1,
+            is_active=True, created_at=NOW, updated_at=NOW, deleted_at=None,
+        )
+        for i in range(n)
+    ]
+
+
+def best_ms(call, rounds: int, per_round: int) -> float:
+    call()  # warm-up (builds cached adapters)
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(per_round):
+            call()
+        best = min(best, (time.perf_counter() - started) / per_round)
+    return best * 1000
+
+
+def variants(tp, content, loop):
+    field = create_model_field(name="response", type_=tp, mode="serialization")
+
+    def fastapi_path(response_class):
+        def encode():
+            value = loop.run_until_complete(
+                serialize_response(field=field, response_content=content, is_coroutine=True)
+            )
+            return response_class(value).body
+
+        return encode
+
+    def adapter(msgpack: bool):
+        def encode():
+            token = responses._wants_msgpack.set(msgpack)
+            try:
+                return encode_response(tp, content).body
+            finally:
+                responses._wants_msgpack.reset(token)
+
+        return encode
+
+    return [
+        ("default", fastapi_path(JSONResponse)),
+        ("orjson", fastapi_path(FastResponse)),
+        ("adapter", adapter(False)),
+        ("msgpack", adapter(True)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--models", action="store_true", help="encode response models, not ORM objects")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    kinds = [("questions", QuestionOut, make_questions), ("schedules", ExamScheduleOut, make_schedules)]
+    for kind, model, make in kinds:
+        for n in args.rows:
+            items = make(n)
+            if args.models:
+                items = [model.model_validate(item) for item in items]
+            content = {"data": items, "pagination": {"page": 1, "size": n, "total": n, "pages": 1}}
+            per_round = max(1, 2000 // n)
+            baseline = None
+            for label, call in variants(PaginatedResponse[model], content, loop):
+                ms = best_ms(call, args.rounds, per_round)
+                baseline = baseline or ms
+                size = len(call())
+                print(
+                    f"{kind:<10} {n:>5} rows  {label:<8} {ms:8.2f} ms  "
+                    f"{baseline / ms:5.1f}x  {size / 1024:7.1f} KiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
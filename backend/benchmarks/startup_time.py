@@ -0,0 +1,98 @@
+"""
+Startup time: how long a worker takes to import the app and to boot.
+
+Import time is measured in fresh interpreters (``import app.main``), with
+the slowest top-level packages from ``python -X importtime``. Boot time is
+from spawning a single-worker uvicorn process to its first successful
+/health response, so it includes the lifespan warm-up (pool connections,
+library priming). Run it before and after a change that adds imports;
+``--max-import-ms`` makes it fail above a budget.
+
+Usage (from backend/, database running):
+    python -m benchmarks.startup_time [--runs 5] [--max-import-ms 1500]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_seconds() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_packages(limit: int) -> List[tuple]:
+    """Self import time summed per top-level package (microseconds)"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    totals: Counter = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            totals[name.strip().split(".")[0]] += int(self_us)
+    return totals.most_common(limit)
+
+
+def boot_seconds(port: int, timeout: float = 30.0) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        raise RuntimeError(f"server did not answer /health within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8798)
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list")
+    parser.add_argument("--max-import-ms", type=float, help="fail when the median import is slower")
+    args = parser.parse_args(argv)
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    boots = [boot_seconds(args.port) for _ in range(args.runs)]
+    import_ms = statistics.median(imports) * 1000
+    print(f"import app.main: median {import_ms:.0f} ms, min {min(imports) * 1000:.0f} ms ({args.runs} runs)")
+    print(f"boot to /health: median {statistics.median(boots) * 1000:.0f} ms, min {min(boots) * 1000:.0f} ms")
+    print("slowest packages (self import time):")
+    for name, micros in slowest_packages(args.top):
+        print(f"  {name:<24} {micros / 1000:8.1f} ms")
+
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"import time over budget ({args.max_import_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,36 @@
 """
 Database initialization and migration utilities
 """
-from app.db.database import engine, Base
-from app.models.user import User  # Import để đăng ký model với Base
-from app.models.question import Question  # Import để đăng ký model với Base
-from app.models.exam import Exam, ExamQuestion  # Import để đăng ký model với Base
-
-def create_tables():
-    """Create all database tables"""
-    print("Creating database tables...")
-    # User model needs to be imported to be registered with Base
-    Base.metadata.create_all(bind=engine)
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+ALEMBIC_INI = Path(__file__).parent / "alembic.ini"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    if connection is not None:
+        # migrations/env.py dùng kết nối này thay vì DATABASE_URL
+        config.attributes["connection"] = connection
+    return config
+
+
+def create_tables(connection=None):
+    """Bring the database schema up to date (alembic upgrade head)"""
+    print("Running database migrations...")
+    command.upgrade(alembic_config(connection), "head")
     print("Tables created successfully!")
 
+
 def drop_tables():
-    """Drop all database tables"""
+    """Drop all database tables (alembic downgrade base)"""
     print("Dropping database tables...")
-    Base.metadata.drop_all(bind=engine)
+    command.downgrade(alembic_config(), "base")
     print("Tables dropped successfully!")
 
+
 if __name__ == "__main__":
     create_tables()
@@ -0,0 +1,52 @@
+"""hot path indexes
+
+Indexes for the list, exam-taking and reporting queries. Partial indexes
+only cover live rows (deleted_at IS NULL), which is all the services read.
+Created CONCURRENTLY so a deploy does not block writes to submissions.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 04:58:20.160779
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_questions_subject_live", "questions", ["subject", "id"], "deleted_at IS NULL"),
+    ("ix_exams_subject_live", "exams", ["subject"], "deleted_at IS NULL"),
+    ("ix_exams_created_by_live", "exams", ["created_by"], "deleted_at IS NULL"),
+    ("ix_exam_questions_exam_order", "exam_questions", ["exam_id", "question_order"], None),
+    ("ix_exam_schedules_exam_active", "exam_schedules", ["exam_id", "is_active"], None),
+    ("ix_submissions_schedule_student", "submissions", ["exam_schedule_id", "student_id", "id"], None),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,53 @@
+"""dashboard indexes
+
+Partial indexes for the admin dashboard counts: schedules that have not
+ended yet and submissions by submission time. Created CONCURRENTLY like
+0003.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    (
+        "ix_exam_schedules_end_live",
+        "exam_schedules",
+        ["end_time", "start_time"],
+        "is_active AND deleted_at IS NULL",
+    ),
+    ("ix_submissions_submitted_at", "submissions", ["submitted_at"], "submitted_at IS NOT NULL"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_where=sa.text(where),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,34 @@
+"""idempotency pending lease
+
+claimed_at on idempotency_keys: a pending row whose request died (worker
+killed mid-request) can be taken over after
+IDEMPOTENCY_PENDING_TIMEOUT_SECONDS instead of blocking retries with 409
+until the key expires.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:03:27.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'idempotency_keys',
+        sa.Column('claimed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'claimed_at')
@@ -203,8 +203,8 @@ QUESTION_TEMPLATES = {
 def create_tables():
     """Create all tables"""
     print("Creating database tables...")
-    from app.db.database import Base
-    Base.metadata.create_all(bind=engine)
+    from init_db import create_tables as run_migrations
+    run_migrations()
     print("✅ Tables created successfully!")
 
 def seed_users(db: Session):
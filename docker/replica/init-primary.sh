@@ -0,0 +1,4 @@
+#!/bin/bash
+# Cho phép replica kết nối replication tới primary trong mạng docker
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -49,16 +49,9 @@ const ExamForm: React.FC<ExamFormProps> = ({ exam, onSave, onCancel }) => {
       const subjectList = await apiService.getExamSubjects();
       setSubjects(subjectList);
 
-      // Fetch available questions count for each subject
-      const questionCounts: { [key: string]: number } = {};
-      for (const subject of subjectList) {
-        try {
-          const response = await apiService.getQuestions({ subject, size: 1 });
-          questionCounts[subject] = response.pagination.total;
-        } catch (err) {
-          questionCounts[subject] = 0;
-        }
-      }
+      // Fetch available questions count for each subject (one batch call)
+      const questionCounts =
+        await apiService.getQuestionCountsBySubject(subjectList);
       setAvailableQuestions(questionCounts);
     } catch (err) {
       console.error('Error fetching subjects:', err);
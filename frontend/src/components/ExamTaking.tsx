@@ -1,5 +1,6 @@
-import React, { useCallback, useEffect, useState } from 'react';
-import type { Question } from '../types';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
+import { ExamSessionClient } from '../services/examSession';
+import type { Question, SubmissionOut } from '../types';
 import type { Answer, ExamProgress } from '../types/submission';
 import QuestionDisplay from './QuestionDisplay';
 import toast from 'react-hot-toast';
@@ -9,18 +10,24 @@ interface ExamTakingProps {
   questions: Question[];
   timeLimit: number; // in minutes
   onSubmit: (answers: Answer[]) => Promise<void>;
+  // With a submission the exam runs over the WebSocket session instead
+  submissionId?: number;
+  onSessionSubmitted?: (submission: SubmissionOut) => void;
 }
 
 const ExamTaking: React.FC<ExamTakingProps> = ({
   questions,
   timeLimit,
   onSubmit,
+  submissionId,
+  onSessionSubmitted,
 }) => {
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0);
   const [answers, setAnswers] = useState<Answer[]>([]);
   const [timeRemaining, setTimeRemaining] = useState(timeLimit * 60); // Convert to seconds
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [showConfirmSubmit, setShowConfirmSubmit] = useState(false);
+  const sessionRef = useRef<ExamSessionClient | null>(null);
 
   // Initialize answers array
   useEffect(() => {
@@ -32,6 +39,41 @@ const ExamTaking: React.FC<ExamTakingProps> = ({
     setAnswers(initialAnswers);
   }, [questions]);
 
+  // Exam session: server time is authoritative, answers are autosaved
+  useEffect(() => {
+    if (!submissionId) return;
+
+    // Server time only ever shortens the local clock, so blur penalties stay
+    const syncTime = (remainingSeconds: number) =>
+      setTimeRemaining((prev) => Math.min(prev, remainingSeconds));
+
+    const session = new ExamSessionClient(submissionId, {
+      onState: (state) => {
+        syncTime(state.remainingSeconds);
+        setAnswers(
+          questions.map((question) => {
+            const selectedOption = state.answers[String(question.id)] || '';
+            return {
+              questionId: question.id,
+              selectedOption,
+              isAnswered: selectedOption !== '',
+            };
+          })
+        );
+      },
+      onTime: syncTime,
+      onSubmitted: (submission) => onSessionSubmitted?.(submission),
+      onError: (detail) => toast.error(detail),
+    });
+    session.connect();
+    sessionRef.current = session;
+
+    return () => {
+      session.close();
+      sessionRef.current = null;
+    };
+  }, [submissionId, questions]);
+
   // Timer countdown
   useEffect(() => {
     if (timeRemaining <= 0) {
@@ -55,6 +97,7 @@ const ExamTaking: React.FC<ExamTakingProps> = ({
             : answer
         )
       );
+      sessionRef.current?.sendAnswer(questionId, selectedOption);
     },
     []
   );
@@ -99,6 +142,10 @@ const ExamTaking: React.FC<ExamTakingProps> = ({
   const handleAutoSubmit = async () => {
     if (isSubmitting) return;
     setIsSubmitting(true);
+    if (sessionRef.current) {
+      sessionRef.current.submit();
+      return;
+    }
     try {
       await onSubmit(answers);
     } catch (error) {
@@ -110,6 +157,10 @@ const ExamTaking: React.FC<ExamTakingProps> = ({
     if (isSubmitting) return;
     setIsSubmitting(true);
     setShowConfirmSubmit(false);
+    if (sessionRef.current) {
+      sessionRef.current.submit();
+      return;
+    }
     try {
       await onSubmit(answers);
     } catch (error) {
@@ -2,12 +2,14 @@ import React, { useEffect, useState } from 'react';
 import { toast } from 'react-hot-toast';
 import { useNavigate } from 'react-router-dom';
 import { apiService } from '../services/api';
-import type { ExamSchedule, SubmissionOut } from '../types';
+import type { StudentHomeSchedule, SubmissionOut } from '../types';
 import Loading from './Loading';
 
 const StudentDashboard: React.FC = () => {
   const navigate = useNavigate();
-  const [examSchedules, setExamSchedules] = useState<ExamSchedule[]>([]);
+  const [examSchedules, setExamSchedules] = useState<StudentHomeSchedule[]>(
+    []
+  );
   const [submissions, setSubmissions] = useState<SubmissionOut[]>([]);
   const [loading, setLoading] = useState(true);
 
@@ -19,29 +21,25 @@ const StudentDashboard: React.FC = () => {
     try {
       setLoading(true);
 
-      // Load available exam schedules for students
-      const schedulesResponse =
-        await apiService.getAvailableExamSchedulesForStudents({
-          limit: 1000, // Load nhiều hơn để hiển thị tất cả
-        });
-      const allSchedules = schedulesResponse.data || [];
-
-      // Filter active schedules
-      const now = new Date();
-      const activeSchedules = allSchedules.filter((schedule: ExamSchedule) => {
-        const endTime = new Date(schedule.end_time);
-        return schedule.is_active && endTime > now;
-      });
-
-      setExamSchedules(activeSchedules);
-
-      // Load my submissions
-      try {
-        const submissionsResponse = await apiService.getMySubmissions();
-        setSubmissions(submissionsResponse.data || []);
-      } catch (error) {
-        setSubmissions([]);
+      // Running schedules with my attempts, and my submission history, in one round trip
+      const [homeResponse, submissionsResponse] = await apiService.batch([
+        { path: '/exam_schedules/student/home' },
+        {
+          path: '/submissions/?fields=exam_schedule_id,submitted_at,score,is_late',
+        },
+      ]);
+      if (homeResponse.status !== 200) {
+        throw new Error(`Loading exam schedules failed (${homeResponse.status})`);
       }
+
+      // Server only returns schedules that have not ended yet
+      setExamSchedules(homeResponse.body.schedules || []);
+
+      setSubmissions(
+        submissionsResponse.status === 200
+          ? submissionsResponse.body.data || []
+          : []
+      );
     } catch (error: any) {
       console.error('Error loading data:', error);
       toast.error('Không thể tải dữ liệu');
@@ -55,22 +53,19 @@ const StudentDashboard: React.FC = () => {
     navigate(`/exam/${examScheduleId}`);
   };
 
-  const getSubmissionCount = (examScheduleId: number): number => {
-    const filteredSubmissions = submissions.filter(
-      (submission) => submission.exam_schedule_id === examScheduleId
-    );
-    return filteredSubmissions.length;
-  };
-
-  const getExamStatus = (schedule: ExamSchedule) => {
+  const getExamStatus = (schedule: StudentHomeSchedule) => {
     const now = new Date();
     const startTime = new Date(schedule.start_time);
     const endTime = new Date(schedule.end_time);
-    const submissionCount = getSubmissionCount(schedule.id);
+    const submissionCount = schedule.attempts;
     const maxAttempts = schedule.max_attempts || 1;
 
+    if (schedule.in_progress && now <= endTime) {
+      return { status: 'in_progress', text: 'Đang làm dở', color: 'blue' };
+    }
+
     // Kiểm tra đã hết lượt làm bài chưa
-    if (submissionCount >= maxAttempts) {
+    if (schedule.remaining_attempts <= 0) {
       return {
         status: 'completed',
         text: `Đã làm ${submissionCount}/${maxAttempts} lần`,
@@ -109,9 +104,11 @@ const StudentDashboard: React.FC = () => {
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
             {examSchedules.map((schedule) => {
               const status = getExamStatus(schedule);
-              const submissionCount = getSubmissionCount(schedule.id);
+              const submissionCount = schedule.attempts;
               const maxAttempts = schedule.max_attempts || 1;
-              const canTakeExam = status.status === 'available';
+              const canTakeExam =
+                status.status === 'available' ||
+                status.status === 'in_progress';
 
               return (
                 <div
@@ -173,15 +170,17 @@ const StudentDashboard: React.FC = () => {
                   >
                     {status.status === 'completed'
                       ? status.text
-                      : canTakeExam
-                        ? submissionCount > 0
-                          ? `Làm lại (${submissionCount}/${maxAttempts})`
-                          : 'Vào làm bài'
-                        : status.status === 'upcoming'
-                          ? 'Chưa đến giờ'
-                          : status.status === 'ended'
-                            ? 'Đã hết hạn'
-                            : status.text}
+                      : status.status === 'in_progress'
+                        ? 'Tiếp tục làm bài'
+                        : canTakeExam
+                          ? submissionCount > 0
+                            ? `Làm lại (${submissionCount}/${maxAttempts})`
+                            : 'Vào làm bài'
+                          : status.status === 'upcoming'
+                            ? 'Chưa đến giờ'
+                            : status.status === 'ended'
+                              ? 'Đã hết hạn'
+                              : status.text}
                   </button>
                 </div>
               );
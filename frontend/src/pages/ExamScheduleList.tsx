@@ -217,7 +217,7 @@ const ExamScheduleList: React.FC = () => {
                         {s.title}
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
-                        {getExamTitle(s.exam_id)}
+                        {s.exam_title ?? getExamTitle(s.exam_id)}
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                         {new Date(s.start_time).toLocaleString()}
@@ -5,7 +5,7 @@ import ExamTaking from '../components/ExamTaking';
 import Loading from '../components/Loading';
 import { apiService } from '../services/api';
 import type { ExamSchedule, Question } from '../types';
-import type { Answer } from '../types/submission';
+import type { Answer, SubmissionOut } from '../types/submission';
 
 const StudentExam: React.FC = () => {
   const { examScheduleId } = useParams<{ examScheduleId: string }>();
@@ -127,6 +127,14 @@ const StudentExam: React.FC = () => {
     }
   };
 
+  const handleSessionSubmitted = (submission: SubmissionOut) => {
+    setSubmissionResult(submission);
+    toast.success('Nộp bài thành công!');
+    setTimeout(() => {
+      navigate('/dashboard');
+    }, 3000);
+  };
+
   const calculateTimeLimit = (): number => {
     if (!exam || !exam.duration) return 60; // Default 60 minutes
     return exam.duration; // Duration from exam in minutes
@@ -279,6 +287,8 @@ const StudentExam: React.FC = () => {
       questions={questions}
       timeLimit={calculateTimeLimit()}
       onSubmit={handleSubmitExam}
+      submissionId={currentSubmission?.id}
+      onSessionSubmitted={handleSessionSubmitted}
     />
   );
 };
@@ -3,6 +3,9 @@ import axios, { type AxiosInstance, type AxiosResponse } from 'axios';
 import { config } from '../config/env';
 import type {
   AuthResponse,
+  BatchRequestItem,
+  BatchResponse,
+  BatchResponseItem,
   Exam,
   ExamCreate,
   ExamDetailResponse,
@@ -346,6 +349,34 @@ class ApiService {
     return response.data;
   }
 
+  // Batch API: several calls in one round trip (at most 20 per request)
+  async batch(requests: BatchRequestItem[]): Promise<BatchResponseItem[]> {
+    const response = await this.api.post<BatchResponse>('/batch', {
+      requests,
+    });
+    return response.data.responses;
+  }
+
+  async getQuestionCountsBySubject(
+    subjects: string[]
+  ): Promise<Record<string, number>> {
+    const counts: Record<string, number> = {};
+    for (let start = 0; start < subjects.length; start += 20) {
+      const chunk = subjects.slice(start, start + 20);
+      const responses = await this.batch(
+        chunk.map((subject) => ({
+          id: subject,
+          path: `/questions/?size=1&fields=id&subject=${encodeURIComponent(subject)}`,
+        }))
+      );
+      for (const item of responses) {
+        counts[item.id as string] =
+          item.status === 200 ? item.body.pagination.total : 0;
+      }
+    }
+    return counts;
+  }
+
   // Generic methods for future use
   get instance() {
     return this.api;
@@ -0,0 +1,163 @@
+// frontend/src/services/examSession.ts
+// WebSocket session for taking an exam: server time, answer autosave, submit
+import { config } from '../config/env';
+import type { SubmissionOut } from '../types';
+import { logger } from '../utils/logger';
+
+export interface ExamSessionState {
+  remainingSeconds: number;
+  answers: Record<string, string>; // {"question_id": "option"}
+}
+
+export interface ExamSessionHandlers {
+  onState?: (state: ExamSessionState) => void;
+  onTime?: (remainingSeconds: number) => void;
+  onSubmitted?: (submission: SubmissionOut) => void;
+  onError?: (detail: string) => void;
+  onConnectionChange?: (connected: boolean) => void;
+}
+
+interface AnswerFrame {
+  type: 'answer';
+  seq: number;
+  question_id: number;
+  option: string;
+}
+
+const MAX_RECONNECT_DELAY_MS = 10000;
+
+const sessionUrl = (submissionId: number, token: string): string => {
+  const base = config.apiBaseUrl.replace(/^http/, 'ws');
+  return `${base}/submissions/${submissionId}/session?token=${encodeURIComponent(token)}`;
+};
+
+export class ExamSessionClient {
+  private socket: WebSocket | null = null;
+  private seq = 0;
+  private pending: AnswerFrame[] = []; // Sent but not yet acknowledged
+  private resumed = false; // Seq numbers already continue the server's
+  private ready = false; // Session message received on the current socket
+  private submitRequested = false;
+  private closed = false;
+  private reconnectAttempts = 0;
+  private reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+
+  constructor(
+    private readonly submissionId: number,
+    private readonly handlers: ExamSessionHandlers = {}
+  ) {}
+
+  connect(): void {
+    const token = localStorage.getItem('access_token');
+    if (!token) {
+      this.handlers.onError?.('Không tìm thấy token đăng nhập');
+      return;
+    }
+
+    const socket = new WebSocket(sessionUrl(this.submissionId, token));
+    this.socket = socket;
+
+    socket.onopen = () => {
+      this.reconnectAttempts = 0;
+      this.handlers.onConnectionChange?.(true);
+    };
+    socket.onmessage = (event) => this.handleMessage(JSON.parse(event.data));
+    socket.onclose = (event) => {
+      this.ready = false;
+      this.handlers.onConnectionChange?.(false);
+      // 1008: rejected (auth, not owner, already submitted) - do not retry
+      if (event.code === 1008) this.closed = true;
+      if (this.socket === socket) {
+        this.socket = null;
+        this.scheduleReconnect();
+      }
+    };
+  }
+
+  sendAnswer(questionId: number, option: string): void {
+    const frame: AnswerFrame = {
+      type: 'answer',
+      seq: ++this.seq,
+      question_id: questionId,
+      option,
+    };
+    this.pending.push(frame);
+    this.send(frame);
+  }
+
+  submit(): void {
+    this.submitRequested = true;
+    this.send({ type: 'submit' });
+  }
+
+  close(): void {
+    this.closed = true;
+    if (this.reconnectTimer) clearTimeout(this.reconnectTimer);
+    this.socket?.close();
+    this.socket = null;
+  }
+
+  private send(frame: object): void {
+    // Offline frames stay in `pending` and are resent after reconnecting
+    if (this.ready && this.socket?.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify(frame));
+    }
+  }
+
+  private handleMessage(message: any): void {
+    switch (message.type) {
+      case 'session': {
+        if (this.resumed) {
+          // Reconnect: drop what the server already has, resend the rest
+          this.pending = this.pending.filter((frame) => frame.seq > message.seq);
+        } else {
+          // First session of this page: continue after the server's seq
+          this.pending.forEach((frame, index) => {
+            frame.seq = message.seq + index + 1;
+          });
+          this.seq = message.seq + this.pending.length;
+          this.resumed = true;
+        }
+        this.ready = true;
+        const answers = { ...message.answers };
+        this.pending.forEach((frame) => {
+          if (frame.option) answers[String(frame.question_id)] = frame.option;
+          else delete answers[String(frame.question_id)];
+        });
+        this.handlers.onState?.({
+          remainingSeconds: message.remaining_seconds,
+          answers,
+        });
+        this.pending.forEach((frame) => this.send(frame));
+        if (this.submitRequested) this.send({ type: 'submit' });
+        break;
+      }
+      case 'ack':
+        this.pending = this.pending.filter((frame) => frame.seq > message.seq);
+        break;
+      case 'time':
+        this.handlers.onTime?.(message.remaining_seconds);
+        break;
+      case 'submitted':
+        this.closed = true;
+        this.handlers.onSubmitted?.(message.submission);
+        break;
+      case 'error':
+        logger.error('🔴 Exam session error:', message.detail);
+        this.handlers.onError?.(message.detail);
+        break;
+      default:
+        logger.warn('Unknown exam session message:', message);
+    }
+  }
+
+  private scheduleReconnect(): void {
+    if (this.closed) return;
+    const delay = Math.min(
+      1000 * 2 ** this.reconnectAttempts,
+      MAX_RECONNECT_DELAY_MS
+    );
+    this.reconnectAttempts += 1;
+    this.reconnectTimer = setTimeout(() => this.connect(), delay);
+  }
+}
@@ -0,0 +1,18 @@
+export interface BatchRequestItem {
+  id?: string;
+  method?: 'GET' | 'HEAD' | 'POST' | 'PUT' | 'PATCH' | 'DELETE';
+  path: string;
+  headers?: Record<string, string>;
+  body?: unknown;
+}
+
+export interface BatchResponseItem<T = any> {
+  id?: string;
+  status: number;
+  headers: Record<string, string>;
+  body: T;
+}
+
+export interface BatchResponse {
+  responses: BatchResponseItem[];
+}
@@ -21,6 +21,7 @@ export interface Exam {
   created_at: string;
   updated_at: string;
   deleted_at?: string | null;
+  creator_username?: string;
 }
 
 export interface ExamWithQuestions extends Exam {
@@ -72,7 +73,6 @@ export interface ExamQuestionDetail {
 
 export interface ExamDetailResponse extends Exam {
   questions: ExamQuestionDetail[];
-  creator_username?: string;
 }
 
 export interface ExamListParams {
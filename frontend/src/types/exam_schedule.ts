@@ -10,6 +10,7 @@ export interface ExamSchedule {
   created_by: number;
   created_at: string;
   deleted_at?: string;
+  exam_title?: string;
 }
 
 export interface ExamScheduleCreate {
@@ -47,3 +48,19 @@ export interface PaginatedResponse<T> {
   limit: number;
   data: T[];
 }
+
+export interface InProgressSubmission {
+  id: number;
+  attempt_number?: number | null;
+  started_at?: string | null;
+}
+
+export interface StudentHomeSchedule extends ExamSchedule {
+  attempts: number;
+  remaining_attempts: number;
+  in_progress?: InProgressSubmission | null;
+}
+
+export interface StudentHome {
+  schedules: StudentHomeSchedule[];
+}
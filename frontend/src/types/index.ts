@@ -1,4 +1,5 @@
 export * from './auth';
+export * from './batch';
 export * from './exam';
 export * from './exam_schedule';
 export * from './question';
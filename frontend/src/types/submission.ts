@@ -13,10 +13,12 @@ export interface SubmissionOut {
   id: number;
   student_id: number;
   exam_schedule_id: number;
-  submitted_at: string;
+  submitted_at: string | null;
   answers: string; // JSON string of Answer[]
   score?: number;
   is_late: boolean;
+  attempt_number?: number;
+  started_at?: string | null;
 }
 
 export interface ExamSession {